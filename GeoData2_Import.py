@@ -40,6 +40,24 @@ STD_ZOOM = 17
 STD_LATITUDE = 51.47786
 STD_LONGITUDE = 0.0
 
+# The (preference value, label) of the options of the OSM import
+OSM_ELEVATION_PROVIDERS = [
+    ("google", QT_TRANSLATE_NOOP("GeoData2", "Google Elevation API")),
+    ("dem", QT_TRANSLATE_NOOP("GeoData2", "Local DEM files")),
+]
+OSM_PROJECTIONS = [
+    ("spherical", QT_TRANSLATE_NOOP("GeoData2", "Spherical (legacy)")),
+    ("transverse_mercator", QT_TRANSLATE_NOOP("GeoData2", "Transverse Mercator")),
+    ("utm", QT_TRANSLATE_NOOP("GeoData2", "UTM")),
+    ("enu", QT_TRANSLATE_NOOP("GeoData2", "Local tangent plane (ENU)")),
+]
+OSM_BUILD_MODES = [
+    ("objects", QT_TRANSLATE_NOOP("GeoData2", "One object per way")),
+    ("compound", QT_TRANSLATE_NOOP("GeoData2", "One compound per category")),
+    ("mesh", QT_TRANSLATE_NOOP("GeoData2", "One mesh per category")),
+    ("coin", QT_TRANSLATE_NOOP("GeoData2", "View only (Coin scene graph)")),
+]
+
 class GeoData2_Import:
     """GeoData2 Import command definition
     """
@@ -80,6 +98,9 @@ class GeoData2_Import:
         self.GpxFilename = None
         self.EmirFilename = None
         self.LidarFilename = None
+        self.Scheduler = None
+        self.Stream = None
+        self.ImportCancelled = False
 
         self.dialog = Gui.PySideUic.loadUi(
             os.path.join(os.path.dirname(__file__), "GeoData2_Import.ui")
@@ -93,6 +114,11 @@ class GeoData2_Import:
         self.dialog.osmZoom.valueChanged.connect(self.onOsmZoomChanged)
         self.dialog.osmLatitude.valueChanged.connect(self.onOsmLatitudeChanged)
         self.dialog.osmLongitude.valueChanged.connect(self.onOsmLongitudeChanged)
+        self.dialog.osmElevationProvider.currentIndexChanged.connect(self.onOsmElevationProviderChanged)
+        self.dialog.osmProjection.currentIndexChanged.connect(self.onOsmProjectionChanged)
+        self.dialog.osmBuildMode.currentIndexChanged.connect(self.onOsmBuildModeChanged)
+        self.dialog.osmSimplifyPixels.valueChanged.connect(self.onOsmSimplifyPixelsChanged)
+        self.dialog.osmClipWays.toggled.connect(self.onOsmClipWaysChanged)
 
         self.dialog.csvLatitude.valueChanged.connect(self.onCsvLatitudeChanged)
         self.dialog.csvLongitude.valueChanged.connect(self.onCsvLongitudeChanged)
@@ -112,7 +138,9 @@ class GeoData2_Import:
         self.dialog.lidarFilename.textChanged.connect(self.onLidarFilenameChanged)
 
         self.dialog.btnImport.clicked.connect(self.onImport)
+        self.dialog.btnCancel.clicked.connect(self.onCancel)
         self.dialog.btnClose.clicked.connect(self.onClose)
+        self.dialog.btnCancel.setVisible(False)
         self.dialog.progressBar.setVisible(False)
         self.dialog.status.setVisible(False)
 
@@ -135,6 +163,7 @@ class GeoData2_Import:
                 self.dialog.osmLocationPresets.addItem(preset['name'])
         self.dialog.osmLocationPresets.setCurrentIndex(pref.GetInt("LocationPresetIndex", 0))
 
+        self.updateOsmOptions()
         self.updateCsvFields()
         self.updateCsvCoordinates()
         self.updateGpxFields()
@@ -313,6 +342,50 @@ class GeoData2_Import:
         self.updateOsmUrl()
         self.updateOsmCoordinates()
 
+    def onOsmElevationProviderChanged(self, i):
+        """Callback when the Elevation Combo has changed
+
+        Args:
+            i (int): The selected index of the Elevation Combo
+        """
+        self._setOsmOption("ElevationProvider", OSM_ELEVATION_PROVIDERS, i)
+
+    def onOsmProjectionChanged(self, i):
+        """Callback when the Projection Combo has changed
+
+        Args:
+            i (int): The selected index of the Projection Combo
+        """
+        self._setOsmOption("Projection", OSM_PROJECTIONS, i)
+
+    def onOsmBuildModeChanged(self, i):
+        """Callback when the Build Mode Combo has changed
+
+        Args:
+            i (int): The selected index of the Build Mode Combo
+        """
+        self._setOsmOption("BuildMode", OSM_BUILD_MODES, i)
+
+    def onOsmSimplifyPixelsChanged(self, d):
+        """Callback when the Simplify field has changed
+
+        Args:
+            d (float): the tolerance of the simplification, in pixels
+        """
+        App.ParamGet("User parameter:BaseApp/Preferences/Mod/GeoData2").SetFloat("SimplifyPixels", d)
+
+    def onOsmClipWaysChanged(self, checked):
+        """Callback when the Clip Ways check box has changed
+
+        Args:
+            checked (bool): whether to clip the ways to the area
+        """
+        App.ParamGet("User parameter:BaseApp/Preferences/Mod/GeoData2").SetBool("ClipWays", checked)
+
+    def _setOsmOption(self, pref_name, options, i):
+        if 0 <= i < len(options):
+            App.ParamGet("User parameter:BaseApp/Preferences/Mod/GeoData2").SetString(pref_name, options[i][0])
+
     def onCsvLatitudeChanged(self,d):
         """Callback to set the Latitude
 
@@ -453,14 +526,30 @@ class GeoData2_Import:
         if current_tab == 0:
             # OSM
             global GCP_ELEVATION_API_KEY
-            if self.dialog.osmDownloadAltitude.isChecked() and not GCP_ELEVATION_API_KEY:
+            pref = App.ParamGet("User parameter:BaseApp/Preferences/Mod/GeoData2")
+            # NOTE: the local DEM files need no API key
+            has_altitude = bool(GCP_ELEVATION_API_KEY) or pref.GetString("ElevationProvider", "google") == "dem"
+            if self.dialog.osmDownloadAltitude.isChecked() and not has_altitude:
                 App.Console.PrintWarning(f"Altitude information not available because no GCP API key provided.\n")
-            geodata2.import_osm(
+            # NOTE: the download, the parsing and the altitude lookups run in
+            #   worker threads, while the document objects of each tile are
+            #   created here as soon as it is ready, by slices of a few
+            #   milliseconds in between which the event loop keeps running.
+            # NOTE: the stream is also closed by the dialog, as the generator
+            #   does not close it if cancelled before its first slice.
+            self.Stream = geodata2.stream_osm(
                 self.Latitude,
                 self.Longitude,
                 self.Zoom,
-                GCP_ELEVATION_API_KEY and self.dialog.osmDownloadAltitude.isChecked(),
-                self.onImportProgress)
+                download_altitude=has_altitude and self.dialog.osmDownloadAltitude.isChecked(),
+                projection=pref.GetString("Projection", "spherical"))
+            self.setImportRunning(True)
+            self.Scheduler = geodata2.TimeSlicedScheduler(
+                geodata2.iter_build_osm(self.Stream, self.Zoom, self.setImportProgress, pref.GetString("BuildMode", "objects"), lambda: self.ImportCancelled),
+                on_finished=self.onImportFinished,
+                on_error=self.onImportError)
+            self.Scheduler.start()
+            return
         elif current_tab == 1:
             # CSV
             import geodata2
@@ -496,7 +585,59 @@ class GeoData2_Import:
             self.dialog.status.setVisible(False)
         self.dialog.progressBar.setVisible(False)
 
+    def onImportFinished(self):
+        self.Scheduler = None
+        self._closeStream()
+        self.setImportRunning(False)
+
+    def onImportError(self, e):
+        import geodata2
+        if isinstance(e, geodata2.ImportCancelled):
+            self.onImportCancelled()
+        else:
+            self.onImportFailed(str(e))
+
+    def onImportCancelled(self):
+        self.Scheduler = None
+        self._closeStream()
+        self.setImportRunning(False)
+        self.dialog.status.setText(QT_TRANSLATE_NOOP("GeoData2", "Import cancelled."))
+
+    def onImportFailed(self, message):
+        self.Scheduler = None
+        self._closeStream()
+        self.setImportRunning(False)
+        self.dialog.status.setText(message)
+        App.Console.PrintError(f"Import failed: {message}\n")
+
+    def onCancel(self):
+        self.ImportCancelled = True
+        self.dialog.btnCancel.setEnabled(False)
+        self.dialog.status.setText(QT_TRANSLATE_NOOP("GeoData2", "Cancelling ..."))
+
+    def setImportRunning(self, running):
+        """Toggle the dialog between its idle and its running state.
+
+        Args:
+            running (bool): whether an import is running
+        """
+        self.ImportCancelled = False
+        self.dialog.btnImport.setEnabled(not running)
+        self.dialog.btnCancel.setEnabled(running)
+        self.dialog.btnCancel.setVisible(running)
+        self.dialog.progressBar.setVisible(running)
+
+    def _closeStream(self):
+        """Stop the worker threads of the OSM stream, if any."""
+        if self.Stream is not None:
+            self.Stream.close()
+            self.Stream = None
+
     def onClose(self):
+        if self.Scheduler:
+            self.Scheduler.cancel()
+        self._closeStream()
+        self.ImportCancelled = True
         pref = App.ParamGet("User parameter:BaseApp/Preferences/Mod/GeoData2")
         pref.SetInt("WindowWidth", self.dialog.frameSize().width())
         pref.SetInt("WindowHeight", self.dialog.frameSize().height())
@@ -504,11 +645,17 @@ class GeoData2_Import:
 
     def onImportProgress(self, progress, status):
         if App.GuiUp:
-            self.dialog.progressBar.setValue(progress)
-            if status:
-                self.dialog.status.setText(status)
+            self.setImportProgress(progress, status)
             Gui.updateGui()
 
+    def setImportProgress(self, progress, status):
+        """Update the progress without pumping the event loop, for the
+        imports running in a worker thread or in the TimeSlicedScheduler.
+        """
+        self.dialog.progressBar.setValue(progress)
+        if status:
+            self.dialog.status.setText(status)
+
     def updateBrowserUrl(self):
         """Update both the browser URL and the URL field with the zoom,
         latitude and longitude.
@@ -532,6 +679,30 @@ class GeoData2_Import:
         self.dialog.osmLatitude.setValue(self.Latitude)
         self.dialog.osmLongitude.setValue(self.Longitude)
 
+    def updateOsmOptions(self):
+        """Set the options of the OSM import from the preferences"""
+        from geodata2.import_osm import SIMPLIFY_PIXELS
+        pref = App.ParamGet("User parameter:BaseApp/Preferences/Mod/GeoData2")
+        for combo, pref_name, options in (
+                (self.dialog.osmElevationProvider, "ElevationProvider", OSM_ELEVATION_PROVIDERS),
+                (self.dialog.osmProjection, "Projection", OSM_PROJECTIONS),
+                (self.dialog.osmBuildMode, "BuildMode", OSM_BUILD_MODES)):
+            # NOTE: the preference is only set when the user picks an option
+            combo.blockSignals(True)
+            combo.clear()
+            for (value, label) in options:
+                combo.addItem(label, value)
+            values = [ value for (value, label) in options ]
+            value = pref.GetString(pref_name, values[0])
+            combo.setCurrentIndex(values.index(value) if value in values else 0)
+            combo.blockSignals(False)
+        self.dialog.osmSimplifyPixels.blockSignals(True)
+        self.dialog.osmSimplifyPixels.setValue(pref.GetFloat("SimplifyPixels", SIMPLIFY_PIXELS))
+        self.dialog.osmSimplifyPixels.blockSignals(False)
+        self.dialog.osmClipWays.blockSignals(True)
+        self.dialog.osmClipWays.setChecked(pref.GetBool("ClipWays", True))
+        self.dialog.osmClipWays.blockSignals(False)
+
     def updateCsvFields(self):
         """Update the dialog filename.
         """
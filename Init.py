@@ -41,3 +41,5 @@ except:
 
 App.addImportType("OSM format (*.osm)","importOSM")
 App.addExportType("CSV format (*.csv *.tsv)","importCSV")
+
+App.__unit_test__ += ["TestGeoData2"]
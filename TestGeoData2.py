@@ -0,0 +1,37 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''The unit tests of the GeoData2 workbench, registered with FreeCAD's test
+framework in Init.py: run them with ``FreeCADCmd -t TestGeoData2``.
+'''
+
+from geodata2.tests.test_clipping import TestClipping
+from geodata2.tests.test_http_client import TestHttpClient
+from geodata2.tests.test_mesh_tools import TestMeshTools
+from geodata2.tests.test_multipolygon import TestMultipolygon
+from geodata2.tests.test_osm_cache import TestOsmCache
+from geodata2.tests.test_osm_tiles import TestOsmTileStore
+from geodata2.tests.test_projection import TestProjections
+from geodata2.tests.test_shape_pool import TestShapePool
+from geodata2.tests.test_simplify import TestSimplify
+from geodata2.tests.test_transverse_mercator import TestTransverseMercator
@@ -27,6 +27,7 @@ from  geodat.transversmercator import TransverseMercator
 import inventortools
 
 from geodat.say import *
+from geodata2.elevation_cache import ElevationCache
 
 #\cond
 tm=TransverseMercator()
@@ -43,6 +44,12 @@ response = urllib2.urlopen(f)
 '''
 
 def getheight(b,l):
+	# the heights already downloaded are kept in the elevation cache
+	cache=ElevationCache.from_preferences()
+	h=cache.lookup("google",[b],[l])[0]
+	if h==h:
+		return round(h*1000,2)
+
 	source="https://maps.googleapis.com/maps/api/elevation/json?locations="+str(b)+','+str(l)
 	say(source)
 
@@ -63,6 +70,7 @@ def getheight(b,l):
 
 	res=s['results']
 	for r in res:
+		cache.store("google",[b],[l],[r['elevation']])
 		return round(r['elevation']*1000,2)
 
 
@@ -47,6 +47,8 @@ import geodat.inventortools as inventortools
 
 import geodat.xmltodict
 from  geodat.xmltodict import parse
+
+from geodata2.multipolygon import assemble_multipolygon
 #\endcond
 
 #------------------------------
@@ -150,7 +152,8 @@ debug=False
 #def import_osm(b,l,bk,progressbar,status):
 #	import_osm2(b,l,bk,progressbar,status,False)
 
-def import_osm2(b,l,bk,progressbar,status,elevation):
+def import_osm2(b,l,bk,progressbar,status,elevation,cancelled=None):
+	'''cancelled: optional function returning True to abort the import'''
 
 
 	dialog=False
@@ -408,179 +411,251 @@ def import_osm2(b,l,bk,progressbar,status,elevation):
 	wn=-1
 	coways=len(ways)
 	starttime=time.time()
-	refresh=1000
-	for w in ways:
-		wid=w.params['id']
-
-#		say(w.params)
-#		say("way content")
-#		for c in w.content:
-#			say(c)
-
-		building=False
-		landuse=False
-		highway=False
-		wn += 1
-
-		# nur teile testen
-		#if wn <2000: continue
-
-		nowtime=time.time()
-		if wn!=0 and (nowtime-starttime)/wn > 0.5: 
-			say(("way ---- # " + str(wn) + "/" + str(coways) + " time per house: " +  str(round((nowtime-starttime)/wn,2))))
-		if progressbar:
-			progressbar.setValue(int(0+100.0*wn/coways))
-
-		st=""
-		st2=""
-		nr=""
-		h=0
-		ci=""
-
-		for t in w.getiterator('tag'):
-					try:
-						if debug: say(t)
-#						say(t.params['k'])
-#						say(t.params['v'])
-
-						if str(t.params['k'])=='building':
-							building=True
-							if st == '':
-								st='building'
-
-						if str(t.params['k'])=='landuse':
-							landuse=True
-							st=t.params['k']
-							nr=t.params['v']
-
-						if str(t.params['k'])=='highway':
-							highway=True
-							st=t.params['k']
-
-						if str(t.params['k'])=='addr:city':
-							ci=t.params['v']
-
-						if str(t.params['k'])=='name':
-							zz=t.params['v']
-							nr=beaustring(zz)
-						if str(t.params['k'])=='ref':
-							zz=t.params['v']
-							nr=beaustring(zz)+" /"
-
-						if str(t.params['k'])=='addr:street':
-							zz=t.params['v']
-							st2=" "+beaustring(zz)
-						if str(t.params['k'])=='addr:housenumber':
-							nr=str(t.params['v'])
-
-						if str(t.params['k'])=='building:levels':
-							if h==0:
-								h=int(str(t.params['v']))*1000*3
-						if str(t.params['k'])=='building:height':
-							h=int(str(t.params['v']))*1000
-
-					except:
-						sayErr("unexpected error ######################################################")
-
-		name=str(st) + " " + str(nr)
-		name=str(st) + st2+ " " + str(nr) 
-		if name==' ':
-			name='landuse xyz'
-		if debug: say(("name ",name))
-		#say(name,zz,nr,ci)
-
-		#generate pointlist of the way
-		polis=[]
-		height=None
-
-		llpoints=[]
-#		say("get nodes",w)
-		for n in w.getiterator('nd'):
-#			say(n.params)
-			m=nodesbyid[n.params['ref']]
-			llpoints.append([n.params['ref'],m.params['lat'],m.params['lon']])
-		if elevation:
-			say("get heights for " + str(len(llpoints)))
-			heights=getHeights(llpoints)
-
-		for n in w.getiterator('nd'):
-			p=points[str(n.params['ref'])]
-			if building and elevation:
-				if not height:
-					try:
-						height=heights[m.params['lat']+' '+m.params['lon']]*1000 - baseheight
-					except:
-						sayErr("---no height avaiable for " + m.params['lat']+' '+m.params['lon'])
-						height=0
-				p.z=height
-			polis.append(p)
-
-		#create 2D map
-		pp=Part.makePolygon(polis)
-		Part.show(pp)
-		z=App.ActiveDocument.ActiveObject
-		z.Label="w_"+wid
-
-		if name==' ':
-			g=App.ActiveDocument.addObject("Part::Extrusion",name)
-			g.Base = z
-			g.ViewObject.ShapeColor = (1.00,1.00,0.00)
-			g.Dir = (0,0,10)
-			g.Solid=True
-			g.Label='way ex '
-
-		if building:
-			g=App.ActiveDocument.addObject("Part::Extrusion",name)
-			g.Base = z
-			g.ViewObject.ShapeColor = (1.00,1.00,1.00)
-
-			if h==0:
-				h=10000
-			g.Dir = (0,0,h)
-			g.Solid=True
-			g.Label=name
-
-			obj = FreeCAD.ActiveDocument.ActiveObject
-			inventortools.setcolors2(obj)
-
-		if landuse:
-			g=App.ActiveDocument.addObject("Part::Extrusion",name)
-			g.Base = z
-			if nr == 'residential':
-				g.ViewObject.ShapeColor = (1.00,.60,.60)
-			elif nr == 'meadow':
-				g.ViewObject.ShapeColor = (0.00,1.00,0.00)
-			elif nr == 'farmland':
-				g.ViewObject.ShapeColor = (.80,.80,.00)
-			elif nr == 'forest':
-				g.ViewObject.ShapeColor = (1.0,.40,.40)
-			g.Dir = (0,0,0.1)
-			g.Label=name
-			g.Solid=True
-
-		if highway:
-			g=App.ActiveDocument.addObject("Part::Extrusion","highway")
-			g.Base = z
-			g.ViewObject.LineColor = (0.00,.00,1.00)
-			g.ViewObject.LineWidth = 10
-			g.Dir = (0,0,0.2)
-			g.Label=name
-		refresh += 1
-		if os.path.exists("/tmp/stop"):
-
-			sayErr("notbremse gezogen")
-			FreeCAD.w=w
-			raise Exception("Notbremse Manager main loop")
-
-		if refresh >3:
-			FreeCADGui.updateGui()
-			# FreeCADGui.SendMsgToActiveView("ViewFit")
-			refresh=0
-
-
-	FreeCAD.activeDocument().recompute()
+	refresh=0
+	# one undo transaction and a single recompute for all the ways
+	App.ActiveDocument.openTransaction("Import OSM")
+	try:
+		for w in ways:
+			wid=w.params['id']
+
+	#		say(w.params)
+	#		say("way content")
+	#		for c in w.content:
+	#			say(c)
+
+			building=False
+			landuse=False
+			highway=False
+			wn += 1
+
+			# nur teile testen
+			#if wn <2000: continue
+
+			nowtime=time.time()
+			if wn!=0 and (nowtime-starttime)/wn > 0.5: 
+				say(("way ---- # " + str(wn) + "/" + str(coways) + " time per house: " +  str(round((nowtime-starttime)/wn,2))))
+			if progressbar:
+				progressbar.setValue(int(0+100.0*wn/coways))
+
+			st=""
+			st2=""
+			nr=""
+			h=0
+			ci=""
+
+			for t in w.getiterator('tag'):
+						try:
+							if debug: say(t)
+	#						say(t.params['k'])
+	#						say(t.params['v'])
+
+							if str(t.params['k'])=='building':
+								building=True
+								if st == '':
+									st='building'
+
+							if str(t.params['k'])=='landuse':
+								landuse=True
+								st=t.params['k']
+								nr=t.params['v']
+
+							if str(t.params['k'])=='highway':
+								highway=True
+								st=t.params['k']
+
+							if str(t.params['k'])=='addr:city':
+								ci=t.params['v']
+
+							if str(t.params['k'])=='name':
+								zz=t.params['v']
+								nr=beaustring(zz)
+							if str(t.params['k'])=='ref':
+								zz=t.params['v']
+								nr=beaustring(zz)+" /"
+
+							if str(t.params['k'])=='addr:street':
+								zz=t.params['v']
+								st2=" "+beaustring(zz)
+							if str(t.params['k'])=='addr:housenumber':
+								nr=str(t.params['v'])
+
+							if str(t.params['k'])=='building:levels':
+								if h==0:
+									h=int(str(t.params['v']))*1000*3
+							if str(t.params['k'])=='building:height':
+								h=int(str(t.params['v']))*1000
+
+						except:
+							sayErr("unexpected error ######################################################")
+
+			name=str(st) + " " + str(nr)
+			name=str(st) + st2+ " " + str(nr) 
+			if name==' ':
+				name='landuse xyz'
+			if debug: say(("name ",name))
+			#say(name,zz,nr,ci)
+
+			#generate pointlist of the way
+			polis=[]
+			height=None
+
+			llpoints=[]
+	#		say("get nodes",w)
+			for n in w.getiterator('nd'):
+	#			say(n.params)
+				m=nodesbyid[n.params['ref']]
+				llpoints.append([n.params['ref'],m.params['lat'],m.params['lon']])
+			if elevation:
+				say("get heights for " + str(len(llpoints)))
+				heights=getHeights(llpoints)
+
+			for n in w.getiterator('nd'):
+				p=points[str(n.params['ref'])]
+				if building and elevation:
+					if not height:
+						try:
+							height=heights[m.params['lat']+' '+m.params['lon']]*1000 - baseheight
+						except:
+							sayErr("---no height avaiable for " + m.params['lat']+' '+m.params['lon'])
+							height=0
+					p.z=height
+				polis.append(p)
+
+			#create 2D map
+			pp=Part.makePolygon(polis)
+			Part.show(pp)
+			z=App.ActiveDocument.ActiveObject
+			z.Label="w_"+wid
+
+			if name==' ':
+				g=App.ActiveDocument.addObject("Part::Extrusion",name)
+				g.Base = z
+				g.ViewObject.ShapeColor = (1.00,1.00,0.00)
+				g.Dir = (0,0,10)
+				g.Solid=True
+				g.Label='way ex '
+
+			if building:
+				g=App.ActiveDocument.addObject("Part::Extrusion",name)
+				g.Base = z
+				g.ViewObject.ShapeColor = (1.00,1.00,1.00)
+
+				if h==0:
+					h=10000
+				g.Dir = (0,0,h)
+				g.Solid=True
+				g.Label=name
+
+				obj = FreeCAD.ActiveDocument.ActiveObject
+				inventortools.setcolors2(obj)
+
+			if landuse:
+				g=App.ActiveDocument.addObject("Part::Extrusion",name)
+				g.Base = z
+				if nr == 'residential':
+					g.ViewObject.ShapeColor = (1.00,.60,.60)
+				elif nr == 'meadow':
+					g.ViewObject.ShapeColor = (0.00,1.00,0.00)
+				elif nr == 'farmland':
+					g.ViewObject.ShapeColor = (.80,.80,.00)
+				elif nr == 'forest':
+					g.ViewObject.ShapeColor = (1.0,.40,.40)
+				g.Dir = (0,0,0.1)
+				g.Label=name
+				g.Solid=True
+
+			if highway:
+				g=App.ActiveDocument.addObject("Part::Extrusion","highway")
+				g.Base = z
+				g.ViewObject.LineColor = (0.00,.00,1.00)
+				g.ViewObject.LineWidth = 10
+				g.Dir = (0,0,0.2)
+				g.Label=name
+			# refresh the gui at most 20 times per second
+			if time.time()-refresh > 0.05:
+				FreeCADGui.updateGui()
+				# FreeCADGui.SendMsgToActiveView("ViewFit")
+				refresh=time.time()
+				# the events processed by updateGui may have cancelled the import
+				if cancelled and cancelled():
+					sayErr("import cancelled")
+					App.ActiveDocument.abortTransaction()
+					if status:
+						status.setText("import cancelled.")
+					return False
+
+		# the multipolygon relations, their rings assembled from the member ways
+		# the old style ones, tagged on their outer way, are built as ways
+		wayrefs={}
+		for w in ways:
+			wayrefs[w.params['id']]=[n.params['ref'] for n in w.getiterator('nd')]
+		for r in relations:
+			rid=r.params['id']
+			tags={}
+			for t in r.getiterator('tag'):
+				tags[str(t.params['k'])]=t.params['v']
+			if tags.get('type')!='multipolygon' or len(tags)<2:
+				continue
+			members=[(m.params['type'],m.params['ref'],m.params.get('role','')) for m in r.getiterator('member')]
+			refs={}
+			pts={}
+			for typ,ref,role in members:
+				if typ=='way' and ref in wayrefs:
+					refs[ref]=wayrefs[ref]
+					pts[ref]=[(points[n].x,points[n].y,points[n].z) for n in wayrefs[ref]]
+			polygons,left=assemble_multipolygon(members,refs,pts)
+			if left:
+				say("relation " + rid + ": " + str(left) + " members out of its rings")
+
+			building='building' in tags
+			landuse=tags.get('landuse','')
+			name=tags.get('name',landuse or 'multipolygon')
+			h=0
+			try:
+				if 'building:levels' in tags:
+					h=int(str(tags['building:levels']))*1000*3
+				if 'building:height' in tags:
+					h=int(str(tags['building:height']))*1000
+			except:
+				sayErr("unexpected height of relation " + rid)
+
+			for outer,holes in polygons:
+				# the extrusions cut the holes out of the outer ring
+				z=App.ActiveDocument.addObject("Part::Feature","Shape")
+				z.Label="r_"+rid
+				z.Shape=Part.makeCompound([Part.makePolygon([FreeCAD.Vector(*p) for p in ring.tolist()]) for ring in [outer]+holes])
+
+				if building:
+					g=App.ActiveDocument.addObject("Part::Extrusion",name)
+					g.Base = z
+					g.ViewObject.ShapeColor = (1.00,1.00,1.00)
+					g.Dir = (0,0,h or 10000)
+					g.Solid=True
+					g.Label=name
+					inventortools.setcolors2(g)
+
+				if landuse:
+					g=App.ActiveDocument.addObject("Part::Extrusion",name)
+					g.Base = z
+					if landuse == 'residential':
+						g.ViewObject.ShapeColor = (1.00,.60,.60)
+					elif landuse == 'meadow':
+						g.ViewObject.ShapeColor = (0.00,1.00,0.00)
+					elif landuse == 'farmland':
+						g.ViewObject.ShapeColor = (.80,.80,.00)
+					elif landuse == 'forest':
+						g.ViewObject.ShapeColor = (1.0,.40,.40)
+					g.Dir = (0,0,0.1)
+					g.Label=name
+					g.Solid=True
+
+	except:
+		# no half imported ways left in the document
+		App.ActiveDocument.abortTransaction()
+		raise
+	App.ActiveDocument.commitTransaction()
+	App.ActiveDocument.recompute()
 	FreeCADGui.updateGui()
-	FreeCAD.activeDocument().recompute()
 
 	if status:
 		status.setText("import finished.")
@@ -740,6 +815,13 @@ MainWindow:
 			clicked.connect: app.applyData
 			setVisible: False
 
+		QtGui.QPushButton:
+			id:'cancel'
+			setText: "Cancel"
+			setFixedHeight: 20
+			clicked.connect: app.cancelImport
+			setVisible: False
+
 
 		QtGui.QPushButton:
 			setText: "Show openstreet map in web browser"
@@ -796,13 +878,29 @@ MainWindow:
 class MyApp(object):
 	'''execution layer of the Gui'''
 
+	cancelled=False
+
+	def cancelImport(self):
+		'''stops the running import at its next gui refresh'''
+		self.cancelled=True
+
+	def importData(self,b,l,s,elevation):
+		'''runs import_osm2 with the cancel button shown'''
+		self.cancelled=False
+		cancel=self.root.ids['cancel']
+		cancel.show()
+		try:
+			return import_osm2(b,l,s,self.root.ids['progb'],self.root.ids['status'],elevation,lambda: self.cancelled)
+		finally:
+			cancel.hide()
+
 
 	def run(self,b,l):
 		'''run(self,b,l) imports area with center coordinates latitude b, longitude l'''
 		s=self.root.ids['s'].value()
 		key="%0.7f" %(b) + "," + "%0.7f" %(l)
 		self.root.ids['bl'].setText(key)
-		import_osm2(b,l,float(s)/10,self.root.ids['progb'],self.root.ids['status'],False)
+		self.importData(b,l,float(s)/10,False)
 
 	def run_alex(self):
 		'''imports Berlin Aleancderplatz'''
@@ -905,7 +1003,7 @@ class MyApp(object):
 		s=self.root.ids['s'].value()
 		elevation=self.root.ids['elevation'].isChecked()
 
-		rc= import_osm2(float(b),float(l),float(s)/10,self.root.ids['progb'],self.root.ids['status'],elevation)
+		rc= self.importData(float(b),float(l),float(s)/10,elevation)
 		if not rc:
 			button=self.root.ids['runbl2']
 			button.show()
@@ -932,7 +1030,7 @@ class MyApp(object):
 		s=self.root.ids['s'].value()
 		elevation=self.root.ids['elevation'].isChecked()
 
-		import_osm2(float(b),float(l),float(s)/10,self.root.ids['progb'],self.root.ids['status'],elevation)
+		self.importData(float(b),float(l),float(s)/10,elevation)
 		button=self.root.ids['runbl1']
 		button.show()
 		br.hide()
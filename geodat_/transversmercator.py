@@ -10,6 +10,8 @@
 import os
 import math
 
+import numpy as np
+
 # see conversion formulas at
 # http://en.wikipedia.org/wiki/Transverse_Mercator_projection
 # and
@@ -47,4 +49,39 @@ class TransverseMercator:
         lat = math.degrees(lat)
         return (lat, lon)
 
+    def fromGeographicArray(self, lat, lon):
+        """Vectorized version of fromGeographic.
+
+        Args:
+            lat (array_like): the latitudes in degrees
+            lon (array_like): the longitudes in degrees
+
+        Returns:
+            tuple: the (x, y) numpy arrays
+        """
+        lat = np.radians(np.asarray(lat, dtype=np.float64))
+        lon = np.radians(np.asarray(lon, dtype=np.float64) - self.lon)
+        B = np.sin(lon) * np.cos(lat)
+        x = 0.5 * self.k * self.radius * np.log((1+B)/(1-B))
+        y = self.k * self.radius * ( np.arctan(np.tan(lat)/np.cos(lon)) - self.latInRadians )
+        return (x,y)
+
+    def toGeographicArray(self, x, y):
+        """Vectorized version of toGeographic.
 
+        Args:
+            x (array_like): the x coordinates
+            y (array_like): the y coordinates
+
+        Returns:
+            tuple: the (lat, lon) numpy arrays in degrees
+        """
+        x = np.asarray(x, dtype=np.float64)/(self.k * self.radius)
+        y = np.asarray(y, dtype=np.float64)/(self.k * self.radius)
+        D = y + self.latInRadians
+        lon = np.arctan(np.sinh(x)/np.cos(D))
+        lat = np.arcsin(np.sin(D)/np.cosh(x))
+
+        lon = self.lon + np.degrees(lon)
+        lat = np.degrees(lat)
+        return (lat, lon)
@@ -2,8 +2,13 @@ from .import_csv import import_csv
 from .import_emir import import_emir
 from .import_gpx import import_gpx
 from .import_lidar import import_lidar
-from .import_osm import import_osm
+from .import_osm import build_osm, import_osm, iter_build_osm, load_osm, make_osm_geometry, stream_osm
+from .export_osm import export_osm
+from .osm_cache import OsmCache
+from .progress import ImportCancelled
+from .scheduler import TimeSlicedScheduler
 from .TransverseMercator import TransverseMercator
+from .projection import EllipsoidalTransverseMercator, LocalTangentPlane, UTM
 
 __all__ = [
     "import_csv",
@@ -11,5 +16,17 @@ __all__ = [
     "import_gpx",
     "import_lidar",
     "import_osm",
-    "TransverseMercator"
+    "load_osm",
+    "stream_osm",
+    "build_osm",
+    "iter_build_osm",
+    "make_osm_geometry",
+    "export_osm",
+    "ImportCancelled",
+    "OsmCache",
+    "TimeSlicedScheduler",
+    "TransverseMercator",
+    "EllipsoidalTransverseMercator",
+    "LocalTangentPlane",
+    "UTM",
 ]
@@ -0,0 +1,284 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Micro-benchmarks for the GeoData2 import pipeline.
+
+Run them from the FreeCAD Python console::
+
+    import geodata2.benchmark
+    geodata2.benchmark.benchmark_projection()
+    geodata2.benchmark.benchmark_projections()
+    geodata2.benchmark.benchmark_lighting()
+    geodata2.benchmark.benchmark_bulk_creation()
+'''
+
+import time
+
+import numpy as np
+
+from .TransverseMercator import TransverseMercator
+from .projection import WGS84, EllipsoidalTransverseMercator, LocalTangentPlane, UTM
+
+def _random_coordinates(count, latitude=41.64, longitude=-0.92, delta=0.05, seed=0):
+    """Returns random coordinates around the given location.
+
+    Args:
+        count (int): the number of coordinates
+        latitude (float, optional): the latitude of the center. Defaults to 41.64.
+        longitude (float, optional): the longitude of the center. Defaults to -0.92.
+        delta (float, optional): the half size of the area in degree. Defaults to 0.05.
+        seed (int, optional): the random seed. Defaults to 0.
+
+    Returns:
+        tuple: the (lat, lon) numpy arrays
+    """
+    rng = np.random.default_rng(seed)
+    lats = latitude + rng.uniform(-delta, delta, count)
+    lons = longitude + rng.uniform(-delta, delta, count)
+    return (lats, lons)
+
+def _timeit(func, *args):
+    """Returns the result of func(*args) and the time it took in seconds."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def benchmark_projection(count=1000000):
+    """Compare the scalar and the vectorized TransverseMercator projections.
+
+    Args:
+        count (int, optional): the number of points to project. Defaults to 1000000.
+
+    Returns:
+        dict: the timings in seconds and the maximum deviation in mm
+    """
+    tm = TransverseMercator()
+    (lats, lons) = _random_coordinates(count)
+
+    def __scalar(lats, lons):
+        return [ tm.fromGeographic(lat, lon) for lat, lon in zip(lats.tolist(), lons.tolist()) ]
+    (scalar, scalar_time) = _timeit(__scalar, lats, lons)
+    ((xs, ys), array_time) = _timeit(tm.fromGeographicArray, lats, lons)
+
+    (sx, sy) = (np.array(c) for c in zip(*scalar))
+    deviation = max(np.abs(sx - xs).max(), np.abs(sy - ys).max())
+
+    results = {
+        "count": count,
+        "scalar": scalar_time,
+        "array": array_time,
+        "speedup": scalar_time / array_time if array_time else float('inf'),
+        "max_deviation": float(deviation),
+    }
+    print(f"fromGeographic: {count} points, scalar {scalar_time:.3f}s, "
+          f"array {array_time:.3f}s, speedup x{results['speedup']:.1f}, "
+          f"max deviation {deviation:.3g} mm")
+    return results
+
+def _scale_error(projection, lats, lons, step=1e-5):
+    """Returns the relative error of the projected length of small segments.
+
+    The ground length of a segment of `step` degree going north and east
+    from each point is computed with the radii of curvature of the WGS84
+    ellipsoid and compared to its length in the projection.
+
+    Args:
+        projection (object): the projection
+        lats (numpy.ndarray): the latitudes
+        lons (numpy.ndarray): the longitudes
+        step (float, optional): the segment length in degree. Defaults to 1e-5.
+
+    Returns:
+        numpy.ndarray: the absolute relative error of each point
+    """
+    e2 = WGS84.f * (2 - WGS84.f)
+    sin2 = np.sin(np.radians(lats))**2
+    M = WGS84.a * (1 - e2) / (1 - e2 * sin2)**1.5
+    N = WGS84.a / np.sqrt(1 - e2 * sin2)
+    (x0, y0) = projection.fromGeographicArray(lats, lons)
+    (xn, yn) = projection.fromGeographicArray(lats + step, lons)
+    (xe, ye) = projection.fromGeographicArray(lats, lons + step)
+    ground_north = M * np.radians(step)
+    ground_east = N * np.cos(np.radians(lats)) * np.radians(step)
+    error_north = np.abs(np.hypot(xn - x0, yn - y0) / 1000 / ground_north - 1)
+    error_east = np.abs(np.hypot(xe - x0, ye - y0) / 1000 / ground_east - 1)
+    return np.maximum(error_north, error_east)
+
+def benchmark_projections(count=1000000, latitude=41.64, longitude=-0.92, delta=0.5):
+    """Compare the accuracy and the throughput of the available projections.
+
+    The accuracy is the distortion of the lengths measured on the
+    projection (in ppm, i.e. mm per km) and the round trip error of the
+    inverse projection (in mm).
+
+    Args:
+        count (int, optional): the number of points to project. Defaults to 1000000.
+        latitude (float, optional): the latitude of the center. Defaults to 41.64.
+        longitude (float, optional): the longitude of the center. Defaults to -0.92.
+        delta (float, optional): the half size of the area in degree. Defaults to 0.5.
+
+    Returns:
+        dict: the results by projection name
+    """
+    (lats, lons) = _random_coordinates(count, latitude, longitude, delta)
+    projections = {
+        "spherical (origin 0,0)": TransverseMercator(),
+        "spherical (centered)": TransverseMercator(lat=latitude, lon=longitude),
+        "ellipsoidal TM": EllipsoidalTransverseMercator(lat=latitude, lon=longitude),
+        "UTM": UTM.for_location(latitude, longitude),
+        "local ENU": LocalTangentPlane(lat=latitude, lon=longitude),
+    }
+    results = {}
+    for name, projection in projections.items():
+        ((xs, ys), forward_time) = _timeit(projection.fromGeographicArray, lats, lons)
+        ((lats2, lons2), inverse_time) = _timeit(projection.toGeographicArray, xs, ys)
+        (xs2, ys2) = projection.fromGeographicArray(lats2, lons2)
+        scale_error = _scale_error(projection, lats, lons) * 1e6
+        results[name] = {
+            "forward": forward_time,
+            "inverse": inverse_time,
+            "points_per_second": count / forward_time if forward_time else float('inf'),
+            "max_scale_error_ppm": float(scale_error.max()),
+            "mean_scale_error_ppm": float(scale_error.mean()),
+            "max_round_trip_mm": float(np.hypot(xs2 - xs, ys2 - ys).max()),
+        }
+        print(f"{name:24s} forward {forward_time:.3f}s inverse {inverse_time:.3f}s "
+              f"({results[name]['points_per_second']/1e6:.1f} Mpts/s) "
+              f"scale error max {results[name]['max_scale_error_ppm']:.1f} ppm "
+              f"mean {results[name]['mean_scale_error_ppm']:.1f} ppm "
+              f"round trip {results[name]['max_round_trip_mm']:.3g} mm")
+    return results
+
+def benchmark_lighting(count=10000, frames=10, width=800, height=600):
+    """Compare the frame time of per building lights and of group lights.
+
+    A grid of `count` cubes is rendered off-screen, first with a group of 6
+    directional lights per cube (as setcolors2 used to do), then with a
+    single light group shared by all the cubes under one SoSeparator (as the
+    App::Part of the buildings lit by setcolors2 does).
+
+    Args:
+        count (int, optional): the number of buildings. Defaults to 10000.
+        frames (int, optional): the number of frames to render. Defaults to 10.
+        width (int, optional): the width of the viewport. Defaults to 800.
+        height (int, optional): the height of the viewport. Defaults to 600.
+
+    Returns:
+        dict: the mean frame time in seconds by lighting mode
+    """
+    from pivy import coin
+    from .inventortools import COLORS2_LIGHTS, make_lights
+
+    viewport = coin.SbViewportRegion(width, height)
+    side = int(np.ceil(np.sqrt(count)))
+
+    def __scene(group_lights):
+        root = coin.SoSeparator()
+        camera = coin.SoPerspectiveCamera()
+        root.addChild(camera)
+        # the rest of the scene, outside of the reach of the lights
+        root.addChild(coin.SoCube())
+        buildings = coin.SoSeparator()
+        if group_lights:
+            buildings.addChild(make_lights(COLORS2_LIGHTS))
+        for i in range(count):
+            building = coin.SoSeparator()
+            if not group_lights:
+                building.addChild(make_lights(COLORS2_LIGHTS))
+            translation = coin.SoTranslation()
+            translation.translation.setValue(3*(i % side), 3*(i // side), 0)
+            building.addChild(translation)
+            building.addChild(coin.SoCube())
+            buildings.addChild(building)
+        root.addChild(buildings)
+        camera.viewAll(root, viewport)
+        return root
+
+    renderer = coin.SoOffscreenRenderer(viewport)
+    results = {}
+    for name, group_lights in (("per building", False), ("group", True)):
+        root = __scene(group_lights)
+        renderer.render(root)
+        start = time.perf_counter()
+        for _ in range(frames):
+            renderer.render(root)
+        results[name] = (time.perf_counter() - start) / frames
+        light_count = 6 if group_lights else 6*count
+        print(f"{name:12s} lights: {count} buildings, {light_count} light node(s), "
+              f"{results[name]*1000:.1f} ms per frame")
+    return results
+
+def benchmark_bulk_creation(count=20000):
+    """Compare the creation of many document objects with and without BulkMode.
+
+    For each mode, a new document is filled with `count` polygons, each of
+    them extruded by a Part::Extrusion named "Building" (as ObjectBuilder
+    does), then recomputed: twice at the end for the plain mode, as the
+    importer used to do, once on exit for BulkMode.
+
+    Args:
+        count (int, optional): the number of buildings. Defaults to 20000.
+
+    Returns:
+        dict: the time in seconds by mode
+    """
+    import FreeCAD as App
+    import Part
+    from .document_tools import BulkMode
+
+    polygons = [ Part.makePolygon([
+        App.Vector(3000*i, 0, 0),
+        App.Vector(3000*i + 1000, 0, 0),
+        App.Vector(3000*i + 1000, 1000, 0),
+        App.Vector(3000*i, 0, 0),
+    ]) for i in range(count) ]
+
+    def __plain(document):
+        for polygon in polygons:
+            feature = document.addObject("Part::Feature", "Shape")
+            feature.Shape = polygon
+            extrusion = document.addObject("Part::Extrusion", "Building")
+            extrusion.Base = feature
+            extrusion.Dir = (0, 0, 10000)
+            extrusion.Solid = True
+        document.recompute()
+        document.recompute()
+
+    def __bulk(document):
+        with BulkMode(document, "Benchmark") as bulk:
+            for polygon in polygons:
+                feature = bulk.add_object("Part::Feature", base="Shape")
+                feature.Shape = polygon
+                extrusion = bulk.add_object("Part::Extrusion", "Building")
+                extrusion.Base = feature
+                extrusion.Dir = (0, 0, 10000)
+                extrusion.Solid = True
+
+    results = {}
+    for name, func in (("plain", __plain), ("bulk", __bulk)):
+        document = App.newDocument(f"Benchmark_{name}")
+        document.UndoMode = 1
+        (_, results[name]) = _timeit(func, document)
+        App.closeDocument(document.Name)
+        print(f"{name:6s} creation: {count} buildings, {results[name]:.3f}s")
+    return results
@@ -0,0 +1,145 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Clipping of polygons and polylines to an axis aligned rectangle.
+
+The polygons are clipped with Sutherland-Hodgman and the polylines with
+Liang-Barsky, both vectorized with NumPy over all the edges of a way. The
+points are (n, d) arrays whose first 2 columns are x and y; the other
+columns (e.g. z) are interpolated along the clipped edges.
+
+The rectangle is given as (xmin, ymin, xmax, ymax).
+'''
+
+import numpy as np
+
+def classify(point_arrays, rect):
+    """Returns which point arrays are entirely inside, or entirely outside, the rectangle.
+
+    NOTE: a polyline whose bounding box overlaps the rectangle can still
+    miss it, it is then removed by the clipping.
+
+    Args:
+        point_arrays (list): the (n, d) point arrays, not empty
+        rect (tuple): the (xmin, ymin, xmax, ymax) of the rectangle
+
+    Returns:
+        tuple: the boolean arrays of the ones inside and of the ones outside
+    """
+    lengths = np.array([ len(points) for points in point_arrays ])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    xy = np.concatenate([ points[:, :2] for points in point_arrays ])
+    mins = np.minimum.reduceat(xy, starts)
+    maxs = np.maximum.reduceat(xy, starts)
+    (lower, upper) = (np.array(rect[:2]), np.array(rect[2:]))
+    inside = (mins >= lower).all(axis=1) & (maxs <= upper).all(axis=1)
+    outside = (maxs < lower).any(axis=1) | (mins > upper).any(axis=1)
+    return (inside, outside)
+
+def _clip_half_plane(points, axis, value, keep_greater):
+    """One pass of Sutherland-Hodgman, against a single side of the rectangle.
+
+    Args:
+        points (numpy.ndarray): the (n, d) points of the ring, without repeating the first one
+        axis (int): 0 for x, 1 for y
+        value (float): the coordinate of the side
+        keep_greater (bool): whether the inside is the greater coordinates
+
+    Returns:
+        numpy.ndarray: the points of the clipped ring
+    """
+    following = np.roll(points, -1, axis=0)
+    (c, c_following) = (points[:, axis], following[:, axis])
+    inside = c >= value if keep_greater else c <= value
+    inside_following = np.roll(inside, -1)
+    crossing = inside != inside_following
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (value - c) / (c_following - c)
+        intersections = points + t[:, None]*(following - points)
+    intersections[:, axis] = value
+    # NOTE: each edge outputs its intersection with the side if it crosses
+    #   it, then its end point if inside, in that order.
+    candidates = np.stack((intersections, following), axis=1)
+    keep = np.stack((crossing, inside_following), axis=1)
+    return candidates[keep]
+
+def clip_polygon(points, rect):
+    """Clip a closed ring to the rectangle.
+
+    Args:
+        points (numpy.ndarray): the (n, d) points of the ring, the last one repeating the first one
+        rect (tuple): the (xmin, ymin, xmax, ymax) of the rectangle
+
+    Returns:
+        numpy.ndarray: the points of the clipped ring, closed, None if nothing is left
+    """
+    (xmin, ymin, xmax, ymax) = rect
+    ring = points[:-1]
+    for axis, value, keep_greater in ((0, xmin, True), (0, xmax, False), (1, ymin, True), (1, ymax, False)):
+        if len(ring) < 3:
+            return None
+        ring = _clip_half_plane(ring, axis, value, keep_greater)
+    if len(ring) < 3:
+        return None
+    return np.concatenate((ring, ring[:1]))
+
+def clip_polyline(points, rect):
+    """Clip a polyline to the rectangle.
+
+    The polyline is split in several pieces when it leaves the rectangle
+    and comes back.
+
+    Args:
+        points (numpy.ndarray): the (n, d) points of the polyline
+        rect (tuple): the (xmin, ymin, xmax, ymax) of the rectangle
+
+    Returns:
+        list: the (m, d) points of each piece inside the rectangle
+    """
+    (start, end) = (points[:-1], points[1:])
+    delta = end - start
+    t0 = np.zeros(len(delta))
+    t1 = np.ones(len(delta))
+    visible = np.ones(len(delta), dtype=bool)
+    for axis, low, high in ((0, rect[0], rect[2]), (1, rect[1], rect[3])):
+        (d, s) = (delta[:, axis], start[:, axis])
+        parallel = d == 0
+        visible &= ~parallel | ((s >= low) & (s <= high))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            (t_low, t_high) = ((low - s) / d, (high - s) / d)
+        t0 = np.maximum(t0, np.where(parallel, 0.0, np.minimum(t_low, t_high)))
+        t1 = np.minimum(t1, np.where(parallel, 1.0, np.maximum(t_low, t_high)))
+    visible &= t0 < t1
+    if not visible.any():
+        return []
+    # NOTE: a piece goes on with the next segment if both are visible and
+    #   not clipped where they meet.
+    joined = np.zeros(len(delta), dtype=bool)
+    joined[1:] = visible[:-1] & (t1[:-1] == 1.0) & (t0[1:] == 0.0)
+    first = visible & ~joined
+    candidates = np.stack((start + t0[:, None]*delta, start + t1[:, None]*delta), axis=1)
+    keep = np.stack((first, visible), axis=1)
+    clipped = candidates[keep]
+    # the index of the first point of each piece, in the clipped points
+    starts = (np.cumsum(keep.ravel()) - 1)[np.stack((first, np.zeros_like(first)), axis=1).ravel()]
+    return np.split(clipped, starts[1:])
@@ -0,0 +1,210 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Visualization only rendering of the OSM ways directly in the Coin3D scene graph.'''
+
+import numpy as np
+
+import FreeCAD as App
+
+if App.GuiUp:
+    from pivy import coin
+
+from .mesh_tools import as_ring, roof_triangles, wall_strip
+from .osm_builders import DEFAULT_BUILDING_HEIGHT, HIGHWAY_COLOR
+
+ROOF_COLOR = (0.85,0.35,0.30)
+WALL_COLOR = (0.95,0.95,0.90)
+HIGHWAY_LINE_WIDTH = 3
+
+class OsmScene:
+    """Document object holding the scene graph built by CoinBuilder.
+
+    NOTE: the scene graph is not saved with the document.
+    """
+
+    def __init__(self, obj):
+        obj.Proxy = self
+
+    def __getstate__(self):
+        return None
+
+    def __setstate__(self, state):
+        return None
+
+class ViewProviderOsmScene:
+    """View provider exposing the scene graph under its root node."""
+
+    def __init__(self, vobj):
+        vobj.Proxy = self
+
+    def attach(self, vobj):
+        self.scene = coin.SoSeparator()
+        vobj.addDisplayMode(self.scene, "Default")
+
+    def getDisplayModes(self, vobj):
+        return ["Default"]
+
+    def getDefaultDisplayMode(self):
+        return "Default"
+
+    def setDisplayMode(self, mode):
+        return mode
+
+    def __getstate__(self):
+        return None
+
+    def __setstate__(self, state):
+        return None
+
+def _face_set(vertices, triangles, colors):
+    """Returns a separator holding a single SoIndexedFaceSet.
+
+    Args:
+        vertices (numpy.ndarray): the (n, 3) vertices
+        triangles (numpy.ndarray): the (m, 3) triangles
+        colors (numpy.ndarray): the (n, 3) per vertex colors
+
+    Returns:
+        coin.SoSeparator: the separator
+    """
+    separator = coin.SoSeparator()
+    hints = coin.SoShapeHints()
+    hints.vertexOrdering = coin.SoShapeHints.COUNTERCLOCKWISE
+    hints.shapeType = coin.SoShapeHints.UNKNOWN_SHAPE_TYPE
+    separator.addChild(hints)
+    coordinates = coin.SoCoordinate3()
+    coordinates.point.setValues(0, len(vertices), vertices.astype(np.float32).tolist())
+    separator.addChild(coordinates)
+    material = coin.SoMaterial()
+    material.diffuseColor.setValues(0, len(colors), colors.astype(np.float32).tolist())
+    separator.addChild(material)
+    binding = coin.SoMaterialBinding()
+    # NOTE: without materialIndex, the coordIndex is used to index the colors
+    binding.value = coin.SoMaterialBinding.PER_VERTEX_INDEXED
+    separator.addChild(binding)
+    faces = coin.SoIndexedFaceSet()
+    indices = np.hstack((triangles, np.full((len(triangles), 1), -1))).ravel()
+    faces.coordIndex.setValues(0, len(indices), indices.tolist())
+    separator.addChild(faces)
+    return separator
+
+def _line_set(vertices, lines, color, width):
+    """Returns a separator holding a single SoIndexedLineSet.
+
+    Args:
+        vertices (numpy.ndarray): the (n, 3) vertices
+        lines (numpy.ndarray): the polyline indices, separated by -1
+        color (tuple): the color of the lines
+        width (float): the width of the lines
+
+    Returns:
+        coin.SoSeparator: the separator
+    """
+    separator = coin.SoSeparator()
+    style = coin.SoDrawStyle()
+    style.lineWidth = width
+    separator.addChild(style)
+    base_color = coin.SoBaseColor()
+    base_color.rgb = color
+    separator.addChild(base_color)
+    coordinates = coin.SoCoordinate3()
+    coordinates.point.setValues(0, len(vertices), vertices.astype(np.float32).tolist())
+    separator.addChild(coordinates)
+    line_set = coin.SoIndexedLineSet()
+    line_set.coordIndex.setValues(0, len(lines), lines.tolist())
+    separator.addChild(line_set)
+    return separator
+
+class CoinBuilder:
+    """Renders the buildings and the highways directly as Coin3D nodes.
+
+    All the building walls and roofs end up in a single SoIndexedFaceSet
+    with per vertex colors and all the highways in a single
+    SoIndexedLineSet, under the root of a single view provider. No OCC shape
+    is created, which keeps large cities interactive. Landuses and paths
+    are not rendered.
+
+    Args:
+        bulk (BulkMode): the bulk mode of the document to add the scene to
+    """
+
+    def __init__(self, bulk):
+        self.bulk = bulk
+        self.document = bulk.document
+        self.face_vertices = []
+        self.face_triangles = []
+        self.face_colors = []
+        self.face_count = 0
+        self.line_vertices = []
+        self.line_indices = []
+        self.line_count = 0
+
+    def _add_triangles(self, vertices, triangles, color):
+        if not len(triangles):
+            return
+        self.face_vertices.append(vertices)
+        self.face_triangles.append(triangles + self.face_count)
+        self.face_colors.append(np.tile(color, (len(vertices), 1)))
+        self.face_count += len(vertices)
+
+    def add_way(self, way_id, name, fc_points, building=None, building_height=0, landuse=None, highway=None, holes=None):
+        if building:
+            ring = as_ring(fc_points)
+            if len(ring) < 3:
+                return
+            if building_height == 0:
+                building_height = DEFAULT_BUILDING_HEIGHT
+            hole_rings = [ hole for hole in (as_ring(hole) for hole in holes or ()) if len(hole) >= 3 ]
+            for wall in [ring, *hole_rings]:
+                self._add_triangles(*wall_strip(wall, building_height), WALL_COLOR)
+            up = np.array([0.0, 0.0, building_height])
+            self._add_triangles(*roof_triangles(ring + up, [ hole + up for hole in hole_rings ]), ROOF_COLOR)
+
+        if highway:
+            points = np.array([ (p.x, p.y, p.z) for p in fc_points ], dtype=np.float64)
+            self.line_vertices.append(points)
+            self.line_indices.append(np.append(np.arange(len(points)) + self.line_count, -1))
+            self.line_count += len(points)
+
+    def finish(self):
+        """Create the document object holding the whole scene."""
+        if not App.GuiUp:
+            return None
+        obj = self.bulk.add_object("App::FeaturePython", base="OsmScene")
+        OsmScene(obj)
+        ViewProviderOsmScene(obj.ViewObject)
+        scene = obj.ViewObject.Proxy.scene
+        if self.face_vertices:
+            scene.addChild(_face_set(
+                np.concatenate(self.face_vertices),
+                np.concatenate(self.face_triangles),
+                np.concatenate(self.face_colors)))
+        if self.line_vertices:
+            scene.addChild(_line_set(
+                np.concatenate(self.line_vertices),
+                np.concatenate(self.line_indices),
+                HIGHWAY_COLOR,
+                HIGHWAY_LINE_WIDTH))
+        App.Console.PrintLog(f"Rendered {self.face_count} face vertice(s) and {self.line_count} line vertice(s) ...\n")
+        return obj
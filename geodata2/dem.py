@@ -0,0 +1,228 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Elevations from local DEM (Digital Elevation Model) files.
+
+The supported formats are:
+- the SRTM .hgt tiles (e.g. N50E011.hgt), memory mapped;
+- the GeoTIFF files, e.g. the ASTER GDEM tiles (ASTGTM2_N50E011_dem.tif),
+  read with GDAL if installed;
+- the ESRI ASCII grids (.asc), one line per row from north to south.
+
+NOTE: the grids must use geographic (WGS84 latitude / longitude)
+coordinates, as the elevations are looked up by latitude / longitude.
+The EMIR files of import_emir (.dat) are therefore not supported: they
+use the ESRI header, but list one line per column, in local metres with
+no geographic reference.
+
+Usage::
+
+    provider = DemElevationProvider.from_directory(directory)
+    elevations = provider.elevations(lats, lons)
+'''
+
+import glob
+import os
+import re
+
+import numpy as np
+
+import FreeCAD as App
+
+# The extensions of the supported DEM files
+DEM_EXTENSIONS = (".hgt", ".tif", ".tiff", ".asc")
+# The no data value of the SRTM tiles
+SRTM_NODATA = -32768
+
+class DemGrid:
+    """A regular grid of elevations.
+
+    The sample data[r, c] is the elevation at the latitude north - r*dlat
+    and the longitude west + c*dlon.
+
+    Args:
+        data (numpy.ndarray): the elevations in meters, the first row being the northernmost
+        north (float): the latitude of the first row
+        west (float): the longitude of the first column
+        dlat (float): the latitude step between 2 rows
+        dlon (float): the longitude step between 2 columns
+        nodata (float, optional): the value of the missing samples. Defaults to None.
+    """
+
+    def __init__(self, data, north, west, dlat, dlon, nodata=None):
+        self.data = data
+        self.north = north
+        self.west = west
+        self.dlat = dlat
+        self.dlon = dlon
+        self.nodata = nodata
+
+    @property
+    def bounds(self):
+        """Returns the (minlat, minlon, maxlat, maxlon) of the samples."""
+        (rows, cols) = self.data.shape
+        return (self.north - (rows - 1)*self.dlat, self.west, self.north, self.west + (cols - 1)*self.dlon)
+
+    def sample(self, lats, lons):
+        """Returns the bilinear interpolation of the elevations at locations.
+
+        Args:
+            lats (numpy.ndarray): the latitudes
+            lons (numpy.ndarray): the longitudes
+
+        Returns:
+            numpy.ndarray: the elevations in meters, NaN outside of the grid or next to a missing sample
+        """
+        (rows, cols) = self.data.shape
+        r = (self.north - np.asarray(lats, dtype=np.float64)) / self.dlat
+        c = (np.asarray(lons, dtype=np.float64) - self.west) / self.dlon
+        inside = (r >= 0) & (r <= rows - 1) & (c >= 0) & (c <= cols - 1)
+        r0 = np.clip(np.floor(r[inside]).astype(np.intp), 0, max(rows - 2, 0))
+        c0 = np.clip(np.floor(c[inside]).astype(np.intp), 0, max(cols - 2, 0))
+        (r1, c1) = (np.minimum(r0 + 1, rows - 1), np.minimum(c0 + 1, cols - 1))
+        (fr, fc) = (r[inside] - r0, c[inside] - c0)
+        corners = []
+        for (ri, ci) in ((r0, c0), (r0, c1), (r1, c0), (r1, c1)):
+            values = np.asarray(self.data[ri, ci], dtype=np.float64)
+            if self.nodata is not None:
+                values[values == self.nodata] = np.nan
+            corners.append(values)
+        (v00, v01, v10, v11) = corners
+        elevations = np.full(r.shape, np.nan)
+        elevations[inside] = (v00*(1 - fc) + v01*fc)*(1 - fr) + (v10*(1 - fc) + v11*fc)*fr
+        return elevations
+
+def _load_hgt(path):
+    match = re.search(r"([NS])(\d{2})([EW])(\d{3})", os.path.basename(path).upper())
+    if not match:
+        raise ValueError(f"Invalid SRTM tile name '{path}', expected e.g. N50E011.hgt")
+    south = int(match.group(2)) * (1 if match.group(1) == "N" else -1)
+    west = int(match.group(4)) * (1 if match.group(3) == "E" else -1)
+    # 1201x1201 samples for SRTM3, 3601x3601 for SRTM1
+    size = int(round((os.path.getsize(path) // 2)**0.5))
+    data = np.memmap(path, dtype=">i2", mode="r", shape=(size, size))
+    return DemGrid(data, south + 1, west, 1/(size - 1), 1/(size - 1), SRTM_NODATA)
+
+def _load_geotiff(path):
+    try:
+        from osgeo import gdal
+    except ImportError:
+        raise ImportError(f"GDAL is required to read '{path}'")
+    dataset = gdal.Open(path, gdal.GA_ReadOnly)
+    if dataset is None:
+        raise ValueError(f"Cannot open '{path}'")
+    band = dataset.GetRasterBand(1)
+    data = band.ReadAsArray()
+    (origin_x, pixel_width, _, origin_y, _, pixel_height) = dataset.GetGeoTransform()
+    # NOTE: the origin is the corner of the first pixel, not its center
+    return DemGrid(data, origin_y + pixel_height/2, origin_x + pixel_width/2, -pixel_height, pixel_width, band.GetNoDataValue())
+
+def _load_esri_ascii(path):
+    props = {}
+    with open(path, "r", encoding="utf-8") as f:
+        header_lines = 0
+        for line in f:
+            tokens = line.split()
+            if not tokens or not tokens[0][0].isalpha():
+                break
+            props[tokens[0].lower()] = float(tokens[1])
+            header_lines += 1
+        f.seek(0)
+        data = np.loadtxt(f, skiprows=header_lines, ndmin=2)
+    (nrows, cellsize) = (int(props['nrows']), props['cellsize'])
+    if 'xllcenter' in props:
+        (west, south) = (props['xllcenter'], props['yllcenter'])
+    else:
+        (west, south) = (props['xllcorner'] + cellsize/2, props['yllcorner'] + cellsize/2)
+    return DemGrid(data, south + (nrows - 1)*cellsize, west, cellsize, cellsize, props.get('nodata_value'))
+
+def load_dem(path):
+    """Load a DEM file.
+
+    Args:
+        path (str): the path of a .hgt, .tif or .asc file
+
+    Returns:
+        DemGrid: the grid
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".hgt":
+        return _load_hgt(path)
+    if extension in (".tif", ".tiff"):
+        return _load_geotiff(path)
+    if extension == ".asc":
+        return _load_esri_ascii(path)
+    raise ValueError(f"Unsupported DEM file '{path}', expected one of {', '.join(DEM_EXTENSIONS)}")
+
+class DemElevationProvider:
+    """Elevations sampled from local DEM files.
+
+    A location covered by several grids takes the elevation of the first
+    one defining it.
+
+    Args:
+        grids (list): the DemGrid
+    """
+
+    name = "dem"
+    # NOTE: sampling the grids is faster than looking up the ElevationCache
+    cache_results = False
+
+    def __init__(self, grids):
+        self.grids = grids
+
+    @classmethod
+    def from_directory(cls, directory):
+        """Returns the provider of the DEM files of a directory."""
+        paths = sorted(path for path in glob.glob(os.path.join(directory, "*")) if path.lower().endswith(DEM_EXTENSIONS))
+        grids = []
+        for path in paths:
+            try:
+                grids.append(load_dem(path))
+            except (ImportError, ValueError, OSError) as e:
+                App.Console.PrintWarning(f"Ignoring DEM file '{path}': {e}\n")
+        App.Console.PrintLog(f"Loaded {len(grids)} DEM file(s) from '{directory}' ...\n")
+        return cls(grids)
+
+    def elevations(self, lats, lons, callback=None):
+        """Returns the elevations of locations.
+
+        Args:
+            lats (numpy.ndarray): the latitudes
+            lons (numpy.ndarray): the longitudes
+            callback (func, optional): called as callback(done, total) with the number of grids
+                sampled so far. Defaults to None.
+
+        Returns:
+            numpy.ndarray: the elevations in meters, NaN if not covered
+        """
+        (lats, lons) = (np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64))
+        elevations = np.full(len(lats), np.nan)
+        for i, grid in enumerate(self.grids):
+            missing = np.flatnonzero(np.isnan(elevations))
+            if not len(missing):
+                break
+            elevations[missing] = grid.sample(lats[missing], lons[missing])
+            if callback:
+                callback(i + 1, len(self.grids))
+        return elevations
@@ -0,0 +1,144 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import re
+
+import FreeCAD as App
+
+class BulkMode:
+    """Context manager used to create many document objects at once.
+
+    While active:
+    - all the changes are recorded in a single undo transaction (or not
+      recorded at all if `undo` is False), so that the whole import can be
+      undone in one step;
+    - the objects created through ``add_object`` get an internal name that
+      is known to be unique, which spares FreeCAD the search for a free
+      name (linear in the number of objects sharing the same base name);
+    - the recomputes are frozen and a single recompute is run on exit.
+
+    Usage::
+
+        with BulkMode(document, "Import OSM") as bulk:
+            obj = bulk.add_object("Part::Feature", "Building")
+
+    Args:
+        document (App.Document): the document
+        name (str, optional): the name of the undo transaction. Defaults to "Import".
+        undo (bool, optional): whether to record the changes for undo. Defaults to True.
+        recompute (bool, optional): whether to recompute the document on exit. Defaults to True.
+    """
+
+    def __init__(self, document, name="Import", undo=True, recompute=True):
+        self.document = document
+        self.name = name
+        self.undo = undo
+        self.recompute = recompute
+        self.count = 0
+        self._names = set()
+        self._counters = {}
+        self._pending = []
+        self._undo_mode = None
+        self._recomputes_frozen = None
+
+    def __enter__(self):
+        self._names = { obj.Name for obj in self.document.Objects }
+        if self.undo:
+            self.document.openTransaction(self.name)
+        else:
+            self._undo_mode = self.document.UndoMode
+            self.document.UndoMode = 0
+        if hasattr(self.document, "RecomputesFrozen"):
+            self._recomputes_frozen = self.document.RecomputesFrozen
+            self.document.RecomputesFrozen = True
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._recomputes_frozen is not None:
+            self.document.RecomputesFrozen = self._recomputes_frozen
+        if self.undo:
+            if exc_type is None:
+                self.document.commitTransaction()
+            else:
+                self.document.abortTransaction()
+        else:
+            self.document.UndoMode = self._undo_mode
+        if self.recompute and exc_type is None:
+            self.document.recompute()
+        App.Console.PrintLog(f"Created {self.count} object(s) in bulk ...\n")
+        return False
+
+    def unique_name(self, base):
+        """Returns an internal name not yet used in the document.
+
+        Args:
+            base (str): the base of the name, sanitized into an identifier
+
+        Returns:
+            str: the name
+        """
+        base = re.sub(r'\W', '_', base, flags=re.ASCII) or "Object"
+        if base[0].isdigit():
+            base = f"_{base}"
+        counter = self._counters.get(base, 0)
+        name = base if counter == 0 else f"{base}{counter:03d}"
+        while name in self._names:
+            counter += 1
+            name = f"{base}{counter:03d}"
+        self._counters[base] = counter + 1
+        self._names.add(name)
+        return name
+
+    def add_object(self, type_name, label=None, base=None):
+        """Add an object to the document with a pre-generated unique name.
+
+        Args:
+            type_name (str): the type of the object (e.g. "Part::Feature")
+            label (str, optional): the label of the object. Defaults to the name.
+            base (str, optional): the base of the internal name. Defaults to the type name.
+
+        Returns:
+            App.DocumentObject: the object
+        """
+        name = self.unique_name(base or type_name.split("::")[-1])
+        obj = self.document.addObject(type_name, name)
+        if label is not None:
+            obj.Label = label
+        self.count += 1
+        self._pending.append(obj)
+        return obj
+
+    def flush(self):
+        """Recompute the objects added since the last flush.
+
+        Used to display the objects created so far when the import is
+        interleaved with the event loop. Each object is still recomputed
+        only once, as it is no longer touched for the final recompute.
+        """
+        if self._recomputes_frozen is not None:
+            self.document.RecomputesFrozen = False
+        for obj in self._pending:
+            obj.recompute()
+        if self._recomputes_frozen is not None:
+            self.document.RecomputesFrozen = True
+        self._pending = []
@@ -0,0 +1,241 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Elevation lookups.
+
+The coordinates are deduplicated, looked up in the ElevationCache, then
+the missing ones are resolved by a provider in batches sent concurrently,
+under a rate limit, and the elevations are fanned back to the coordinates.
+
+The provider is either the Google Elevation API or local DEM files, see
+make_elevation_provider().
+
+Usage::
+
+    provider = make_elevation_provider()
+    elevations = lookup_elevations(lats, lons, provider, cache=ElevationCache.from_preferences())
+'''
+
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+import FreeCAD as App
+
+from .dem import DemElevationProvider
+from .http_client import get_client
+
+GCP_ELEVATION_API_URL = "https://maps.googleapis.com/maps/api/elevation/json"
+# REF: https://developers.google.com/maps/documentation/elevation/requests-elevation
+#   at most 512 locations per request
+MAX_BATCH_SIZE = 512
+# The maximum number of concurrent requests
+MAX_WORKERS = 4
+# The sustained number of requests per second
+REQUESTS_PER_SECOND = 10
+API_MAX_RETRY = 4
+# The maximum delay before the first retry of an OVER_QUERY_LIMIT, in seconds
+OVER_QUERY_LIMIT_BACKOFF = 1.0
+# The values of the ElevationProvider preference
+ELEVATION_PROVIDERS = ("google", "dem")
+# The coordinates closer than that (~10 cm) share their elevation, as in
+# the ElevationCache
+COORDINATE_DECIMALS = 6
+
+class TokenBucket:
+    """Thread safe token bucket rate limiter.
+
+    Args:
+        rate (float): the number of tokens added per second
+        capacity (float, optional): the maximum number of tokens, i.e. the burst size. Defaults to rate.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self._time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Wait until the given number of tokens is available, and take them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._time)*self.rate)
+                self._time = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                delay = (tokens - self.tokens)/self.rate
+            time.sleep(delay)
+
+class GoogleElevationProvider:
+    """Elevations from the Google Elevation API.
+
+    Args:
+        api_key (str): the API key
+        url (str, optional): the URL of the API. Defaults to GCP_ELEVATION_API_URL.
+        batch_size (int, optional): the number of locations per request. Defaults to MAX_BATCH_SIZE.
+        workers (int, optional): the maximum number of concurrent requests. Defaults to MAX_WORKERS.
+        rate (float, optional): the maximum number of requests per second. Defaults to REQUESTS_PER_SECOND.
+    """
+
+    name = "google"
+    cache_results = True
+
+    def __init__(self, api_key, url=GCP_ELEVATION_API_URL, batch_size=MAX_BATCH_SIZE, workers=MAX_WORKERS, rate=REQUESTS_PER_SECOND):
+        self.api_key = api_key
+        self.url = url
+        self.batch_size = batch_size
+        self.workers = workers
+        self.bucket = TokenBucket(rate)
+
+    @classmethod
+    def from_preferences(cls):
+        """Returns the provider configured in the GeoData2 preferences, None without API key."""
+        api_key = App.ParamGet("User parameter:BaseApp/Preferences/Mod/GeoData2").GetString("GCP_ELEVATION_API_KEY")
+        if not api_key:
+            App.Console.PrintWarning("Altitude information not available. Specify a valid GCP_ELEVATION_API_KEY\n")
+            return None
+        return cls(api_key)
+
+    def _fetch_batch(self, lats, lons):
+        """Returns the elevations of a batch of locations, NaN if unknown."""
+        elevations = np.full(len(lats), np.nan)
+        params = {
+            "locations": "|".join(f"{lat:.{COORDINATE_DECIMALS}f},{lon:.{COORDINATE_DECIMALS}f}" for lat, lon in zip(lats, lons)),
+            "key": self.api_key
+        }
+        for attempt in range(API_MAX_RETRY + 1):
+            self.bucket.acquire()
+            try:
+                response = get_client().request(self.url, params)
+            except (OSError, http.client.HTTPException) as e:
+                App.Console.PrintWarning(f"Failed to download altitude data: {e}\n")
+                break
+            if response.status != 200:
+                App.Console.PrintWarning(f"Failed to download altitude data: HTTP {response.status}\n")
+                break
+            payload = json.loads(response.data.decode('utf-8'))
+            status = payload['status']
+            if status == "OK":
+                # NOTE: the results are in the order of the locations
+                elevations[:] = [ r['elevation'] for r in payload['results'] ]
+                break
+            elif status == "OVER_QUERY_LIMIT" and attempt < API_MAX_RETRY:
+                time.sleep(random.uniform(0, OVER_QUERY_LIMIT_BACKOFF * 2**attempt))
+            else:
+                App.Console.PrintWarning(f"Failed to download altitude data: {payload.get('error_message', status)}\n")
+                break
+        return elevations
+
+    def elevations(self, lats, lons, callback=None):
+        """Returns the elevations of locations.
+
+        The locations are sent in batches of batch_size, by up to workers
+        concurrent requests.
+
+        Args:
+            lats (numpy.ndarray): the latitudes
+            lons (numpy.ndarray): the longitudes
+            callback (func, optional): called as callback(done, total) with the number of batches
+                resolved so far, from the calling thread. It can raise to abort the lookups. Defaults to None.
+
+        Returns:
+            numpy.ndarray: the elevations in meters, NaN if unknown
+        """
+        elevations = np.full(len(lats), np.nan)
+        starts = range(0, len(lats), self.batch_size)
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="Elevation")
+        futures = { pool.submit(self._fetch_batch, lats[i:i + self.batch_size], lons[i:i + self.batch_size]): i for i in starts }
+        try:
+            while futures:
+                (completed, _) = wait(futures, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    i = futures.pop(future)
+                    elevations[i:i + self.batch_size] = future.result()
+                if callback:
+                    callback(len(starts) - len(futures), len(starts))
+        finally:
+            for future in futures:
+                future.cancel()
+            pool.shutdown(wait=True)
+        return elevations
+
+def make_elevation_provider():
+    """Returns the elevation provider configured in the GeoData2 preferences.
+
+    The ElevationProvider preference is one of ELEVATION_PROVIDERS. The DEM
+    files are read from the DemDirectory preference.
+
+    Returns:
+        object: the provider, None if not available
+    """
+    pref = App.ParamGet("User parameter:BaseApp/Preferences/Mod/GeoData2")
+    name = pref.GetString("ElevationProvider", "google")
+    if name == "dem":
+        directory = pref.GetString("DemDirectory", os.path.join(App.ConfigGet("UserAppData"), "GeoData2", "dem"))
+        provider = DemElevationProvider.from_directory(directory)
+        if not provider.grids:
+            App.Console.PrintWarning(f"Altitude information not available. No DEM file found in '{directory}'\n")
+            return None
+        return provider
+    return GoogleElevationProvider.from_preferences()
+
+def lookup_elevations(lats, lons, provider, callback=None, cache=None):
+    """Returns the elevations of locations, each distinct location being
+    resolved once.
+
+    Args:
+        lats (numpy.ndarray): the latitudes
+        lons (numpy.ndarray): the longitudes
+        provider (object): the provider of the elevations, e.g. a GoogleElevationProvider
+        callback (func, optional): the progress callback of provider.elevations(). Defaults to None.
+        cache (ElevationCache, optional): the cache of the elevations of the provider. Defaults to None.
+
+    Returns:
+        numpy.ndarray: the elevations in meters, NaN if unknown
+    """
+    coordinates = np.round(np.column_stack((lats, lons)).astype(np.float64), COORDINATE_DECIMALS)
+    if not len(coordinates):
+        return np.zeros(0)
+    (unique, inverse) = np.unique(coordinates, axis=0, return_inverse=True)
+    App.Console.PrintLog(f"Looking up the elevation of {len(unique)} distinct location(s) out of {len(coordinates)} ...\n")
+    if cache is None:
+        elevations = provider.elevations(unique[:, 0], unique[:, 1], callback)
+    else:
+        elevations = cache.lookup(provider.name, unique[:, 0], unique[:, 1])
+        missing = np.isnan(elevations)
+        App.Console.PrintLog(f"Found {len(unique) - missing.sum()} cached elevation(s) ...\n")
+        if missing.any():
+            (lats, lons) = (unique[missing, 0], unique[missing, 1])
+            elevations[missing] = provider.elevations(lats, lons, callback)
+            cache.store(provider.name, lats, lons, elevations[missing])
+    return elevations[inverse.reshape(-1)]
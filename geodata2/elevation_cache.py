@@ -0,0 +1,148 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Persistent cache of the elevations.
+
+The elevations are stored in a sqlite database, keyed by the provider and
+the coordinates quantized to 1e-6 degree (~10 cm), so that the imports of
+an area already imported need no network call.
+
+Usage::
+
+    cache = ElevationCache.from_preferences()
+    elevations = cache.lookup("google", lats, lons)
+    missing = np.isnan(elevations)
+    ...
+    cache.store("google", lats[missing], lons[missing], fetched)
+'''
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+import FreeCAD as App
+
+# The coordinates are stored as integers in units of 1e-6 degree
+QUANTUM = 1e-6
+# The number of coordinates per SELECT, below the default limit of 999
+# variables of sqlite
+LOOKUP_CHUNK_SIZE = 450
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS elevations (
+    provider TEXT NOT NULL,
+    lat INTEGER NOT NULL,
+    lon INTEGER NOT NULL,
+    elevation REAL NOT NULL,
+    fetched REAL NOT NULL,
+    PRIMARY KEY (provider, lat, lon)
+) WITHOUT ROWID
+"""
+
+def quantize(values):
+    """Returns the coordinates in units of QUANTUM."""
+    return np.round(np.asarray(values, dtype=np.float64) / QUANTUM).astype(np.int64)
+
+class ElevationCache:
+    """Cache of the elevations.
+
+    Args:
+        path (str): the path of the sqlite database
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(_SCHEMA)
+
+    @classmethod
+    def from_preferences(cls):
+        """Returns the cache stored next to the OSM cache."""
+        return cls(os.path.join(App.ConfigGet("UserAppData"), "GeoData2", "cache", "elevation.sqlite"))
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def lookup(self, provider, lats, lons):
+        """Returns the cached elevations of locations.
+
+        Args:
+            provider (str): the name of the provider
+            lats (numpy.ndarray): the latitudes
+            lons (numpy.ndarray): the longitudes
+
+        Returns:
+            numpy.ndarray: the elevations in meters, NaN if not cached
+        """
+        keys = list(zip(quantize(lats).tolist(), quantize(lons).tolist()))
+        found = {}
+        with self._connect() as connection:
+            for i in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+                chunk = keys[i:i + LOOKUP_CHUNK_SIZE]
+                values = ",".join(["(?, ?)"] * len(chunk))
+                rows = connection.execute(
+                    f"SELECT lat, lon, elevation FROM elevations WHERE provider = ? AND (lat, lon) IN (VALUES {values})",
+                    [provider] + [ v for key in chunk for v in key ])
+                found.update(((lat, lon), elevation) for lat, lon, elevation in rows)
+        return np.array([ found.get(key, np.nan) for key in keys ], dtype=np.float64)
+
+    def store(self, provider, lats, lons, elevations):
+        """Add elevations to the cache, the unknown (NaN) ones are skipped.
+
+        Args:
+            provider (str): the name of the provider
+            lats (numpy.ndarray): the latitudes
+            lons (numpy.ndarray): the longitudes
+            elevations (numpy.ndarray): the elevations in meters
+
+        Returns:
+            int: the number of elevations stored
+        """
+        elevations = np.asarray(elevations, dtype=np.float64)
+        known = ~np.isnan(elevations)
+        now = time.time()
+        rows = [ (provider, lat, lon, elevation, now) for lat, lon, elevation in zip(
+            quantize(np.asarray(lats)[known]).tolist(),
+            quantize(np.asarray(lons)[known]).tolist(),
+            elevations[known].tolist()) ]
+        with self._connect() as connection:
+            connection.executemany("INSERT OR REPLACE INTO elevations VALUES (?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def clear(self, provider=None):
+        """Remove the elevations of a provider, or all of them."""
+        with self._connect() as connection:
+            if provider is None:
+                connection.execute("DELETE FROM elevations")
+            else:
+                connection.execute("DELETE FROM elevations WHERE provider = ?", (provider,))
@@ -0,0 +1,101 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Headless conversion of OSM areas into files.
+
+Nothing here needs the GUI, so that areas can be converted in batch under
+FreeCADCmd::
+
+    FreeCADCmd -c "import geodata2; geodata2.export_osm(50.35, 11.17, 17, '/tmp/area.stl')"
+'''
+
+import os
+
+import FreeCAD as App
+import Mesh
+import Part
+
+from .import_osm import BUILD_MODE_COMPOUND, BUILD_MODE_MESH, build_osm, load_osm, make_osm_geometry
+
+# The export function of each shape file extension
+SHAPE_EXPORTS = {
+    ".brep": "exportBrep",
+    ".brp": "exportBrep",
+    ".step": "exportStep",
+    ".stp": "exportStep",
+    ".iges": "exportIges",
+    ".igs": "exportIges",
+}
+# The mesh file extensions, see Mesh.Mesh.write()
+MESH_EXTENSIONS = (".stl", ".obj", ".ply", ".off", ".amf", ".3mf")
+
+def export_osm(latitude, longitude, osm_zoom, filename, download_altitude=False, progress_callback=None, projection="spherical", build_mode=None, cancelled=None):
+    """Download the OSM data at the latitude / longitude / zoom specified and save it to a file.
+
+    The format is given by the extension of the file:
+    - a mesh (.stl, .obj, ...) of all the categories;
+    - a B-rep compound (.brep, .step, .iges) of all the categories;
+    - a FreeCAD document (.FCStd), built with the given build_mode.
+
+    Args:
+        latitude (float): the latitude of the data to download
+        longitude (float): the longitude of the data to download
+        osm_zoom (int): the OpenStreetMap zoom, as a proxy for the size of the area to download
+        filename (str): the file to save
+        download_altitude (bool, optional): whether to download the altitude. Defaults to False.
+        progress_callback (func): a function to set the progress porcentage and the status. Defaults to None.
+        projection (str, optional): see load_osm. Defaults to "spherical".
+        build_mode (str, optional): the build mode of the FreeCAD documents, see import_osm. Defaults to BUILD_MODE_COMPOUND.
+        cancelled (func, optional): a function returning True when the export must be cancelled. Defaults to None.
+
+    Returns:
+        bool: whether the file has been saved, False if the download failed
+
+    Raises:
+        ImportCancelled: if the export has been cancelled
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in SHAPE_EXPORTS and extension not in MESH_EXTENSIONS and extension != ".fcstd":
+        raise ValueError(f"Unsupported file '{filename}'")
+
+    data = load_osm(latitude, longitude, osm_zoom, download_altitude, progress_callback, projection, cancelled)
+    if data is None:
+        return False
+
+    if extension == ".fcstd":
+        document = App.newDocument("OsmExport")
+        try:
+            build_osm(data, osm_zoom, progress_callback, build_mode or BUILD_MODE_COMPOUND, cancelled, document)
+            document.saveAs(filename)
+        finally:
+            App.closeDocument(document.Name)
+    elif extension in MESH_EXTENSIONS:
+        mesh = Mesh.Mesh()
+        for category_mesh in make_osm_geometry(data, BUILD_MODE_MESH, progress_callback, cancelled).values():
+            mesh.addMesh(category_mesh)
+        mesh.write(filename)
+    else:
+        shapes = make_osm_geometry(data, BUILD_MODE_COMPOUND, progress_callback, cancelled)
+        getattr(Part.makeCompound(list(shapes.values())), SHAPE_EXPORTS[extension])(filename)
+    App.Console.PrintMessage(f"Exported {len(data.ways)} way(s) to '{filename}'\n")
+    return True
@@ -0,0 +1,266 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Shared HTTP client of the external services (OSM, elevation, ...).
+
+The client keeps the connections alive and reuses them across requests,
+asks for gzip encoded responses, can stream the body of a response into a
+file, and retries the failed requests with an exponential backoff.
+
+Usage::
+
+    client = get_client()
+    response = client.request(url, params={"bbox": "..."})
+    if response.status == 200:
+        payload = json.loads(response.data)
+
+    with open(path, "wb") as f:
+        response = client.request(url, sink=f)
+'''
+
+import http.client
+import random
+import threading
+import time
+import urllib.parse
+import zlib
+from collections import namedtuple
+
+import FreeCAD as App
+
+# In seconds, for the connection and for each read
+DEFAULT_TIMEOUT = 30
+DEFAULT_RETRIES = 4
+# The first retry waits at most DEFAULT_BACKOFF seconds, doubled for each
+# retry up to MAX_BACKOFF
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 30
+# The HTTP status codes upon which a request is retried
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# The status returned when the server could not be reached
+STATUS_NETWORK_ERROR = 0
+# The idle connections kept per host
+MAX_IDLE_CONNECTIONS = 4
+CHUNK_SIZE = 64*1024
+# REF: https://operations.osmfoundation.org/policies/api/ requires a User-Agent
+#   identifying the application
+USER_AGENT = "GeoData2 (FreeCAD workbench)"
+
+HttpResponse = namedtuple("HttpResponse", ["status", "headers", "data"])
+
+class ContentDecodingError(http.client.HTTPException):
+    """Raised when the compressed body of a response is corrupted or truncated."""
+
+class HttpClient:
+    """HTTP client with a pool of keep-alive connections.
+
+    The client can be shared by several threads.
+
+    Args:
+        timeout (float, optional): the timeout of the connection and of each read in seconds. Defaults to DEFAULT_TIMEOUT.
+        retries (int, optional): the number of retries of a failed request. Defaults to DEFAULT_RETRIES.
+        backoff (float, optional): the maximum delay before the first retry in seconds. Defaults to DEFAULT_BACKOFF.
+        max_backoff (float, optional): the maximum delay before a retry in seconds. Defaults to MAX_BACKOFF.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_preferences(cls):
+        """Returns a client configured with the GeoData2 preferences."""
+        pref = App.ParamGet("User parameter:BaseApp/Preferences/Mod/GeoData2")
+        return cls(
+            timeout=pref.GetFloat("HttpTimeout", DEFAULT_TIMEOUT),
+            retries=pref.GetInt("HttpRetries", DEFAULT_RETRIES))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the idle connections."""
+        with self._lock:
+            (idle, self._idle) = (self._idle, {})
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+    def _acquire(self, host):
+        """Returns an idle connection to the host if any, otherwise a new one."""
+        with self._lock:
+            connections = self._idle.get(host)
+            if connections:
+                return (connections.pop(), True)
+        (scheme, netloc) = host
+        if scheme == "https":
+            return (http.client.HTTPSConnection(netloc, timeout=self.timeout), False)
+        return (http.client.HTTPConnection(netloc, timeout=self.timeout), False)
+
+    def _release(self, host, connection, response):
+        """Return the connection to the pool, once its response is consumed."""
+        if response.will_close:
+            connection.close()
+            return
+        with self._lock:
+            connections = self._idle.setdefault(host, [])
+            if len(connections) < MAX_IDLE_CONNECTIONS:
+                connections.append(connection)
+                return
+        connection.close()
+
+    def _delay(self, attempt, response=None):
+        """Returns the delay before a retry: the Retry-After of the response
+        if any, otherwise an exponential backoff with full jitter."""
+        retry_after = response.getheader("Retry-After") if response is not None else None
+        if retry_after and retry_after.strip().isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def request(self, url, params=None, headers=None, sink=None):
+        """Send a GET request.
+
+        The requests failing to connect, timing out, answered with one of
+        RETRY_STATUS_CODES or whose body cannot be read are retried. A
+        request is not retried once the body has started to be written to
+        the sink.
+
+        Args:
+            url (str): the URL
+            params (dict, optional): the query parameters. Defaults to None.
+            headers (dict, optional): additional headers (e.g. If-None-Match). Defaults to None.
+            sink (file, optional): a binary file object the body of a successful (200) response
+                is written to, in chunks. Defaults to None, i.e. the body is returned.
+
+        Returns:
+            HttpResponse: the status, the headers and the (decompressed) body. The body is None
+                if written to the sink.
+
+        Raises:
+            OSError|http.client.HTTPException: if the request still fails after the retries, including
+                a ContentDecodingError if the body cannot be decompressed
+        """
+        if params:
+            url = f"{url}?{urllib.parse.urlencode(params)}"
+        parts = urllib.parse.urlsplit(url)
+        host = (parts.scheme, parts.netloc)
+        path = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        request_headers = {
+            "Accept-Encoding": "gzip",
+            "User-Agent": USER_AGENT,
+        }
+        request_headers.update(headers or {})
+
+        attempt = 0
+        while True:
+            (connection, reused) = self._acquire(host)
+            try:
+                connection.request("GET", path, headers=request_headers)
+                response = connection.getresponse()
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                # NOTE: the server may have closed an idle connection
+                if reused:
+                    continue
+                if attempt >= self.retries:
+                    raise
+                delay = self._delay(attempt)
+                App.Console.PrintLog(f"Retrying {url} in {delay:.1f}s after {e!r} ...\n")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            if response.status in RETRY_STATUS_CODES and attempt < self.retries:
+                response.read()
+                self._release(host, connection, response)
+                delay = self._delay(attempt, response)
+                App.Console.PrintLog(f"Retrying {url} in {delay:.1f}s after HTTP {response.status} ...\n")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            streamed = sink is not None and response.status == 200
+            try:
+                data = self._read(response, sink if streamed else None)
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                if streamed or attempt >= self.retries:
+                    raise
+                delay = self._delay(attempt)
+                App.Console.PrintLog(f"Retrying {url} in {delay:.1f}s after {e!r} ...\n")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                connection.close()
+                raise
+            self._release(host, connection, response)
+            return HttpResponse(response.status, response.headers, data)
+
+    @staticmethod
+    def _read(response, sink=None):
+        """Read the body of a response, decompressing it on the fly.
+
+        Raises:
+            ContentDecodingError: if the gzip body is corrupted or truncated
+        """
+        decompressor = None
+        if response.getheader("Content-Encoding", "").lower() == "gzip":
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            if sink is None:
+                data = response.read()
+                if decompressor:
+                    data = decompressor.decompress(data) + decompressor.flush()
+            else:
+                data = None
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    sink.write(decompressor.decompress(chunk) if decompressor else chunk)
+                if decompressor:
+                    sink.write(decompressor.flush())
+        except zlib.error as e:
+            raise ContentDecodingError(f"Invalid gzip body: {e}") from e
+        # NOTE: a truncated gzip stream does not raise, it just never ends
+        if decompressor and not decompressor.eof:
+            raise ContentDecodingError("Truncated gzip body")
+        return data
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Returns the HttpClient shared by the importers, configured with the
+    GeoData2 preferences."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient.from_preferences()
+        return _client
@@ -25,9 +25,11 @@ import csv
 import io
 
 import FreeCAD as App
-import FreeCADGui as Gui
 import Draft
 
+if App.GuiUp:
+    import FreeCADGui as Gui
+
 from .TransverseMercator import TransverseMercator
 
 def import_csv(latitude, longitude, csv_content, has_headers=False, progress_callback=None):
@@ -52,15 +54,15 @@ def import_csv(latitude, longitude, csv_content, has_headers=False, progress_cal
 
     progress_callback(25, "Parsing data ...")
 
-    fc_points = []
     with io.StringIO(csv_content) as f:
         dialect = csv.Sniffer().sniff(f.read(1024))
         f.seek(0)
         reader = csv.reader(f, dialect)
-        for i,row in enumerate(reader):
-            progress_callback(i, "Parsing data ...")
-            (x, y) = tm.fromGeographic(float(row[0]), float(row[1]))
-            fc_points.append(App.Vector(x-center_x, y-center_y, 0.0))
+        rows = [ (float(row[0]), float(row[1])) for row in reader ]
+
+    (lats, lons) = zip(*rows)
+    (xs, ys) = tm.fromGeographicArray(lats, lons)
+    fc_points = [ App.Vector(x-center_x, y-center_y, 0.0) for x, y in zip(xs, ys) ]
 
     # Let's close the wire
     fc_points.append(fc_points[0])
@@ -69,8 +71,9 @@ def import_csv(latitude, longitude, csv_content, has_headers=False, progress_cal
 
     Draft.makeWire(fc_points)
     active_object = App.ActiveDocument.ActiveObject
-    active_object.ViewObject.LineColor=(1.0,0.0,0.0)
     App.activeDocument().recompute()
-    Gui.SendMsgToActiveView("ViewFit")
+    if App.GuiUp:
+        active_object.ViewObject.LineColor=(1.0,0.0,0.0)
+        Gui.SendMsgToActiveView("ViewFit")
 
     progress_callback(100, "Successfully imported data.")
@@ -24,10 +24,13 @@
 import os
 
 import FreeCAD as App
-import FreeCADGui as Gui
 import Draft
 
+if App.GuiUp:
+    import FreeCADGui as Gui
+
 from .TransverseMercator import TransverseMercator
+from .document_tools import BulkMode
 from .inventortools import setcolors2
 
 def import_emir(emir_filename, progress_callback=None):
@@ -84,18 +87,19 @@ def import_emir(emir_filename, progress_callback=None):
 
     progress_callback(50, "Creating visualizations ...")
 
-    group = App.ActiveDocument.addObject("App::DocumentObjectGroup","GRP_EmirImport")
+    # NOTE: the BSplines are named by Draft, but still share a single undo
+    #   transaction and a single recompute.
+    with BulkMode(App.ActiveDocument, "Import EMIR") as bulk:
+        group = bulk.add_object("App::DocumentObjectGroup", base="GRP_EmirImport")
 
-    # Then create a BSpline for each column and row
-    for i in range(ncols):
-        Draft.makeBSpline(fc_points[i])
-        group.addObject(App.ActiveDocument.ActiveObject)
+        # Then create a BSpline for each column and row
+        for i in range(ncols):
+            group.addObject(Draft.makeBSpline(fc_points[i]))
 
-    for i in range(nrows):
-        Draft.makeBSpline([ col[i] for col in fc_points ])
-        group.addObject(App.ActiveDocument.ActiveObject)
+        for i in range(nrows):
+            group.addObject(Draft.makeBSpline([ col[i] for col in fc_points ]))
 
-    App.ActiveDocument.recompute()
-    Gui.SendMsgToActiveView("ViewFit")
+    if App.GuiUp:
+        Gui.SendMsgToActiveView("ViewFit")
 
     progress_callback(100, "Successfully imported data.")
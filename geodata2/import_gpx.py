@@ -25,9 +25,11 @@ import os
 import xml.etree.ElementTree as ET
 
 import FreeCAD
-import FreeCADGui
 import Draft
 
+if FreeCAD.GuiUp:
+    import FreeCADGui
+
 from .TransverseMercator import TransverseMercator
 
 def import_gpx(latitude, longitude, altitude, gpx_filename, generate_nodes=False, progress_callback=None):
@@ -64,21 +66,23 @@ def import_gpx(latitude, longitude, altitude, gpx_filename, generate_nodes=False
     trk = root.find(f"{ns}trk")
 
     gpx_points = [ trkpt for trkpt in trk.find(f"{ns}trkseg").findall(f"{ns}trkpt") ]
-    def __to_fc_vector(gpx_point):
-        (x, y) = tm.fromGeographic(float(gpx_point.get('lat')), float(gpx_point.get('lon')))
-        z = float(gpx_point.find(f"{ns}ele").text)*1000.0
-        return FreeCAD.Vector(x-center_x, y-center_y, z)
-    fc_points = [ __to_fc_vector(gpx_point) for gpx_point in gpx_points ]
+    (xs, ys) = tm.fromGeographicArray(
+        [ float(gpx_point.get('lat')) for gpx_point in gpx_points ],
+        [ float(gpx_point.get('lon')) for gpx_point in gpx_points ])
+    zs = [ float(gpx_point.find(f"{ns}ele").text)*1000.0 for gpx_point in gpx_points ]
+    fc_points = [ FreeCAD.Vector(x-center_x, y-center_y, z) for x, y, z in zip(xs, ys, zs) ]
 
     # Let's close the wire
     progress_callback(50, "Creating visualizations ...")
 
     Draft.makeWire(fc_points)
     active_object = FreeCAD.ActiveDocument.ActiveObject
-    active_object.ViewObject.LineColor = (1.0,0.0,0.0)
+    if FreeCAD.GuiUp:
+        active_object.ViewObject.LineColor = (1.0,0.0,0.0)
     active_object.Placement.Base = FreeCAD.Vector(center_x, center_y, altitude*1000)
     active_object.Label = trk.find(f"{ns}name").text
     FreeCAD.activeDocument().recompute()
-    FreeCADGui.SendMsgToActiveView("ViewFit")
+    if FreeCAD.GuiUp:
+        FreeCADGui.SendMsgToActiveView("ViewFit")
 
     progress_callback(100, "Successfully imported data.")
@@ -23,16 +23,18 @@
 
 import json
 import os
-import pivy
 import time
 import urllib.request
 import urllib.parse
 import xml.etree.ElementTree as ET
 
 import FreeCAD
-import FreeCADGui
 import Part
 
+if FreeCAD.GuiUp:
+    import FreeCADGui
+    import pivy
+
 from .TransverseMercator import TransverseMercator
 from .inventortools import setcolors2
 
@@ -51,6 +53,7 @@ def import_lidar(lidar_filename, progress_bar=None, status=None):
     progress_callback(0, "Parsing data ...")
 
     FreeCAD.activeDocument().recompute()
-    FreeCADGui.SendMsgToActiveView("ViewFit")
+    if FreeCAD.GuiUp:
+        FreeCADGui.SendMsgToActiveView("ViewFit")
 
     progress_callback(100, "Successfully imported data.")
@@ -21,27 +21,68 @@
 #*                                                                         *
 #***************************************************************************
 
-import json
-import os
-import pivy
-import time
-import urllib.request
-import urllib.parse
-import xml.etree.ElementTree as ET
+import http.client
+import math
+import re
+from collections import namedtuple
+
+import numpy as np
 
 import FreeCAD as App
-import FreeCADGui as Gui
-import Part
 
-from .TransverseMercator import TransverseMercator
-from .inventortools import setcolors2
+if App.GuiUp:
+    import FreeCADGui as Gui
+    import pivy
+
+from .clipping import classify, clip_polygon, clip_polyline
+from .coin_renderer import CoinBuilder
+from .document_tools import BulkMode
+from .elevation import lookup_elevations, make_elevation_provider
+from .elevation_cache import ElevationCache
+from .http_client import STATUS_NETWORK_ERROR, HttpResponse, get_client
+from .node_store import NodeStore
+from .osm_cache import OsmCache
+from .osm_builders import CompoundBuilder, MeshBuilder, ObjectBuilder
+from .pipeline import POLL_INTERVAL, Pipeline, Stage
+from .projection import make_projection
+from .osm_tiles import OsmTileStore, TileDownloadError, tile_bounds, tile_zoom, tiles_for_bbox, union_bounds
+from .progress import ThrottledProgress
+from .shape_pool import shape_workers_from_preferences
+from .multipolygon import assemble_multipolygon
+from .simplify import simplify
 
-API_MAX_RETRY = 4
-GCP_ELEVATION_API_KEY = None
-GCP_ELEVATION_API_URL = "https://maps.googleapis.com/maps/api/elevation/json"
 OSM_API_URL = "https://www.openstreetmap.org/api/0.6/map"
 
-def import_osm(latitude, longitude, osm_zoom, download_altitude=False, progress_callback=None):
+# One document object per way, as Part::Extrusion
+BUILD_MODE_OBJECTS = "objects"
+# One Part::Feature compound per category
+BUILD_MODE_COMPOUND = "compound"
+# Visualization only, directly in the Coin3D scene graph
+BUILD_MODE_COIN = "coin"
+# One Mesh::Feature per category
+BUILD_MODE_MESH = "mesh"
+
+# While waiting for the ways of a stream, the GUI thread sleeps at most
+# that long per step, in seconds
+STREAM_POLL_TIMEOUT = 0.005
+# The default tolerance of the simplification of the ways, in pixels of
+# the map at the OSM zoom of the import
+SIMPLIFY_PIXELS = 0.5
+# The circumference of the Earth at the equator, in mm
+EQUATOR_LENGTH = 40075016686.0
+
+# The loaded OSM data: the projection, the bounds (minlat, minlon, maxlat,
+# maxlon) and the OsmWayGeometry of the tagged ways
+OsmData = namedtuple("OsmData", ["tm", "bounds", "ways"])
+# A way ready to be built, with its (n, 3) points in mm, or a polygon of a
+# multipolygon relation, with the (m, 3) points of its holes
+OsmWayGeometry = namedtuple("OsmWayGeometry", ["id", "name", "points", "building", "building_height", "landuse", "highway", "holes"], defaults=((),))
+# The ways of a tile flowing through the stages of an OsmStream, with the
+# projected nodes of the tile and the node indices of each way (None for
+# the multipolygons), both dropped once the altitudes are set
+OsmTileWays = namedtuple("OsmTileWays", ["tile", "nodes", "ways", "indices"])
+
+def import_osm(latitude, longitude, osm_zoom, download_altitude=False, progress_callback=None, projection="spherical", build_mode=BUILD_MODE_OBJECTS, cancelled=None):
     """Import Data from OSM at the latitude / longitude / zoom specified.
 
     Aditionally update the progress_bar and status widget if given.
@@ -52,164 +93,655 @@ def import_osm(latitude, longitude, osm_zoom, download_altitude=False, progress_
         osm_zoom (int): the OpenStreetMap zoom, as a proxy for the size of the area to download
         download_altitude (bool, optional): whether to download the altitude. Defaults to False.
         progress_callback (func): a function to set the progress porcentage and the status. Defaults to None.
+        projection (str, optional): the projection used to map the nodes on the xy-plane, one of
+            geodata2.projection.PROJECTIONS. Defaults to "spherical".
+        build_mode (str, optional): BUILD_MODE_OBJECTS to create one document object per way,
+            BUILD_MODE_COMPOUND to create a single compound per category, BUILD_MODE_MESH to create
+            a single mesh per category or BUILD_MODE_COIN to only render the buildings and highways
+            in the scene graph. Defaults to BUILD_MODE_OBJECTS.
+        cancelled (func, optional): a function returning True when the import must be cancelled. Defaults to None.
+
+    Raises:
+        ImportCancelled: if the import has been cancelled
+    """
+    data = load_osm(latitude, longitude, osm_zoom, download_altitude, progress_callback, projection, cancelled)
+    if data is None:
+        return
+    build_osm(data, osm_zoom, progress_callback, build_mode, cancelled)
+
+def load_osm(latitude, longitude, osm_zoom, download_altitude=False, progress_callback=None, projection="spherical", cancelled=None, cache=None):
+    """Download, parse and project the OSM data at the latitude / longitude / zoom specified.
+
+    NOTE: neither the document nor the GUI are accessed, so that this part
+    of the import can run in a worker thread.
+
+    Args:
+        latitude (float): the latitude of the data to download
+        longitude (float): the longitude of the data to download
+        osm_zoom (int): the OpenStreetMap zoom, as a proxy for the size of the area to download
+        download_altitude (bool, optional): whether to download the altitude. Defaults to False.
+        progress_callback (func): a function to set the progress porcentage and the status. Defaults to None.
+        projection (str, optional): the projection used to map the nodes on the xy-plane, one of
+            geodata2.projection.PROJECTIONS. Defaults to "spherical".
+        cancelled (func, optional): a function returning True when the import must be cancelled. Defaults to None.
+        cache (OsmCache, optional): the cache of the downloads. Defaults to the one of the preferences.
+
+    Returns:
+        OsmData: the data, None if the download failed
+
+    Raises:
+        ImportCancelled: if the import has been cancelled
+    """
+    progress = ThrottledProgress(progress_callback, cancelled)
+    progress(0, "Downloading data from openstreetmap.org ...")
+
+    stream = stream_osm(latitude, longitude, osm_zoom, download_altitude, projection, cache)
+    ways = []
+    try:
+        for way in stream.ways(progress, scale=0.5):
+            ways.append(way)
+    except TileDownloadError as e:
+        progress(0, str(e))
+        return None
+    finally:
+        stream.close()
+        stream.pipeline.join()
+    return OsmData(stream.tm, stream.bounds, ways)
+
+def stream_osm(latitude, longitude, osm_zoom, download_altitude=False, projection="spherical", cache=None):
+    """Start downloading, parsing and projecting the OSM data at the latitude / longitude / zoom specified.
+
+    The work is split in stages running at the same time in worker
+    threads, tile by tile: a tile is parsed as soon as it is downloaded
+    while the next ones are still downloading, then its ways are projected,
+    simplified, their altitude looked up and they are clipped to the area,
+    while the ways of the previous tiles are being built. The ways ready to
+    be built are taken from the returned OsmStream (e.g. by iter_build_osm,
+    in the GUI thread).
+
+    NOTE: the vertices closer than a fraction of a map pixel at the OSM
+    zoom (the SimplifyPixels preference, 0 to keep them all) to the
+    simplified ways are removed with Douglas-Peucker. The nodes shared by
+    several ways are kept, so that the connected ways stay connected. The
+    buildings and the polygons with holes are not simplified.
+
+    NOTE: the multipolygon relations are built as polygons with holes
+    (see multipolygon), once all their member ways are found, which may
+    take several tiles, or with the ones found once all the tiles are
+    projected.
+
+    NOTE: the API returns the ways crossing the area with all their nodes,
+    so they are clipped to the area, unless the ClipWays preference is
+    False. The bounds of the stream are then the ones of the area.
+
+    NOTE: neither the document nor the GUI are accessed by the stages.
+
+    Args:
+        see load_osm
+
+    Returns:
+        OsmStream: the started stream, to be closed once consumed
     """
     # REF: we use https://wiki.openstreetmap.org/wiki/Zoom_levels to switch
     #   between OSM zoom level and º in longitude / latitude
+    if cache is None:
+        cache = OsmCache.from_preferences()
+    # NOTE: the area is served from the cached tiles, only the missing ones
+    #   are downloaded, with tiles sized after the zoom of the import.
+    store = OsmTileStore(cache, _fetch_osm, tile_zoom(osm_zoom))
+    bbox = _get_bbox(latitude, longitude, osm_zoom)
+    tiles = tiles_for_bbox(bbox, store.zoom)
+    tm = make_projection(projection, latitude, longitude)
+    (center_x, center_y) = tm.fromGeographic(latitude, longitude)
+    pref = App.ParamGet("User parameter:BaseApp/Preferences/Mod/GeoData2")
+    clip = pref.GetBool("ClipWays", True)
+    rect = _get_clip_rect(tm, center_x, center_y, bbox)
+    tolerance = _get_simplify_tolerance(latitude, osm_zoom, pref.GetFloat("SimplifyPixels", SIMPLIFY_PIXELS))
+    # the number of points through the stages changing them, logged once done
+    counters = {}
+
+    def __check(done, total):
+        pipeline.check()
+
+    def __download():
+        missing = set(store.missing_tiles(bbox))
+        App.Console.PrintLog(f"Downloading {len(missing)} missing tile(s) ...\n")
+        # NOTE: the queue holds all the tiles, so that the cached ones do
+        #   not delay the downloads
+        for tile in tiles:
+            if tile not in missing:
+                yield tile
+        yield from store.iter_fetch_tiles([ tile for tile in tiles if tile in missing ], __check)
+
+    def __parse(tile):
+        yield (tile, store.read_tile(tile))
+
+    # NOTE: the neighbouring tiles share ways and relations, only the first one is kept
+    seen = set()
+    seen_relations = set()
+    # the multipolygons waiting for their member ways, and the node ids and
+    # points of the member ways found so far
+    relations = {}
+    members = set()
+    member_refs = {}
+    member_points = {}
+    projected = 0
+    def __project(item):
+        nonlocal projected
+        (tile, parsed) = item
+        nodes = NodeStore.from_reader(parsed)
+        nodes.project(tm, center_x, center_y)
+        App.Console.PrintLog(f"Found {len(nodes)} node(s) in tile {tile} ...\n")
+        # NOTE: the relations of a tile are parsed along with its ways
+        for relation in parsed.relations:
+            if relation.id in seen_relations or not _is_multipolygon(relation):
+                continue
+            seen_relations.add(relation.id)
+            relations[relation.id] = relation
+            members.update(ref for type, ref, _ in relation.members if type == "way")
+        ways = []
+        way_indices = []
+        for way_id, way_refs, tags in parsed.ways():
+            if way_id in members and way_id not in member_refs:
+                indices = nodes.lookup(way_refs)
+                indices = indices[indices >= 0]
+                member_refs[way_id] = nodes.ids[indices]
+                member_points[way_id] = np.column_stack((nodes.x[indices], nodes.y[indices], np.zeros(len(indices))))
+            if way_id in seen:
+                continue
+            seen.add(way_id)
+            way = _make_way_geometry(way_id, way_refs, tags, nodes)
+            if way is None:
+                continue
+            (geometry, indices) = way
+            ways.append(geometry)
+            way_indices.append(indices)
+        projected += 1
+        for relation in list(relations.values()):
+            if projected < len(tiles) and not all(ref in member_refs for type, ref, _ in relation.members if type == "way"):
+                continue
+            del relations[relation.id]
+            for geometry in _make_relation_geometry(relation, member_refs, member_points):
+                ways.append(geometry)
+                way_indices.append(None)
+        yield OsmTileWays(tile, nodes, ways, way_indices)
+
+    def __simplify(item):
+        if not item.ways:
+            yield item
+            return
+        # NOTE: the nodes shared by several ways are kept. So are all the
+        #   points of the buildings, whose small footprints would collapse,
+        #   and of the polygons with holes, whose rings could cross.
+        node_indices = [ indices for indices in item.indices if indices is not None ]
+        shared = np.bincount(np.concatenate(node_indices), minlength=len(item.nodes)) > 1 if node_indices else None
+        def __fixed(way, indices):
+            if way.building or way.holes:
+                return np.ones(len(way.points), dtype=bool)
+            if indices is None:
+                return np.zeros(len(way.points), dtype=bool)
+            return shared[indices]
+        fixed = [ __fixed(way, indices) for way, indices in zip(item.ways, item.indices) ]
+        masks = simplify([ way.points for way in item.ways ], tolerance, fixed)
+        ways = [ way._replace(points=way.points[mask]) for way, mask in zip(item.ways, masks) ]
+        indices = [ indices[mask] if indices is not None else None for indices, mask in zip(item.indices, masks) ]
+        (before, after) = (_count_points(item.ways), _count_points(ways))
+        App.Console.PrintLog(f"Simplified tile {item.tile}: removed {before - after} of {before} point(s) ...\n")
+        counters["points before simplify"] = counters.get("points before simplify", 0) + before
+        counters["points removed by simplify"] = counters.get("points removed by simplify", 0) + before - after
+        yield item._replace(ways=ways, indices=indices)
+
+    # NOTE: made for the first tile, in the thread of the stage
+    provider = elevation_cache = None
+    provider_made = False
+    def __elevation(item):
+        nonlocal provider, elevation_cache, provider_made
+        # the ways whose altitude is needed, looked up by node, or by point
+        # for the multipolygons
+        altitude_ways = [ i for i, way in enumerate(item.ways) if way.building and item.indices[i] is not None ]
+        altitude_rings = [ ring for way, indices in zip(item.ways, item.indices) if way.building and indices is None for ring in (way.points, *way.holes) ]
+        if altitude_ways or altitude_rings:
+            if not provider_made:
+                provider = make_elevation_provider()
+                elevation_cache = ElevationCache.from_preferences() if provider is not None and provider.cache_results else None
+                provider_made = True
+        if provider is not None and altitude_ways:
+            indices = np.concatenate([ item.indices[i] for i in altitude_ways ])
+            z = _get_node_altitudes(item.nodes, indices, latitude, longitude, provider, elevation_cache, __check)
+            for i in altitude_ways:
+                item.ways[i].points[:, 2] = z[item.indices[i]]
+        if provider is not None and altitude_rings:
+            points = np.concatenate(altitude_rings)
+            (lats, lons) = tm.toGeographicArray(points[:, 0] + center_x, points[:, 1] + center_y)
+            z = _get_node_altitudes(NodeStore(np.arange(len(points)), lats, lons), np.arange(len(points)), latitude, longitude, provider, elevation_cache, __check)
+            for ring, ring_z in zip(altitude_rings, np.split(z, np.cumsum([ len(ring) for ring in altitude_rings ])[:-1])):
+                ring[:, 2] = ring_z
+        yield item._replace(nodes=None, indices=None)
+
+    def __clip(item):
+        ways = _clip_ways(item.ways, rect)
+        (before, after) = (_count_points(item.ways), _count_points(ways))
+        App.Console.PrintLog(f"Clipped tile {item.tile}: {len(item.ways)} way(s) into {len(ways)}, {before} point(s) into {after} ...\n")
+        counters["points before clip"] = counters.get("points before clip", 0) + before
+        counters["points removed by clip"] = counters.get("points removed by clip", 0) + before - after
+        yield item._replace(ways=ways, nodes=None, indices=None)
+
+    stages = [
+        Stage("download", __download, queue_size=len(tiles)),
+        Stage("parse", __parse),
+        Stage("project", __project),
+    ]
+    if tolerance > 0:
+        stages.append(Stage("simplify", __simplify))
+    if download_altitude:
+        stages.append(Stage("elevation", __elevation))
+    if clip:
+        # NOTE: after the altitudes, which are interpolated on the clipped edges
+        stages.append(Stage("clip", __clip))
+    pipeline = Pipeline(stages, name="OsmImport")
+    bounds = bbox if clip else union_bounds(tile_bounds(tile) for tile in tiles)
+    return OsmStream(tm, bounds, tiles, pipeline.start(), counters)
+
+class OsmStream:
+    """The OSM data of an area, produced tile by tile by a Pipeline.
 
-    if not progress_callback:
-        def progress_callback(progress, status):
-            App.Console.PrintLog(f"{status} ({progress}/100)\n")
-    progress_callback(0, "Downloading data from openstreetmap.org ...")
+    Args:
+        tm (TransverseMercator): the projection
+        bounds (tuple): the (minlat, minlon, maxlat, maxlon) of the data
+        tiles (list): the (z, x, y) of the tiles
+        pipeline (Pipeline): the started pipeline producing the OsmTileWays
+        counters (dict, optional): the counters updated by the stages, logged once done. Defaults to None.
+    """
+
+    def __init__(self, tm, bounds, tiles, pipeline, counters=None):
+        self.tm = tm
+        self.bounds = bounds
+        self.tiles = tiles
+        self.pipeline = pipeline
+        self.counters = counters if counters is not None else {}
+        # the number of tiles taken so far
+        self.consumed = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def done(self):
+        return self.pipeline.done
+
+    def progress(self):
+        """Returns the progress percentage and the status, with the number of tiles through each stage."""
+        total = len(self.tiles)
+        stages = self.pipeline.stages
+        done = sum(stage.items_out for stage in stages) + self.consumed
+        status = ", ".join(f"{stage.name} {stage.items_out}/{total}" for stage in stages)
+        return (int(100.0*done/(total*(len(stages) + 1))), f"Importing tiles ({status}, build {self.consumed}/{total}) ...")
+
+    def poll(self, timeout=0.0):
+        """Returns the ways ready so far.
+
+        Args:
+            timeout (float, optional): the maximum time to wait for a tile, in seconds. Defaults to 0.0.
+
+        Returns:
+            list: the OsmWayGeometry
+
+        Raises:
+            TileDownloadError: if a tile cannot be downloaded
+        """
+        ways = []
+        for item in self.pipeline.poll(timeout):
+            self.consumed += 1
+            ways.extend(item.ways)
+        return ways
+
+    def ways(self, progress=None, scale=1.0):
+        """Yields all the ways, waiting for them.
+
+        Args:
+            progress (ThrottledProgress, optional): the progress of the import, checked and
+                updated while waiting. Defaults to None.
+            scale (float, optional): the factor of the progress percentage. Defaults to 1.0.
+
+        Yields:
+            OsmWayGeometry: the ways
+        """
+        while not self.done:
+            if progress:
+                progress.check()
+                (percent, status) = self.progress()
+                progress(int(percent*scale), status)
+            yield from self.poll(POLL_INTERVAL)
+
+    def close(self):
+        """Stop the pipeline and log the statistics of its stages."""
+        if not self.pipeline.closed:
+            self.pipeline.close()
+            self.pipeline.log_report()
+            for name, value in self.counters.items():
+                App.Console.PrintLog(f"  {name}: {value}\n")
+
+def build_osm(data, osm_zoom, progress_callback=None, build_mode=BUILD_MODE_OBJECTS, cancelled=None, document=None):
+    """Create the visualizations of the loaded OSM data in the active document.
+
+    NOTE: this must run in the GUI thread. When cancelled, the objects
+    already created are removed by aborting the undo transaction. Without
+    GUI, the objects are created without their view (colors, lights and
+    camera).
+
+    Args:
+        data (OsmData): the data returned by load_osm
+        osm_zoom (int): the OpenStreetMap zoom, used to setup the camera
+        progress_callback (func): a function to set the progress porcentage and the status. Defaults to None.
+        build_mode (str, optional): see import_osm. Defaults to BUILD_MODE_OBJECTS.
+        cancelled (func, optional): a function returning True when the import must be cancelled. Defaults to None.
+        document (App.Document, optional): the document to add the objects to. Defaults to the active document.
+
+    Raises:
+        ImportCancelled: if the import has been cancelled
+    """
+    for _ in iter_build_osm(data, osm_zoom, progress_callback, build_mode, cancelled, document):
+        pass
+    if App.GuiUp:
+        Gui.updateGui()
+
+def iter_build_osm(data, osm_zoom, progress_callback=None, build_mode=BUILD_MODE_OBJECTS, cancelled=None, document=None):
+    """Same as build_osm, as a generator yielding after each way.
+
+    It is meant to be run by a TimeSlicedScheduler, so that the event loop
+    keeps running while the objects are created. It yields the flush method
+    of the BulkMode, in order to display the objects created in each slice.
+    Closing the generator aborts the import.
+
+    The data can also be an OsmStream, whose ways are then built as soon
+    as their tile is ready, while the next tiles are still downloaded and
+    processed. The stream is closed at the end.
+
+    NOTE: the progress_callback must not pump the event loop.
+
+    Args:
+        see build_osm
+
+    Yields:
+        func: the function displaying the objects created so far
 
-    cache_file = _get_cache_file(latitude, longitude, osm_zoom)
-    if not os.path.exists(cache_file):
-        status_code, content = _download_from_osm(latitude, longitude, osm_zoom, cache_file)
+    Raises:
+        TileDownloadError: if a tile of the stream cannot be downloaded
+    """
+    try:
+        yield from _iter_build_osm(data, osm_zoom, progress_callback, build_mode, cancelled, document)
+    finally:
+        if isinstance(data, OsmStream):
+            data.close()
+
+def _iter_build_osm(data, osm_zoom, progress_callback, build_mode, cancelled, document):
+    progress = ThrottledProgress(progress_callback, cancelled)
+    if isinstance(data, OsmStream):
+        ways = _iter_streamed_ways(data, progress)
     else:
-        App.Console.PrintLog(f"Reading OSM data from cache '{cache_file}'...\n")
-        with open(cache_file,"r", encoding='utf-8') as f:
-            content = f.read()
-        status_code = 200
-    if status_code != 200:
-        progress_callback(0, "Download failed. Increase the zoom.")
-        return
+        progress(50, "Creating visualizations ...")
+        ways = _iter_loaded_ways(data, progress)
+
+    active_document = document or App.ActiveDocument
+
+    # NOTE: a single undo transaction, unique names and a single recompute
+    with BulkMode(active_document, "Import OSM") as bulk:
+        App.Console.PrintLog("Setting up Area ...\n")
+        _setup_area(active_document, data.tm, *data.bounds)
+
+        if App.GuiUp:
+            App.Console.PrintLog("Setting up light ...\n")
+            _setup_light(active_document)
+
+            App.Console.PrintLog("Setting up camera ...\n")
+            _setup_camera(active_document, osm_zoom)
+
+        App.Console.PrintLog("Setting up groups ...\n")
+        if build_mode == BUILD_MODE_COMPOUND:
+            builder = CompoundBuilder(bulk, shape_workers_from_preferences())
+        elif build_mode == BUILD_MODE_COIN:
+            builder = CoinBuilder(bulk)
+        elif build_mode == BUILD_MODE_MESH:
+            builder = MeshBuilder(bulk)
+        else:
+            builder = ObjectBuilder(bulk)
+
+        for way in ways:
+            if way is not None:
+                fc_points = [ App.Vector(*point) for point in way.points.tolist() ]
+                fc_holes = [ [ App.Vector(*point) for point in hole.tolist() ] for hole in way.holes ]
+                builder.add_way(way.id, way.name, fc_points, way.building, way.building_height, way.landuse, way.highway, fc_holes)
+            yield bulk.flush
+
+        builder.finish()
+    progress(100, "Successfully imported data.")
+
+def _iter_loaded_ways(data, progress):
+    """Yields the ways of an OsmData."""
+    for i, way in enumerate(data.ways):
+        progress.check()
+        progress(50 + int(50.0*i/len(data.ways)), "Creating visualizations ...")
+        yield way
+
+def _iter_streamed_ways(stream, progress):
+    """Yields the ways of an OsmStream as soon as ready, and None while waiting for them."""
+    while not stream.done:
+        progress.check()
+        progress(*stream.progress())
+        ways = stream.poll(STREAM_POLL_TIMEOUT)
+        if not ways:
+            yield None
+        for way in ways:
+            progress.check()
+            yield way
+
+def make_osm_geometry(data, build_mode=BUILD_MODE_MESH, progress_callback=None, cancelled=None):
+    """Returns the geometry of the loaded OSM data, without any document nor GUI.
+
+    It is meant for the headless conversions (e.g. under FreeCADCmd).
 
-    progress_callback(0, "Downloading altitude from googleapis ...")
-    if download_altitude:
-        base_altitude = _get_altitude(latitude, longitude)
+    Args:
+        data (OsmData): the data returned by load_osm
+        build_mode (str, optional): BUILD_MODE_COMPOUND for B-rep shapes or BUILD_MODE_MESH for meshes.
+            Defaults to BUILD_MODE_MESH.
+        progress_callback (func): a function to set the progress porcentage and the status. Defaults to None.
+        cancelled (func, optional): a function returning True when the import must be cancelled. Defaults to None.
+
+    Returns:
+        dict: the Part.Shape or the Mesh.Mesh of each category (buildings, landuses, highways, paths)
+
+    Raises:
+        ImportCancelled: if the import has been cancelled
+    """
+    if build_mode == BUILD_MODE_COMPOUND:
+        builder = CompoundBuilder(workers=shape_workers_from_preferences())
+    elif build_mode == BUILD_MODE_MESH:
+        builder = MeshBuilder()
     else:
-        base_altitude = 0
+        raise ValueError(f"Unsupported build mode '{build_mode}', expected '{BUILD_MODE_COMPOUND}' or '{BUILD_MODE_MESH}'")
+    progress = ThrottledProgress(progress_callback, cancelled)
+    for i, way in enumerate(data.ways):
+        progress.check()
+        progress(50 + int(50.0*i/len(data.ways)), "Creating geometry ...")
+        fc_points = [ App.Vector(*point) for point in way.points.tolist() ]
+        fc_holes = [ [ App.Vector(*point) for point in hole.tolist() ] for hole in way.holes ]
+        builder.add_way(way.id, way.name, fc_points, way.building, way.building_height, way.landuse, way.highway, fc_holes)
+    geometry = builder.geometry()
+    progress(100, "Successfully created geometry.")
+    return geometry
+
+def _get_building_height(tags):
+    """Returns the height of a building from its tags.
+
+    The explicit height wins over the number of levels (3m per level).
 
-    progress_callback(0, "Parsing data ...")
-    root = ET.fromstring(content)
+    Args:
+        tags (dict): the tags of the way
 
-    progress_callback(0, "Transforming data ...")
+    Returns:
+        float: the height in mm, 0 if unknown
+    """
+    for key in ('building:height', 'height'):
+        match = re.match(r'\s*(\d+(?:[.,]\d+)?)', tags.get(key, ''))
+        if match:
+            return float(match.group(1).replace(',', '.'))*1000
+    match = re.match(r'\s*(\d+(?:[.,]\d+)?)', tags.get('building:levels', ''))
+    if match:
+        return float(match.group(1).replace(',', '.'))*1000*3
+    return 0
 
-    # osm_nodes: a dict of OSM node w/ node id as key
-    osm_nodes = { node.get('id'): node for node in root.findall('node') }
-    osm_ways = list(root.findall('way'))
+def _get_way_attributes(tags):
+    """Returns the attributes of a way (or relation) from its tags.
 
-    # fc_points: map all nodes to xy-plane FC vector
-    tm = TransverseMercator()
-    (center_x, center_y) = tm.fromGeographic(latitude, longitude)
-    def __to_fc_vector(node):
-        (x, y) = tm.fromGeographic(float(node.get('lat')), float(node.get('lon')))
-        return App.Vector(x-center_x, y-center_y, 0.0)
-    fc_points = { id: __to_fc_vector(node) for id, node in osm_nodes.items() }
+    Args:
+        tags (dict): the tags of the way
 
-    App.Console.PrintLog(f"Found {len(osm_nodes.keys())} node(s) and {len(osm_ways)} way(s)...\n")
+    Returns:
+        tuple: its name, building, building_height, landuse and highway
+    """
+    building = tags.get('building', None)
+    landuse = tags.get('landuse', None)
+    highway = tags.get('highway', None)
+    building_height = _get_building_height(tags)
+    name = tags.get('name', None)
+
+    if building:
+        type = tags.get('building', 'yes')
+        name = tags.get('name', type.title() if type != 'yes' else "Building")
+    if landuse:
+        name = landuse.title()
+    if highway:
+        name = tags.get('name', highway.title())
+    if not name:
+        name= f"{tags}"
+    return (name, building, building_height, landuse, highway)
+
+def _make_way_geometry(way_id, way_refs, tags, nodes):
+    """Returns the geometry of a way to be built.
+
+    Args:
+        way_id (int): the id of the way
+        way_refs (sequence): the node references of the way
+        tags (dict): the tags of the way
+        nodes (NodeStore): the projected nodes
 
-    progress_callback(0, "Creating visualizations ...")
+    Returns:
+        tuple: the OsmWayGeometry and the indices of its nodes, None if the way is not built
+    """
+    if not tags:
+        App.Console.PrintLog(f"Skipping untagged way {way_id} ...\n")
+        return None
+
+    (name, building, building_height, landuse, highway) = _get_way_attributes(tags)
+    indices = nodes.lookup(way_refs)
+    if (indices < 0).any():
+        App.Console.PrintLog(f"Ignoring missing node(s) of way {way_id} ...\n")
+        indices = indices[indices >= 0]
+    if len(indices) < 2:
+        return None
+
+    points = np.column_stack((nodes.x[indices], nodes.y[indices], np.zeros(len(indices))))
+    return (OsmWayGeometry(way_id, name, points, building, building_height, landuse, highway), indices)
+
+def _is_multipolygon(relation):
+    """Returns whether a relation is a multipolygon to be built.
+
+    NOTE: the old style multipolygons, tagged on their outer way instead
+    of the relation, are built as ways.
+    """
+    return relation.tags.get("type") == "multipolygon" and len(relation.tags) > 1
 
-    # TODO: Is that correct? should we create a new document or just update the ActiveDocument?
-    #App.newDocument("OSM Map")
-    active_document = App.ActiveDocument
+def _make_relation_geometry(relation, refs, points):
+    """Returns the geometry of the polygons of a multipolygon relation.
 
-    App.Console.PrintLog("Setting up Area ...\n")
-    bounds = root.find('bounds')
-    _setup_area(active_document, float(bounds.get('minlat')),float(bounds.get('minlon')),float(bounds.get('maxlat')),float(bounds.get('maxlon')))
+    Args:
+        relation (OsmRelation): the relation
+        refs (dict): the node ids of the member ways, by way id
+        points (dict): the projected (n, 3) points of the member ways, by way id
 
-    App.Console.PrintLog("Setting up light ...\n")
-    _setup_light(active_document)
+    Returns:
+        list: the OsmWayGeometry of each outer ring, with its holes
+    """
+    (polygons, left) = assemble_multipolygon(relation.members, refs, points)
+    if left:
+        App.Console.PrintLog(f"Ignoring {left} member(s) of relation {relation.id} out of its rings ...\n")
+    (name, building, building_height, landuse, highway) = _get_way_attributes(relation.tags)
+    return [ OsmWayGeometry(f"r{relation.id}", name, outer, building, building_height, landuse, highway, holes) for outer, holes in polygons ]
 
-    App.Console.PrintLog("Setting up camera ...\n")
-    _setup_camera(active_document, osm_zoom)
+def _count_points(ways):
+    """Returns the number of points of ways, including their holes."""
+    return sum(len(way.points) + sum(len(hole) for hole in way.holes) for way in ways)
 
-    App.Console.PrintLog("Setting up groups ...\n")
-    highway_group = active_document.addObject("App::DocumentObjectGroup","GRP_highways")
-    landuse_group = active_document.addObject("App::DocumentObjectGroup","GRP_landuses")
-    building_group = active_document.addObject("App::DocumentObjectGroup","GRP_buildings")
-    path_group = active_document.addObject("App::DocumentObjectGroup","GRP_paths")
+def _get_simplify_tolerance(latitude, osm_zoom, pixels=SIMPLIFY_PIXELS):
+    """Returns the tolerance of the simplification of the ways.
 
-    way_count = len(osm_ways)
-    for i, way in enumerate(osm_ways):
-        way_id = way.get('id')
+    REF: https://wiki.openstreetmap.org/wiki/Zoom_levels for the size of a
+    pixel of the map, at a zoom and a latitude.
 
-        progress_callback(int(100.0*i/way_count), "Creating visualizations ...")
+    Args:
+        latitude (float): the latitude of the import
+        osm_zoom (int): the OSM zoom of the import
+        pixels (float, optional): the tolerance in pixels of the map. Defaults to SIMPLIFY_PIXELS.
 
-        if not len(way.findall('tag')):
-            App.Console.PrintLog(f"Skipping untagged way {way_id} ...\n")
-            continue
+    Returns:
+        float: the tolerance in mm, 0 to not simplify
+    """
+    return pixels * EQUATOR_LENGTH * math.cos(math.radians(latitude)) / 2**(osm_zoom + 8)
 
-        # tags: get a hash of all tags for the current way
-        tags = { tag.get('k'): tag.get('v') for tag in way.findall('tag') }
-        building = tags.get('building', None)
-        landuse = tags.get('landuse', None)
-        highway = tags.get('highway', None)
-        addr_city = tags.get('addr:city', None)
-        addr_street = tags.get('addr:street', None)
-        addr_housenumber = tags.get('addr:housenumber', None)
-        building_levels = int(tags.get('building:levels', 0))*1000*3
-        building_height = int(tags.get('building:height', 0))*1000
-        name = tags.get('name', None)
-        nr = tags.get('ref', None)
-
-        if building:
-            type = tags.get('building', 'yes')
-            name = tags.get('name', type.title() if type != 'yes' else "Building")
-        if landuse:
-            name = landuse.title()
-        if highway:
-            name = tags.get('name', highway.title())
-        if not name:
-            name= f"{tags}"
-
-        if download_altitude:
-            way_osm_nodes = [ osm_nodes[node.get('ref')] for node in way.findall('nd') ]
-            altitudes = _get_altitudes(way_osm_nodes)
-
-        way_fc_points = [ fc_points[node.get('ref')] for node in way.findall('nd') ]
-
-        polygon_fc_points = []
-        for way_fc_point in way_fc_points:
-            if download_altitude and building:
-                altitude = altitudes[way_fc_point.get('lat')+' '+way_fc_point.get('lon')]*1000 - base_altitude
-                way_fc_point.z = altitude
-            polygon_fc_points.append(way_fc_point)
-
-        # create 2D map
-        polygon = Part.makePolygon(polygon_fc_points)
-        Part.show(polygon)
-        feature = active_document.ActiveObject
-        feature.Label = f"w_{way_id}"
-        feature.ViewObject.Visibility = False
-        path_group.addObject(feature)
-
-        # if name==' ':
-        #     extrusion = active_document.addObject("Part::Extrusion",name)
-        #     extrusion.Base = feature
-        #     extrusion.ViewObject.ShapeColor = (1.00,1.00,0.00)
-        #     extrusion.Dir = (0,0,10)
-        #     extrusion.Solid = True
-        #     extrusion.Label = 'way ex'
-
-        if building:
-            extrusion = _add_building(name, feature, building_height)
-            setcolors2(extrusion)
-            building_group.addObject(extrusion)
-
-        if landuse:
-            extrusion = _add_landuse(name, feature, landuse)
-            extrusion.ViewObject.Visibility = False
-            landuse_group.addObject(extrusion)
-
-        if highway:
-            extrusion = _add_highway(name, feature)
-            extrusion.ViewObject.Visibility = True
-            highway_group.addObject(extrusion)
-
-        if i % 10:
-            Gui.updateGui()
-            # Gui.SendMsgToActiveView("ViewFit")
-
-    active_document.recompute()
-    Gui.updateGui()
-    active_document.recompute()
-    progress_callback(100, "Successfully imported data.")
-
-def _get_cache_file(latitude, longitude, osm_zoom):
-    """Given a map coordinate, returns the coresponding cache file.
-
-    The cache file will hold the data retrieved from the OSM server at these coordinate.
+def _get_clip_rect(tm, center_x, center_y, bbox):
+    """Returns the rectangle of the xy-plane covering a bbox.
+
+    Args:
+        tm (TransverseMercator): the projection
+        center_x (float): the x coordinate of the origin
+        center_y (float): the y coordinate of the origin
+        bbox (tuple): the (minlat, minlon, maxlat, maxlon)
+
+    Returns:
+        tuple: the (xmin, ymin, xmax, ymax) of the rectangle
+    """
+    (minlat, minlon, maxlat, maxlon) = bbox
+    corners = np.array([ tm.fromGeographic(lat, lon) for lat in (minlat, maxlat) for lon in (minlon, maxlon) ]) - (center_x, center_y)
+    return (*corners.min(axis=0).tolist(), *corners.max(axis=0).tolist())
+
+def _clip_ways(ways, rect):
+    """Returns the ways clipped to a rectangle.
+
+    The closed buildings and landuses are clipped as polygons, with their
+    holes, the other ways as polylines, possibly split in several ways
+    (the holes becoming ways as well). The ways outside the rectangle are
+    dropped.
+
+    Args:
+        ways (list): the OsmWayGeometry
+        rect (tuple): the (xmin, ymin, xmax, ymax) of the rectangle
+
+    Returns:
+        list: the clipped OsmWayGeometry
+    """
+    if not ways:
+        return ways
+    (inside, outside) = classify([ way.points for way in ways ], rect)
+    clipped = []
+    for way, way_inside, way_outside in zip(ways, inside.tolist(), outside.tolist()):
+        if way_inside:
+            clipped.append(way)
+        elif way_outside:
+            continue
+        elif (way.building or way.landuse) and len(way.points) >= 4 and (way.points[0] == way.points[-1]).all():
+            points = clip_polygon(way.points, rect)
+            if points is not None:
+                holes = [ hole for hole in (clip_polygon(hole, rect) for hole in way.holes) if hole is not None ]
+                clipped.append(way._replace(points=points, holes=holes))
+        else:
+            clipped.extend(way._replace(points=points, holes=()) for ring in (way.points, *way.holes) for points in clip_polyline(ring, rect))
+    return clipped
+
+def _get_bbox(latitude, longitude, osm_zoom):
+    """Returns the area downloaded around a map coordinate.
 
     Args:
         latitude (float): the latitude
@@ -217,126 +749,83 @@ def _get_cache_file(latitude, longitude, osm_zoom):
         osm_zoom (int): the OSM zoom level
 
     Returns:
-        str: the cache file name
+        tuple: the (minlat, minlon, maxlat, maxlon) of the area
     """
-    return os.path.join(App.ConfigGet("UserAppData"), "GeoData2", f"{latitude}_{longitude}_{osm_zoom}")
-
-def _download_from_osm(latitude, longitude, osm_zoom, cache_file):
     delta_degree = 360 / pow(2, osm_zoom)
+    return (latitude-delta_degree, longitude-delta_degree, latitude+delta_degree, longitude+delta_degree)
+
+def _fetch_osm(bbox, sink):
+    """Download the OSM data of a bbox.
+
+    NOTE: the URL of the API can be changed with the OsmApiUrl preference
+    (e.g. to use a mirror, or a local server).
+
+    Args:
+        bbox (tuple): the (minlat, minlon, maxlat, maxlon) to download
+        sink (file): the binary file object the data is streamed to
 
-    (latitude_1, longitude_1) = (latitude-delta_degree, longitude-delta_degree)
-    (latitude_2, longitude_2) = (latitude+delta_degree, longitude+delta_degree)
+    Returns:
+        tuple: the HTTP status code and the ETag
+    """
+    url = App.ParamGet("User parameter:BaseApp/Preferences/Mod/GeoData2").GetString("OsmApiUrl", OSM_API_URL)
+    (latitude_1, longitude_1, latitude_2, longitude_2) = bbox
     App.Console.PrintLog(f"@download p1=({latitude_1},{longitude_1}), p2=({latitude_2},{longitude_2})\n")
     params = {
         "bbox": f"{longitude_1},{latitude_1},{longitude_2},{latitude_2}"
     }
-    App.Console.PrintLog(f"Downloading OSM data from {OSM_API_URL}, {params} ...\n")
-    status_code, data = _call_external_service(OSM_API_URL, params)
-    if status_code == 200:
-        cache_dir = os.path.dirname(cache_file)
-        if not os.path.isdir(cache_dir):
-            os.makedirs(cache_dir)
-        App.Console.PrintLog(f"Writing OSM data to {cache_file} ...\n")
-        with open(cache_file, 'wb') as f:
-            f.write(data)
-        return status_code, data.decode('utf-8')
-    return status_code, data
-
-def _call_external_service(base_url, params):
-    if params:
-        url = f"{base_url}?{urllib.parse.urlencode(params)}"
-    else:
-        url = base_url
-
-    status_code = 400
-    data = None
-    try:
-        with urllib.request.urlopen(url) as response:
-            status_code = response.getcode()
-            if status_code == 200:
-                data = response.read()
-    except urllib.error.URLError as e:
-        print(f"Error: {e}")
-    finally:
-        return status_code, data
+    App.Console.PrintLog(f"Downloading OSM data from {url}, {params} ...\n")
+    (status_code, headers, _) = _call_external_service(url, params, sink=sink)
+    return (status_code, headers.get("ETag") if headers else None)
 
-def _get_altitude(latitude, longitude):
-    """Returns the altitude of a single point with latitude and longitude
+def _call_external_service(base_url, params, sink=None):
+    """Send a request through the shared HttpClient.
 
     Args:
-        latitude (float): the latitude
-        longitude (float): the longitude
+        base_url (str): the URL
+        params (dict): the query parameters
+        sink (file, optional): the binary file object the body is streamed to. Defaults to None.
 
     Returns:
-        float: the altitude
+        HttpResponse: the response, with the status STATUS_NETWORK_ERROR if the server could not be reached
     """
-    if not GCP_ELEVATION_API_KEY:
-        App.Console.PrintWarning(f"Altitude information not available. Specify a valid GCP_ELEVATION_API_KEY\n")
-        return 0
-    retry = 0
-    while retry < API_MAX_RETRY:
-        params = {
-            "locations":f"{latitude},{longitude}",
-            "key": GCP_ELEVATION_API_KEY
-        }
-        status_code, data = (200, '{"status":"OK","results":[{"elevation":314}]}'.encode()) #_call_external_service(OSM_API_URL, params)
-        if status_code == 200:
-            payload = json.loads(data.decode('utf-8'))
-            status = payload['status']
-            if status == "OK":
-                # elevation is in meter
-                return round(payload['results'][0]['elevation']*1000, 2)
-            elif status == "OVER_QUERY_LIMIT":
-                retry += 1
-                time.sleep(5)
-            else:
-                App.Console.PrintWarning(f"Failed to download altitude data: {payload['error_message']}\n")
-                break
-    return 0
+    try:
+        return get_client().request(base_url, params, sink=sink)
+    except (OSError, http.client.HTTPException) as e:
+        App.Console.PrintWarning(f"Failed to call {base_url}: {e}\n")
+        return HttpResponse(STATUS_NETWORK_ERROR, None, None)
+
+def _get_node_altitudes(nodes, indices, latitude, longitude, provider, cache=None, callback=None):
+    """Returns the altitude of nodes, relative to the altitude of the origin.
 
-def _get_altitudes(osm_nodes):
-    """Returns the altitude of a list of point (with latitude and longitude)
+    All the nodes are resolved at once, each distinct location once: by
+    the remote providers through the ElevationCache and in batches of
+    concurrent requests, by the local DEM files by sampling them all at
+    once.
 
     Args:
-        osm_nodes (list): the list of point (latitude, longitude)
+        nodes (NodeStore): the nodes
+        indices (numpy.ndarray): the indices of the nodes whose altitude is needed
+        latitude (float): the latitude of the origin
+        longitude (float): the longitude of the origin
+        provider (ElevationProvider): the provider of the elevations
+        cache (ElevationCache, optional): the cache of the elevations. Defaults to None.
+        callback (func, optional): see lookup_elevations. Defaults to None.
 
     Returns:
-        dict: the dict of altitude by
+        numpy.ndarray: the altitude of each node in mm (0 for the nodes not looked up)
     """
-    if not GCP_ELEVATION_API_KEY:
-        App.Console.PrintWarning(f"Altitude information not available. Specify a valid GCP_ELEVATION_API_KEY\n")
-        return {}
-
-    heights = {}
-    chunk_size = 100 # 100 location at once...
-    chunks = [osm_nodes[i:i + chunk_size] for i in range(0, len(osm_nodes), chunk_size)]
-    for chunk in chunks:
-        locations = [ f"{osm_node.get('lat')},{osm_node.get('lon')}" for osm_node in chunk ]
-        params = {
-            "locations": '|'.join(locations),
-            "key": GCP_ELEVATION_API_KEY
-        }
-        status_code, data = _call_external_service(OSM_API_URL, params)
-        if status_code == 200:
-            payload = json.loads(data.decode('utf-8'))
-            status = payload['status']
-            if status == "OK":
-                # elevation is in meter
-                # TODO: Needs to match the lat and lon to the corresponding node
-                for r in payload['results']:
-                    key="%0.7f" %(r['location']['lat']) + " " + "%0.7f" %(r['location']['lng'])
-                    heights[key]=r['elevation']
-            elif status == "OVER_QUERY_LIMIT":
-                retry += 1
-                time.sleep(5)
-            else:
-                App.Console.PrintWarning(f"Failed to download altitude data: {payload['error_message']}\n")
-                break
-    return heights
-
-def _setup_area(active_document, minlat, minlon, maxlat, maxlon):
+    z = np.zeros(len(nodes))
+    indices = np.unique(indices)
+    # NOTE: the origin is resolved with the nodes
+    lats = np.concatenate(([latitude], nodes.lat[indices]))
+    lons = np.concatenate(([longitude], nodes.lon[indices]))
+    # elevation is in meter
+    altitudes = np.nan_to_num(lookup_elevations(lats, lons, provider, callback, cache))*1000
+    z[indices] = altitudes[1:] - altitudes[0]
+    return z
+
+def _setup_area(active_document, tm, minlat, minlon, maxlat, maxlon):
     # NOTE: The downloaded are will not be squared...
-    tm = TransverseMercator()
     (x1, y1) = tm.fromGeographic(minlat, minlon)
     (x2, y2) = tm.fromGeographic(maxlat, maxlon)
     area = active_document.addObject("Part::Plane", "area")
@@ -372,43 +861,3 @@ def _setup_camera(active_document, osm_zoom):
     active_view.setCamera(camera_definition)
     active_view.setCameraType("Orthographic")
     Gui.SendMsgToActiveView("ViewFit")
-
-def _add_building(name, feature, building_height):
-    extrusion = App.ActiveDocument.addObject("Part::Extrusion",name)
-    extrusion.Base = feature
-    extrusion.ViewObject.ShapeColor = (1.00,1.00,1.00)
-    if building_height == 0:
-        building_height = 10000
-    extrusion.Dir = (0,0,building_height)
-    extrusion.Solid = True
-    extrusion.Label = name
-    return extrusion
-
-def _add_landuse(name, feature, landuse):
-    extrusion = App.ActiveDocument.addObject("Part::Extrusion", name)
-    extrusion.Base = feature
-    color = (1.00,.60,.60)
-    if landuse == 'residential':
-        color = (1.0,.6,.6)
-    elif landuse == 'meadow':
-        color = (0.0,1.0,0.0)
-    elif landuse == 'farmland':
-        color = (.8,.8,.0)
-    elif landuse == 'forest':
-        color = (1.0,.4,.4)
-    elif landuse == 'grass':
-        color = (0.0,.8,.5)
-    extrusion.ViewObject.ShapeColor = color
-    extrusion.Dir = (0,0,0.1)
-    extrusion.Solid = True
-    extrusion.Label = name
-    return extrusion
-
-def _add_highway(name, feature):
-    extrusion = App.ActiveDocument.addObject("Part::Extrusion", name)
-    extrusion.Base = feature
-    extrusion.ViewObject.LineColor = (0.00,.00,1.00)
-    extrusion.ViewObject.LineWidth = 10
-    extrusion.Dir = (0,0,0.2)
-    extrusion.Label = name
-    return extrusion
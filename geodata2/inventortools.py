@@ -1,81 +1,81 @@
-import pivy
-from pivy import coin
-
-
-def setcolorlights(obj):
-	''' monochromes licht auf objekt legen '''
-
-	obj.ViewObject.ShapeColor = (1.00,1.00,1.00)
-	obj.ViewObject.LineColor = (1.00,1.00,.00)
-	obj.ViewObject.LineWidth = 1.00
-
-	viewprovider = obj.ViewObject
-	root=viewprovider.RootNode
-
-	l=coin.SoDirectionalLight()
-	l.direction.setValue(coin.SbVec3f(0,1,0))
-	l.color.setValue(coin.SbColor(0,1,0))
-	root.insertChild(l, 0)
-
-	l=coin.SoDirectionalLight()
-	l.direction.setValue(coin.SbVec3f(1,0,0))
-	l.color.setValue(coin.SbColor(0,1,0))
-	root.insertChild(l, 0)
-
-	l=coin.SoDirectionalLight()
-	l.direction.setValue(coin.SbVec3f(0,-1,0))
-	l.color.setValue(coin.SbColor(0,1,0))
-	root.insertChild(l, 0)
-	
-	l=coin.SoDirectionalLight()
-	l.direction.setValue(coin.SbVec3f(-1,0,0))
-	l.color.setValue(coin.SbColor(0,1,0))
-	root.insertChild(l, 0)
-
-	l=coin.SoDirectionalLight()
-	l.direction.setValue(coin.SbVec3f(0,0,1))
-	l.color.setValue(coin.SbColor(0,1,0))
-	root.insertChild(l, 0)
-	
-	l=coin.SoDirectionalLight()
-	l.direction.setValue(coin.SbVec3f(0,0,-1))
-	l.color.setValue(coin.SbColor(0,1,0))
-	root.insertChild(l, 0)
-
-
-def setcolors2(obj):
-	''' unterschiedliches licht aus allen richtungen '''
-
-	viewprovider = obj.ViewObject
-	root=viewprovider.RootNode
-
-	l=coin.SoDirectionalLight()
-	l.direction.setValue(coin.SbVec3f(0,1,0))
-	l.color.setValue(coin.SbColor(0,0,1))
-	root.insertChild(l, 0)
-
-	l=coin.SoDirectionalLight()
-	l.direction.setValue(coin.SbVec3f(1,0,0))
-	l.color.setValue(coin.SbColor(0,1,0))
-	root.insertChild(l, 0)
-
-	l=coin.SoDirectionalLight()
-	l.direction.setValue(coin.SbVec3f(0,-1,0))
-	l.color.setValue(coin.SbColor(1,0,1))
-	root.insertChild(l, 0)
-	
-	l=coin.SoDirectionalLight()
-	l.direction.setValue(coin.SbVec3f(-1,0,0))
-	l.color.setValue(coin.SbColor(0,1,1))
-	root.insertChild(l, 0)
-
-	l=coin.SoDirectionalLight()
-	l.direction.setValue(coin.SbVec3f(0,0,1))
-	l.color.setValue(coin.SbColor(1,0,0))
-	root.insertChild(l, 0)
-	
-	l=coin.SoDirectionalLight()
-	l.direction.setValue(coin.SbVec3f(0,0,-1))
-	l.color.setValue(coin.SbColor(1,1,0))
-	root.insertChild(l, 0)
-
+import FreeCAD
+
+# NOTE: the scene graph is only available with the GUI
+if FreeCAD.GuiUp:
+	import pivy
+	from pivy import coin
+
+# the lights shared by all the objects, by kind
+_shared_lights = {}
+
+# (direction, color) of the lights of setcolorlights
+COLOR_LIGHTS = [
+	((0,1,0), (0,1,0)),
+	((1,0,0), (0,1,0)),
+	((0,-1,0), (0,1,0)),
+	((-1,0,0), (0,1,0)),
+	((0,0,1), (0,1,0)),
+	((0,0,-1), (0,1,0)),
+]
+
+# (direction, color) of the lights of setcolors2
+COLORS2_LIGHTS = [
+	((0,1,0), (0,0,1)),
+	((1,0,0), (0,1,0)),
+	((0,-1,0), (1,0,1)),
+	((-1,0,0), (0,1,1)),
+	((0,0,1), (1,0,0)),
+	((0,0,-1), (1,1,0)),
+]
+
+
+def make_lights(lights):
+	''' SoGroup mit einem SoDirectionalLight pro (richtung, farbe) '''
+
+	group = coin.SoGroup()
+	for direction, color in lights:
+		l=coin.SoDirectionalLight()
+		l.direction.setValue(coin.SbVec3f(*direction))
+		l.color.setValue(coin.SbColor(*color))
+		group.addChild(l)
+	return group
+
+
+def shared_lights(kind, lights):
+	''' gemeinsame lichtgruppe, nur einmal erzeugt
+
+	The same SoGroup is referenced by the root of every lit object. Lit once
+	on a group that holds the buildings in its own SoSeparator (an App::Part),
+	10k buildings are lit by 6 light nodes traversed once per frame, and the
+	lights do not reach the rest of the scene.
+	'''
+
+	group = _shared_lights.get(kind)
+	if group is None:
+		group = make_lights(lights)
+		_shared_lights[kind] = group
+	return group
+
+
+def _add_lights(obj, group):
+	''' lichtgruppe einmal an den anfang der wurzel des objekts '''
+
+	root = obj.ViewObject.RootNode
+	if root.findChild(group) < 0:
+		root.insertChild(group, 0)
+
+
+def setcolorlights(obj):
+	''' monochromes licht auf objekt legen '''
+
+	obj.ViewObject.ShapeColor = (1.00,1.00,1.00)
+	obj.ViewObject.LineColor = (1.00,1.00,.00)
+	obj.ViewObject.LineWidth = 1.00
+
+	_add_lights(obj, shared_lights("colorlights", COLOR_LIGHTS))
+
+
+def setcolors2(obj):
+	''' unterschiedliches licht aus allen richtungen '''
+
+	_add_lights(obj, shared_lights("colors2", COLORS2_LIGHTS))
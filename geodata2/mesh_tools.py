@@ -0,0 +1,285 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Triangle mesh generation for the extruded OSM footprints.
+
+The meshes are returned as a (n, 3) float array of vertices and a (m, 3)
+int array of triangles indexing the vertices.
+'''
+
+import numpy as np
+
+# Tolerance on the cross products, in mm²
+EPSILON = 1e-9
+
+def as_ring(fc_points):
+    """Returns the points of a footprint as an open (n, 3) array.
+
+    Args:
+        fc_points (list): the App.Vector of the footprint, possibly closed
+
+    Returns:
+        numpy.ndarray: the points, without the closing point
+    """
+    ring = np.array([ (p.x, p.y, p.z) for p in fc_points ], dtype=np.float64).reshape((-1, 3))
+    if len(ring) > 1 and np.allclose(ring[0], ring[-1]):
+        ring = ring[:-1]
+    return ring
+
+def signed_area(ring):
+    """Returns the signed area of the ring in the xy-plane (positive if counterclockwise)."""
+    (x, y) = (ring[:, 0], ring[:, 1])
+    return 0.5 * (np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+def _cross(o, a, b):
+    """Returns the z component of (a - o) x (b - o) for arrays of 2D points."""
+    return (a[..., 0] - o[..., 0]) * (b[..., 1] - o[..., 1]) - (a[..., 1] - o[..., 1]) * (b[..., 0] - o[..., 0])
+
+def triangulate(ring):
+    """Triangulate a simple polygon by ear clipping.
+
+    At each pass the convexity of all the remaining vertices and the
+    point-in-triangle tests of the reflex vertices against all the candidate
+    ears are evaluated at once with NumPy. All the ears that are not
+    adjacent to each other are clipped in the same pass, so that convex
+    footprints only need a logarithmic number of passes.
+
+    Args:
+        ring (numpy.ndarray): the (n, 2) or (n, 3) open ring, in any orientation
+
+    Returns:
+        numpy.ndarray: the (n-2, 3) triangles indexing the ring, counterclockwise
+    """
+    n = len(ring)
+    if n < 3:
+        return np.zeros((0, 3), dtype=np.int64)
+    points = np.asarray(ring, dtype=np.float64)[:, :2]
+    remaining = np.arange(n)
+    if signed_area(points) < 0:
+        remaining = remaining[::-1]
+    triangles = []
+    while len(remaining) > 3:
+        prev = np.roll(remaining, 1)
+        following = np.roll(remaining, -1)
+        (a, b, c) = (points[prev], points[remaining], points[following])
+        convex = _cross(a, b, c) > EPSILON
+        reflex = remaining[~convex]
+        ears = convex.copy()
+        if len(reflex):
+            # is_inside[i, j]: reflex vertex j lies inside the triangle of vertex i
+            p = points[reflex][np.newaxis, :, :]
+            (ta, tb, tc) = (a[:, np.newaxis, :], b[:, np.newaxis, :], c[:, np.newaxis, :])
+            is_inside = (_cross(ta, tb, p) >= -EPSILON) \
+                & (_cross(tb, tc, p) >= -EPSILON) \
+                & (_cross(tc, ta, p) >= -EPSILON)
+            # the triangle vertices themselves do not count
+            # NOTE: nor their duplicates, e.g. at the bridges to the holes
+            is_inside &= (reflex[np.newaxis, :] != prev[:, np.newaxis]) \
+                & (reflex[np.newaxis, :] != following[:, np.newaxis]) \
+                & (np.any(points[reflex][np.newaxis, :, :] != ta, axis=2)) \
+                & (np.any(points[reflex][np.newaxis, :, :] != tb, axis=2)) \
+                & (np.any(points[reflex][np.newaxis, :, :] != tc, axis=2))
+            ears &= ~is_inside.any(axis=1)
+        if not ears.any():
+            # NOTE: degenerated (self intersecting, duplicated points) ring,
+            #   fall back to a fan to guarantee the termination.
+            break
+        # keep the first ear of each run of consecutive ears
+        if ears.all():
+            selected = np.zeros(len(remaining), dtype=bool)
+            selected[0:len(remaining) - len(remaining) % 2:2] = True
+        else:
+            selected = ears & ~np.roll(ears, 1)
+        triangles.append(np.stack((prev[selected], remaining[selected], following[selected]), axis=1))
+        remaining = remaining[~selected]
+    if len(remaining) >= 3:
+        triangles.append(np.stack((
+            np.full(len(remaining) - 2, remaining[0]),
+            remaining[1:-1],
+            remaining[2:],
+        ), axis=1))
+    return np.concatenate(triangles).astype(np.int64)
+
+def _crosses(p, q, a, b):
+    """Returns whether the segment [p, q] properly crosses the segments [a, b], in the xy-plane."""
+    (p, q) = (p[np.newaxis, :2], q[np.newaxis, :2])
+    return (_cross(p, q, a) * _cross(p, q, b) < -EPSILON) & (_cross(a, b, p) * _cross(a, b, q) < -EPSILON)
+
+def bridge_holes(ring, holes):
+    """Join the holes of a polygon to its outer ring, to triangulate it.
+
+    Each hole is connected by a bridge (a pair of coincident edges) from
+    its rightmost vertex to the nearest vertex of the ring, preferably on
+    its right, that it can see, the holes being handled from right to
+    left. The result is a
+    single, weakly simple, counterclockwise ring.
+
+    Args:
+        ring (numpy.ndarray): the (n, 3) open outer ring
+        holes (list): the (m, 3) open inner rings
+
+    Returns:
+        numpy.ndarray: the joined ring
+    """
+    if signed_area(ring) < 0:
+        ring = ring[::-1]
+    holes = [ hole[::-1] if signed_area(hole) > 0 else hole for hole in holes if len(hole) >= 3 ]
+    holes.sort(key=lambda hole: -hole[:, 0].max())
+    for k, hole in enumerate(holes):
+        i = int(np.argmax(hole[:, 0]))
+        p = hole[i]
+        # the edges the bridge must not cross: the ones of the ring and of all the holes
+        edges = [ (r[:, :2], np.roll(r, -1, axis=0)[:, :2]) for r in [ring] + holes[k:] ]
+        (a, b) = (np.concatenate([ e[0] for e in edges ]), np.concatenate([ e[1] for e in edges ]))
+        # NOTE: the vertices on the right first, as the hole is on the left
+        candidates = np.argsort(np.hypot(*(ring[:, :2] - p[:2]).T))
+        candidates = candidates[np.argsort(ring[candidates, 0] <= p[0], kind="stable")]
+        j = candidates[0]
+        for candidate in candidates:
+            if not _crosses(p, ring[candidate], a, b).any():
+                j = candidate
+                break
+        hole = np.roll(hole, -i, axis=0)
+        ring = np.concatenate((ring[:j + 1], hole, hole[:1], ring[j:]))
+    return ring
+
+def wall_strip(ring, height, closed=True):
+    """Returns the walls of a footprint extruded along z.
+
+    Each edge of the ring becomes a quad made of two triangles.
+
+    Args:
+        ring (numpy.ndarray): the (n, 3) open ring of the footprint, or a polyline
+        height (float): the height of the walls
+        closed (bool, optional): whether to close the ring with its last edge. Defaults to True.
+
+    Returns:
+        tuple: the (2n, 3) vertices and the (2n, 3) triangles (2n-2 if not closed)
+    """
+    n = len(ring)
+    top = ring + np.array([0.0, 0.0, height])
+    vertices = np.concatenate((ring, top))
+    i = np.arange(n if closed else n - 1)
+    j = (i + 1) % n
+    triangles = np.concatenate((
+        np.stack((i, j, n + j), axis=1),
+        np.stack((i, n + j, n + i), axis=1),
+    ))
+    return (vertices, triangles)
+
+def roof_triangles(ring, holes=()):
+    """Triangulate the (planar) polygon of a ring.
+
+    Args:
+        ring (numpy.ndarray): the (n, 3) open ring
+        holes (list, optional): the (m, 3) open inner rings. Defaults to ().
+
+    Returns:
+        tuple: the vertices and the triangles
+    """
+    if len(holes):
+        ring = bridge_holes(ring, holes)
+    return (ring, triangulate(ring))
+
+def extrude_mesh(ring, height, holes=()):
+    """Returns the closed mesh of a footprint extruded along z.
+
+    The walls are oriented outward (toward the inside of the holes), the
+    roof upward and the floor downward.
+
+    Args:
+        ring (numpy.ndarray): the (n, 3) open ring of the footprint
+        height (float): the height of the extrusion
+        holes (list, optional): the (m, 3) open inner rings of the footprint. Defaults to ().
+
+    Returns:
+        tuple: the vertices and the triangles
+    """
+    if signed_area(ring) < 0:
+        ring = ring[::-1]
+    if len(holes):
+        holes = [ hole[::-1] if signed_area(hole) > 0 else hole for hole in holes if len(hole) >= 3 ]
+        walls = [ wall_strip(r, height) for r in [ring] + holes ]
+        cap = bridge_holes(ring, holes)
+        caps = triangulate(cap)
+        offsets = np.cumsum([0] + [ len(v) for v, _ in walls ])
+        vertices = np.concatenate([ v for v, _ in walls ] + [cap, cap + np.array([0.0, 0.0, height])])
+        triangles = np.concatenate([ t + offset for (_, t), offset in zip(walls, offsets) ]
+            + [caps[:, ::-1] + offsets[-1], caps + offsets[-1] + len(cap)])
+        return (vertices, triangles)
+    n = len(ring)
+    (vertices, walls) = wall_strip(ring, height)
+    caps = triangulate(ring)
+    triangles = np.concatenate((walls, caps[:, ::-1], caps + n))
+    return (vertices, triangles)
+
+class MeshBatch:
+    """Accumulates meshes into a single vertex / triangle array.
+
+    Args:
+        name (str): the name of the batch
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.vertices = []
+        self.triangles = []
+        self.count = 0
+        self.segments = []
+
+    def __len__(self):
+        return sum(len(t) for t in self.triangles)
+
+    def add(self, vertices, triangles, segment=None):
+        """Add a mesh to the batch.
+
+        Args:
+            vertices (numpy.ndarray): the (n, 3) vertices
+            triangles (numpy.ndarray): the (m, 3) triangles
+            segment (object, optional): the key of the segment of the triangles. Defaults to None.
+        """
+        if not len(triangles):
+            return
+        self.segments.append((segment, len(triangles)))
+        self.vertices.append(vertices)
+        self.triangles.append(triangles + self.count)
+        self.count += len(vertices)
+
+    def arrays(self):
+        """Returns the concatenated vertices and triangles."""
+        if not self.vertices:
+            return (np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64))
+        return (np.concatenate(self.vertices), np.concatenate(self.triangles))
+
+    def segment_indices(self):
+        """Returns the triangle indices of each segment.
+
+        Returns:
+            dict: the list of triangle indices by segment key
+        """
+        segments = {}
+        start = 0
+        for key, count in self.segments:
+            segments.setdefault(key, []).extend(range(start, start + count))
+            start += count
+        return segments
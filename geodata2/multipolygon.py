@@ -0,0 +1,171 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Assembly of the polygons of the OSM multipolygon relations.
+
+REF: https://wiki.openstreetmap.org/wiki/Relation:multipolygon
+
+The outer and inner rings of a multipolygon are made of any number of
+member ways, in any order and direction. Instead of matching the ways
+pairwise, the ways are hashed by their end nodes: a ring is then followed
+way by way, looking up the next way by the end node reached, so that
+assembling n ways takes O(n).
+
+The inner rings are then given to the smallest outer ring containing them.
+'''
+
+import numpy as np
+
+def _pop_way(ends, node, used):
+    """Returns an unused way ending at a node, None if there is none left."""
+    candidates = ends.get(node)
+    while candidates:
+        i = candidates.pop()
+        if i not in used:
+            return i
+    return None
+
+def assemble_rings(way_refs):
+    """Returns the closed rings made of ways.
+
+    NOTE: where more than 2 ways meet at a node, the ring follows any of
+    them, which may leave it open.
+
+    Args:
+        way_refs (list): the node ids of each way
+
+    Returns:
+        tuple: the rings, each one as the list of the (index in way_refs, reversed) of its ways in
+            order, and the number of ways left out of any ring
+    """
+    rings = []
+    # the ways ending at each node
+    ends = {}
+    for i, refs in enumerate(way_refs):
+        if len(refs) < 2:
+            continue
+        if refs[0] == refs[-1]:
+            continue
+        ends.setdefault(refs[0], []).append(i)
+        ends.setdefault(refs[-1], []).append(i)
+
+    used = set()
+    left = 0
+    for i, refs in enumerate(way_refs):
+        if len(refs) < 2:
+            left += 1
+            continue
+        if refs[0] == refs[-1]:
+            if len(refs) >= 4:
+                rings.append([ (i, False) ])
+            else:
+                left += 1
+            continue
+        if i in used:
+            continue
+        used.add(i)
+        ring = [ (i, False) ]
+        (start, node) = (refs[0], refs[-1])
+        while node != start:
+            following = _pop_way(ends, node, used)
+            if following is None:
+                break
+            used.add(following)
+            following_refs = way_refs[following]
+            reverse = following_refs[0] != node
+            ring.append((following, reverse))
+            node = following_refs[0] if reverse else following_refs[-1]
+        if node == start:
+            rings.append(ring)
+        else:
+            left += len(ring)
+    return (rings, left)
+
+def join_ring(parts, ring):
+    """Returns the points of a ring assembled by assemble_rings.
+
+    Args:
+        parts (list): the (n, d) points of each way
+        ring (list): the (index in parts, reversed) of the ways of the ring
+
+    Returns:
+        numpy.ndarray: the points of the ring, the last one repeating the first one
+    """
+    pieces = []
+    for k, (i, reverse) in enumerate(ring):
+        points = parts[i][::-1] if reverse else parts[i]
+        # NOTE: each way starts with the end point of the previous one
+        pieces.append(points if k == 0 else points[1:])
+    return np.concatenate(pieces)
+
+def _ring_area(ring):
+    (x, y) = (ring[:, 0], ring[:, 1])
+    return 0.5 * abs(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]))
+
+def _contains(ring, point):
+    """Returns whether a point is inside a closed ring (even-odd rule), in the xy-plane."""
+    (a, b) = (ring[:-1, :2], ring[1:, :2])
+    (x, y) = (point[0], point[1])
+    crossing = (a[:, 1] > y) != (b[:, 1] > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_crossing = a[:, 0] + (y - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+    return bool(np.count_nonzero(crossing & (x < x_crossing)) % 2)
+
+def assemble_multipolygon(members, refs, points):
+    """Returns the polygons of a multipolygon relation.
+
+    The members with the "inner" role make the holes, the other ways the
+    outer rings. The members missing from refs are ignored, so are the
+    rings they leave open.
+
+    Args:
+        members (list): the (type, ref, role) of the members of the relation
+        refs (dict): the node ids of the member ways, by way id
+        points (dict): the (n, d) points of the member ways (arrays or sequences of tuples), by way id.
+            Only x and y are considered to give the holes to their outer ring.
+
+    Returns:
+        tuple: the (outer ring, list of inner rings) of each polygon, and the number of member ways
+            left out of any ring (including the missing ones) and of inner rings out of any outer ring
+    """
+    rings = { "outer": [], "inner": [] }
+    left = 0
+    for role in rings:
+        way_ids = list(dict.fromkeys(ref for type, ref, member_role in members if type == "way" and (member_role == "inner") == (role == "inner")))
+        available = [ way_id for way_id in way_ids if way_id in refs ]
+        left += len(way_ids) - len(available)
+        (assembled, unused) = assemble_rings([ refs[way_id] for way_id in available ])
+        parts = [ np.asarray(points[way_id]) for way_id in available ]
+        rings[role] = [ join_ring(parts, ring) for ring in assembled ]
+        left += unused
+
+    outers = rings["outer"]
+    holes = [ [] for _ in outers ]
+    areas = [ _ring_area(outer) for outer in outers ]
+    for inner in rings["inner"]:
+        containing = [ i for i, outer in enumerate(outers) if _contains(outer, inner[0]) ]
+        if containing:
+            holes[min(containing, key=lambda i: areas[i])].append(inner)
+        else:
+            left += 1
+    return (list(zip(outers, holes)), left)
@@ -0,0 +1,91 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import numpy as np
+
+class NodeStore:
+    """Compact, array backed store of the OSM node coordinates.
+
+    The node ids are kept sorted in an int64 array, alongside float64 arrays
+    for the latitude, the longitude and the projected x / y coordinates. The
+    node references of a way are resolved in bulk with ``np.searchsorted``
+    which returns index arrays that can be used to gather the coordinates.
+
+    Args:
+        ids (sequence): the node ids
+        lats (sequence): the node latitudes
+        lons (sequence): the node longitudes
+    """
+
+    def __init__(self, ids, lats, lons):
+        ids = np.asarray(ids, dtype=np.int64)
+        order = np.argsort(ids, kind='stable')
+        self.ids = ids[order]
+        self.lat = np.asarray(lats, dtype=np.float64)[order]
+        self.lon = np.asarray(lons, dtype=np.float64)[order]
+        self.x = np.zeros(len(self.ids), dtype=np.float64)
+        self.y = np.zeros(len(self.ids), dtype=np.float64)
+
+    @classmethod
+    def from_reader(cls, reader):
+        """Build the store from the nodes read by an OsmReader.
+
+        Args:
+            reader (OsmReader): the reader after its nodes have been read
+
+        Returns:
+            NodeStore: the store
+        """
+        return cls(reader.node_ids, reader.node_lats, reader.node_lons)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def project(self, tm, center_x=0.0, center_y=0.0):
+        """Project all the nodes on the xy-plane.
+
+        Args:
+            tm (TransverseMercator): the projection to use
+            center_x (float, optional): the x coordinate of the origin. Defaults to 0.0.
+            center_y (float, optional): the y coordinate of the origin. Defaults to 0.0.
+        """
+        (x, y) = tm.fromGeographicArray(self.lat, self.lon)
+        self.x = x - center_x
+        self.y = y - center_y
+
+    def lookup(self, refs):
+        """Resolve node ids into indices in the store.
+
+        Args:
+            refs (sequence): the node ids
+
+        Returns:
+            numpy.ndarray: the indices, with -1 for the ids not in the store
+        """
+        refs = np.asarray(refs, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(len(refs), -1, dtype=np.intp)
+        indices = np.searchsorted(self.ids, refs)
+        indices[indices == len(self.ids)] = 0
+        indices[self.ids[indices] != refs] = -1
+        return indices
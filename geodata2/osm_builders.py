@@ -0,0 +1,437 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Builders turning the OSM ways into FreeCAD document objects.
+
+Every builder is created with the BulkMode of the import (see
+document_tools) and exposes the same two methods:
+    add_way(way_id, name, fc_points, building, building_height, landuse, highway, holes)
+    finish()
+
+The holes are the inner rings of the multipolygons, cut out of their faces.
+
+The CompoundBuilder and the MeshBuilder can also be created without
+BulkMode, to only compute the geometry with geometry(). The view
+properties are only set when the GUI is up, so that the builders also run
+under FreeCADCmd.
+
+The CompoundBuilder can build its shapes in a pool of worker processes
+(see shape_pool).
+'''
+
+import time
+
+import numpy as np
+
+import FreeCAD as App
+import Mesh
+import Part
+
+from .inventortools import setcolors2
+from .mesh_tools import MeshBatch, as_ring, extrude_mesh, wall_strip
+from .shape_pool import SHAPE_CHUNK_SIZE, get_shape_pool, import_brep
+
+BUILDING_COLOR = (1.00,1.00,1.00)
+DEFAULT_BUILDING_HEIGHT = 10000
+HIGHWAY_COLOR = (0.00,.00,1.00)
+HIGHWAY_HEIGHT = 0.2
+LANDUSE_HEIGHT = 0.1
+# The categories of objects, each one in its own group
+CATEGORIES = ("highways", "landuses", "buildings", "paths")
+
+def _landuse_color(landuse):
+    color = (1.00,.60,.60)
+    if landuse == 'residential':
+        color = (1.0,.6,.6)
+    elif landuse == 'meadow':
+        color = (0.0,1.0,0.0)
+    elif landuse == 'farmland':
+        color = (.8,.8,.0)
+    elif landuse == 'forest':
+        color = (1.0,.4,.4)
+    elif landuse == 'grass':
+        color = (0.0,.8,.5)
+    return color
+
+def _setup_groups(bulk, parts=()):
+    """Create the groups holding the different categories of objects.
+
+    Args:
+        bulk (BulkMode): the bulk mode of the document, None to not create any group
+        parts (tuple, optional): the categories grouped in an App::Part, whose
+            children are drawn under its own SoSeparator. Defaults to ().
+
+    Returns:
+        dict: the groups by category
+    """
+    if bulk is None:
+        return {}
+    return {
+        category: bulk.add_object("App::Part" if category in parts else "App::DocumentObjectGroup", base=f"GRP_{category}")
+        for category in CATEGORIES
+    }
+
+def _set_view(obj, **properties):
+    """Set view properties of an object, ignored without GUI."""
+    if not App.GuiUp:
+        return
+    for name, value in properties.items():
+        setattr(obj.ViewObject, name, value)
+
+def _set_lights(obj):
+    """Add the colored lights to an object, ignored without GUI."""
+    if App.GuiUp:
+        setcolors2(obj)
+
+def _add_building(bulk, name, feature, building_height):
+    extrusion = bulk.add_object("Part::Extrusion", name)
+    extrusion.Base = feature
+    _set_view(extrusion, ShapeColor=BUILDING_COLOR)
+    if building_height == 0:
+        building_height = DEFAULT_BUILDING_HEIGHT
+    extrusion.Dir = (0,0,building_height)
+    extrusion.Solid = True
+    return extrusion
+
+def _add_landuse(bulk, name, feature, landuse):
+    extrusion = bulk.add_object("Part::Extrusion", name)
+    extrusion.Base = feature
+    _set_view(extrusion, ShapeColor=_landuse_color(landuse))
+    extrusion.Dir = (0,0,LANDUSE_HEIGHT)
+    extrusion.Solid = True
+    return extrusion
+
+def _add_highway(bulk, name, feature):
+    extrusion = bulk.add_object("Part::Extrusion", name)
+    extrusion.Base = feature
+    _set_view(extrusion, LineColor=HIGHWAY_COLOR, LineWidth=10)
+    extrusion.Dir = (0,0,HIGHWAY_HEIGHT)
+    return extrusion
+
+def _extrude(wire, height, solid, holes=()):
+    """Extrude the wire along z, as a Part::Extrusion would do.
+
+    Args:
+        wire (Part.Wire): the wire
+        height (float): the height of the extrusion
+        solid (bool): whether to create a solid if the wire is closed
+        holes (list, optional): the Part.Wire of the holes. Defaults to ().
+
+    Returns:
+        Part.Shape: the extruded shape
+    """
+    if solid and wire.isClosed():
+        try:
+            if holes:
+                # NOTE: the face maker of Part::Extrusion, nesting the holes in the outline
+                face = Part.makeFace([wire, *holes], "Part::FaceMakerBullseye")
+            else:
+                face = Part.Face(wire)
+            return face.extrude(App.Vector(0, 0, height))
+        except Part.OCCError:
+            # NOTE: self intersecting outlines can not make a face
+            pass
+    if holes:
+        return Part.makeCompound([ w.extrude(App.Vector(0, 0, height)) for w in [wire, *holes] ])
+    return wire.extrude(App.Vector(0, 0, height))
+
+def _add_way_shapes(shapes, landuse_colors, fc_points, building, building_height, landuse, highway, holes=None):
+    """Build the shapes of a way.
+
+    Args:
+        shapes (dict): the lists of shapes by category, the shapes are appended to
+        landuse_colors (list): the colors of the landuse faces, the colors of the faces are appended to
+        see CompoundBuilder.add_way for the others
+    """
+    wire = Part.makePolygon(fc_points)
+    hole_wires = [ Part.makePolygon(hole) for hole in holes or () ]
+    shapes["paths"].append(wire)
+    shapes["paths"].extend(hole_wires)
+
+    if building:
+        if building_height == 0:
+            building_height = DEFAULT_BUILDING_HEIGHT
+        shapes["buildings"].append(_extrude(wire, building_height, True, hole_wires))
+
+    if landuse:
+        shape = _extrude(wire, LANDUSE_HEIGHT, True, hole_wires)
+        shapes["landuses"].append(shape)
+        landuse_colors.extend([_landuse_color(landuse)] * len(shape.Faces))
+
+    if highway:
+        shapes["highways"].append(_extrude(wire, HIGHWAY_HEIGHT, False, hole_wires))
+
+def _build_shape_chunk(ways):
+    """Build the shapes of a chunk of ways, in a shape worker.
+
+    Args:
+        ways (list): the (points, building, building_height, landuse, highway, holes) of the ways, with
+            the points as (x, y, z) tuples and the holes as lists of them
+
+    Returns:
+        tuple: the BREP string of the compound of each category, and the colors of the landuse faces
+    """
+    shapes = { category: [] for category in CATEGORIES }
+    landuse_colors = []
+    for points, building, building_height, landuse, highway, holes in ways:
+        fc_points = [ App.Vector(*point) for point in points ]
+        fc_holes = [ [ App.Vector(*point) for point in hole ] for hole in holes ]
+        _add_way_shapes(shapes, landuse_colors, fc_points, building, building_height, landuse, highway, fc_holes)
+    breps = { category: Part.makeCompound(s).exportBrepToString() for category, s in shapes.items() if s }
+    return (breps, landuse_colors)
+
+class ObjectBuilder:
+    """Creates a polygon and an extrusion document object for every way.
+
+    Args:
+        bulk (BulkMode): the bulk mode of the document to add the objects to
+    """
+
+    def __init__(self, bulk):
+        self.bulk = bulk
+        self.document = bulk.document
+        # NOTE: the lights of the App::Part only reach the buildings, and are
+        # traversed once per frame rather than once per building
+        self.groups = _setup_groups(bulk, parts=("buildings",))
+        _set_lights(self.groups["buildings"])
+
+    def add_way(self, way_id, name, fc_points, building=None, building_height=0, landuse=None, highway=None, holes=None):
+        # create 2D map
+        feature = self.bulk.add_object("Part::Feature", f"w_{way_id}", base="Shape")
+        if holes:
+            # NOTE: the extrusions nest the holes in the outline
+            feature.Shape = Part.makeCompound([ Part.makePolygon(points) for points in [fc_points, *holes] ])
+        else:
+            feature.Shape = Part.makePolygon(fc_points)
+        _set_view(feature, Visibility=False)
+        if building:
+            # NOTE: the base of an extrusion in an App::Part must be in it
+            self.groups["buildings"].addObject(feature)
+        else:
+            self.groups["paths"].addObject(feature)
+
+        if building:
+            extrusion = _add_building(self.bulk, name, feature, building_height)
+            self.groups["buildings"].addObject(extrusion)
+
+        if landuse:
+            extrusion = _add_landuse(self.bulk, name, feature, landuse)
+            _set_view(extrusion, Visibility=False)
+            self.groups["landuses"].addObject(extrusion)
+
+        if highway:
+            extrusion = _add_highway(self.bulk, name, feature)
+            _set_view(extrusion, Visibility=True)
+            self.groups["highways"].addObject(extrusion)
+
+    def finish(self):
+        pass
+
+class CompoundBuilder:
+    """Builds the shapes in memory and creates a single compound per category.
+
+    Instead of 2 or 3 document objects per way (each of them recomputed),
+    the import ends up with one Part::Feature for the buildings, one for the
+    landuses, one for the highways and one for the paths. The landuse colors
+    are kept as per face colors of the compound.
+
+    With workers, the ways are sent by chunks of SHAPE_CHUNK_SIZE to the
+    shape workers as they are added, and the BREP of their compounds are
+    imported by geometry(), in the order of the ways. A chunk whose worker
+    failed is built in process.
+
+    Args:
+        bulk (BulkMode, optional): the bulk mode of the document to add the objects to. Defaults to None,
+            i.e. only compute the geometry.
+        workers (int, optional): the number of shape worker processes (see
+            shape_pool.shape_workers_from_preferences). Defaults to 0, i.e. to build the shapes in process.
+    """
+
+    def __init__(self, bulk=None, workers=0):
+        self.bulk = bulk
+        self.document = bulk.document if bulk else None
+        self.groups = _setup_groups(bulk)
+        self.shapes = { category: [] for category in CATEGORIES }
+        self.landuse_colors = []
+        self.pool = get_shape_pool(workers) if workers > 0 else None
+        # the ways not sent yet, and the (future, ways) of the chunks sent
+        self.chunk = []
+        self.pending = []
+
+    def add_way(self, way_id, name, fc_points, building=None, building_height=0, landuse=None, highway=None, holes=None):
+        if self.pool is None:
+            _add_way_shapes(self.shapes, self.landuse_colors, fc_points, building, building_height, landuse, highway, holes)
+            return
+        self.chunk.append(([ (p.x, p.y, p.z) for p in fc_points ], building, building_height, landuse, highway,
+            [ [ (p.x, p.y, p.z) for p in hole ] for hole in holes or () ]))
+        if len(self.chunk) >= SHAPE_CHUNK_SIZE:
+            self._submit()
+
+    def _submit(self):
+        (ways, self.chunk) = (self.chunk, [])
+        try:
+            future = self.pool.submit(_build_shape_chunk, ways)
+        except RuntimeError as e:
+            # NOTE: BrokenProcessPool is a RuntimeError
+            App.Console.PrintWarning(f"Failed to send the ways to the shape workers: {e}\n")
+            future = None
+        self.pending.append((future, ways))
+
+    def _collect(self):
+        """Import the shapes built by the workers."""
+        if self.chunk:
+            self._submit()
+        start = time.perf_counter()
+        for future, ways in self.pending:
+            try:
+                if future is None:
+                    raise RuntimeError("not sent")
+                (breps, landuse_colors) = future.result()
+            except Exception as e:
+                App.Console.PrintWarning(f"Shape worker failed ({e}), building {len(ways)} way(s) in process ...\n")
+                for points, building, building_height, landuse, highway, holes in ways:
+                    fc_points = [ App.Vector(*point) for point in points ]
+                    fc_holes = [ [ App.Vector(*point) for point in hole ] for hole in holes ]
+                    _add_way_shapes(self.shapes, self.landuse_colors, fc_points, building, building_height, landuse, highway, fc_holes)
+                continue
+            for category, brep in breps.items():
+                self.shapes[category].append(import_brep(brep))
+            self.landuse_colors.extend(landuse_colors)
+        if self.pending:
+            App.Console.PrintLog(f"Imported the shapes of {len(self.pending)} chunk(s) in {time.perf_counter() - start:.3f}s ...\n")
+        self.pending = []
+
+    def geometry(self):
+        """Returns the compound of each category.
+
+        The faces of the landuses compound are colored by landuse_colors.
+
+        Returns:
+            dict: the Part.Shape by category, for the non empty ones
+        """
+        self._collect()
+        return { category: Part.makeCompound(shapes) for category, shapes in self.shapes.items() if shapes }
+
+    def finish(self):
+        """Create the compound of each category."""
+        features = {}
+        for category, shape in self.geometry().items():
+            feature = self.bulk.add_object("Part::Feature", base=category.title())
+            feature.Shape = shape
+            self.groups[category].addObject(feature)
+            features[category] = feature
+
+        if "paths" in features:
+            _set_view(features["paths"], Visibility=False)
+        if "buildings" in features:
+            _set_view(features["buildings"], ShapeColor=BUILDING_COLOR)
+            _set_lights(features["buildings"])
+        if "landuses" in features:
+            _set_view(features["landuses"], DiffuseColor=self.landuse_colors, Visibility=False)
+        if "highways" in features:
+            _set_view(features["highways"], LineColor=HIGHWAY_COLOR, LineWidth=10)
+        # release the shapes, they now belong to the features
+        self.shapes = { category: [] for category in CATEGORIES }
+        return features
+
+class MeshBuilder:
+    """Builds the extrusions as triangle meshes, one Mesh::Feature per category.
+
+    The footprints are triangulated and extruded with NumPy (see mesh_tools)
+    and accumulated in a single batch per category, which is 10 to 100 times
+    cheaper than the B-rep solids of the other builders. Paths are not
+    created. The landuse colors are applied per mesh segment.
+
+    Args:
+        bulk (BulkMode, optional): the bulk mode of the document to add the objects to. Defaults to None,
+            i.e. only compute the geometry.
+    """
+
+    def __init__(self, bulk=None):
+        self.bulk = bulk
+        self.document = bulk.document if bulk else None
+        self.groups = _setup_groups(bulk)
+        self.batches = { category: MeshBatch(category) for category in ("buildings", "landuses", "highways") }
+        self.landuse_colors = []
+
+    def add_way(self, way_id, name, fc_points, building=None, building_height=0, landuse=None, highway=None, holes=None):
+        ring = as_ring(fc_points)
+        closed = len(ring) < len(fc_points)
+        hole_rings = [ as_ring(hole) for hole in holes or () ]
+
+        if building and closed and len(ring) >= 3:
+            if building_height == 0:
+                building_height = DEFAULT_BUILDING_HEIGHT
+            self.batches["buildings"].add(*extrude_mesh(ring, building_height, hole_rings))
+
+        if landuse and closed and len(ring) >= 3:
+            self.batches["landuses"].add(*extrude_mesh(ring, LANDUSE_HEIGHT, hole_rings), segment=landuse)
+
+        if highway:
+            polyline = np.array([ (p.x, p.y, p.z) for p in fc_points ], dtype=np.float64)
+            self.batches["highways"].add(*wall_strip(polyline, HIGHWAY_HEIGHT, closed=False))
+
+    def geometry(self):
+        """Returns the mesh of each category.
+
+        The landuses mesh has a segment per landuse, colored by landuse_colors.
+
+        Returns:
+            dict: the Mesh.Mesh by category, for the non empty ones
+        """
+        meshes = {}
+        for category, batch in self.batches.items():
+            if not len(batch):
+                continue
+            (vertices, triangles) = batch.arrays()
+            mesh = Mesh.Mesh(vertices[triangles].reshape((-1, 3)).tolist())
+            if category == "landuses":
+                segments = batch.segment_indices()
+                for indices in segments.values():
+                    mesh.addSegment(indices)
+                self.landuse_colors = [ _landuse_color(landuse) for landuse in segments ]
+            meshes[category] = mesh
+            App.Console.PrintLog(f"Created {len(triangles)} triangle(s) of {category} ...\n")
+        return meshes
+
+    def finish(self):
+        """Create the mesh of each category."""
+        features = {}
+        for category, mesh in self.geometry().items():
+            feature = self.bulk.add_object("Mesh::Feature", base=category.title())
+            feature.Mesh = mesh
+            self.groups[category].addObject(feature)
+            features[category] = feature
+
+        if "buildings" in features:
+            _set_view(features["buildings"], ShapeColor=BUILDING_COLOR)
+            _set_lights(features["buildings"])
+        if "landuses" in features and App.GuiUp:
+            vobj = features["landuses"].ViewObject
+            if hasattr(vobj, "highlightSegments"):
+                vobj.highlightSegments(self.landuse_colors)
+            vobj.Visibility = False
+        if "highways" in features:
+            _set_view(features["highways"], ShapeColor=HIGHWAY_COLOR)
+        self.batches = { category: MeshBatch(category) for category in self.batches }
+        return features
@@ -0,0 +1,507 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Compressed, size capped cache of the OSM downloads.
+
+The payloads are stored compressed next to a sqlite index holding, for
+each entry, its bounding box, its size, its fetch and last access time and
+its ETag. Entries expire after a TTL and the least recently used ones are
+evicted when the total size exceeds a cap.
+
+Usage::
+
+    cache = OsmCache.from_preferences()
+    entry = cache.lookup(key)
+    if entry is None:
+        entry = cache.put(key, data, bbox)
+    with cache.open(entry) as f:
+        ...
+
+    for entry in cache.entries():
+        print(entry.key, entry.size)
+    cache.prune(max_size=100*1024*1024)
+'''
+
+import gzip
+import lzma
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import FreeCAD as App
+
+# 30 days
+DEFAULT_TTL = 30*24*3600
+# 512 MiB
+DEFAULT_MAX_SIZE = 512*1024*1024
+DEFAULT_COMPRESSION = "gzip"
+# The full sweep of the expired and missing entries runs at most once per
+# PRUNE_INTERVAL seconds when adding entries
+PRUNE_INTERVAL = 24*3600
+# The temporary files of the writers older than that, in seconds, are left
+# over by a crash, and removed by prune
+TEMPORARY_FILE_TTL = 10*60
+
+# The file extension and the open function of each compression
+COMPRESSIONS = {
+    "gzip": (".gz", gzip.open),
+    "lzma": (".xz", lzma.open),
+    "none": ("", open),
+}
+
+CacheEntry = namedtuple("CacheEntry", ["key", "filename", "minlat", "minlon", "maxlat", "maxlon", "size", "fetched", "accessed", "etag"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    minlat REAL,
+    minlon REAL,
+    maxlat REAL,
+    maxlon REAL,
+    size INTEGER NOT NULL,
+    fetched REAL NOT NULL,
+    accessed REAL NOT NULL,
+    etag TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+# Serializes the threads of this process, the lock file the processes.
+_thread_lock = threading.Lock()
+
+@contextmanager
+def _file_lock(path):
+    """Hold an exclusive lock on the given file, across processes."""
+    with _thread_lock, open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            # NOTE: LK_LOCK retries for 10 seconds before raising OSError
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def _open_file(path, mode="rb"):
+    """Open a cached file, decompressing it according to its extension."""
+    for extension, opener in COMPRESSIONS.values():
+        if extension and path.endswith(extension):
+            return opener(path, mode)
+    return open(path, mode)
+
+class OsmCache:
+    """Cache of the OSM downloads.
+
+    Args:
+        directory (str): the directory of the cache
+        ttl (float, optional): the time to live of the entries in seconds, 0 for no expiration. Defaults to DEFAULT_TTL.
+        max_size (int, optional): the maximum total size of the entries in bytes, 0 for no limit. Defaults to DEFAULT_MAX_SIZE.
+        compression (str, optional): one of COMPRESSIONS. Defaults to DEFAULT_COMPRESSION.
+    """
+
+    def __init__(self, directory, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE, compression=DEFAULT_COMPRESSION):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression '{compression}', expected one of {', '.join(COMPRESSIONS)}")
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.compression = compression
+        os.makedirs(directory, exist_ok=True)
+        self._index = os.path.join(directory, "index.sqlite")
+        self._lock = os.path.join(directory, "index.lock")
+        # NOTE: the modification time of this file is the time of the last prune
+        self._pruned = os.path.join(directory, "index.pruned")
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    @classmethod
+    def from_preferences(cls):
+        """Returns the cache configured in the GeoData2 preferences."""
+        pref = App.ParamGet("User parameter:BaseApp/Preferences/Mod/GeoData2")
+        return cls(
+            os.path.join(App.ConfigGet("UserAppData"), "GeoData2", "cache"),
+            ttl=pref.GetInt("CacheTTLDays", DEFAULT_TTL // (24*3600))*24*3600,
+            max_size=pref.GetInt("CacheMaxSizeMB", DEFAULT_MAX_SIZE // (1024*1024))*1024*1024,
+            compression=pref.GetString("CacheCompression", DEFAULT_COMPRESSION))
+
+    @staticmethod
+    def key(latitude, longitude, osm_zoom):
+        """Returns the key of the area downloaded at the given location.
+
+        NOTE: the coordinates are rounded to 1e-6 degree (~10 cm) so that
+        the key does not depend on the float representation.
+
+        Args:
+            latitude (float): the latitude
+            longitude (float): the longitude
+            osm_zoom (int): the OSM zoom level
+
+        Returns:
+            str: the key
+        """
+        return f"{latitude:.6f}_{longitude:.6f}_{int(osm_zoom)}"
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self._index, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _path(self, entry):
+        return os.path.join(self.directory, entry.filename)
+
+    def _is_expired(self, entry, now):
+        return bool(self.ttl) and now - entry.fetched > self.ttl
+
+    def lookup(self, key):
+        """Returns the entry of the given key and mark it as used.
+
+        Args:
+            key (str): the key
+
+        Returns:
+            CacheEntry: the entry, None if missing or expired
+        """
+        now = time.time()
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            entry = CacheEntry(*row)
+            if self._is_expired(entry, now) or not os.path.isfile(self._path(entry)):
+                return None
+            connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return entry._replace(accessed=now)
+
+    def open(self, entry):
+        """Open the payload of an entry.
+
+        Args:
+            entry (CacheEntry): the entry
+
+        Returns:
+            file: the decompressed binary file object
+        """
+        return _open_file(self._path(entry))
+
+    def path(self, entry):
+        """Returns the path of the payload of an entry, for the uncompressed ones.
+
+        Args:
+            entry (CacheEntry): the entry
+
+        Returns:
+            str: the path
+        """
+        return self._path(entry)
+
+    def open_writer(self, key, bbox=None, etag=None, compression=None, extension=".osm"):
+        """Returns a writer streaming a payload into the cache.
+
+        The payload is written to a temporary file, which is only renamed
+        and indexed by CacheWriter.commit(), so that a reader never sees a
+        partial file. The payload is discarded if not committed.
+
+        Usage::
+
+            with cache.open_writer(key, bbox) as writer:
+                writer.write(data)
+                entry = writer.commit()
+
+        Args:
+            key (str): the key
+            bbox (tuple, optional): the (minlat, minlon, maxlat, maxlon) of the payload. Defaults to None.
+            etag (str, optional): the ETag of the payload. Defaults to None.
+            compression (str, optional): one of COMPRESSIONS. Defaults to the one of the cache.
+            extension (str, optional): the extension of the payload. Defaults to ".osm".
+
+        Returns:
+            CacheWriter: the writer
+        """
+        return CacheWriter(self, key, bbox, etag, compression or self.compression, extension)
+
+    def put(self, key, data, bbox=None, etag=None, compression=None, extension=".osm"):
+        """Store a payload in the cache.
+
+        Args:
+            key (str): the key
+            data (bytes|file): the payload, or a binary file object to read it from
+            bbox (tuple, optional): the (minlat, minlon, maxlat, maxlon) of the payload. Defaults to None.
+            etag (str, optional): the ETag of the payload. Defaults to None.
+            compression (str, optional): one of COMPRESSIONS. Defaults to the one of the cache.
+            extension (str, optional): the extension of the payload. Defaults to ".osm".
+
+        Returns:
+            CacheEntry: the new entry
+        """
+        with self.open_writer(key, bbox, etag, compression, extension) as writer:
+            if isinstance(data, (bytes, bytearray)):
+                writer.write(data)
+            else:
+                shutil.copyfileobj(data, writer)
+            return writer.commit()
+
+    def _commit(self, tmp_path, key, filename, bbox, etag):
+        """Rename a temporary file to its final name and index it.
+
+        Only the least recently used entries are then evicted if the cap is
+        exceeded, the full prune runs at most once per PRUNE_INTERVAL.
+        """
+        size = os.path.getsize(tmp_path)
+        (minlat, minlon, maxlat, maxlon) = bbox or (None, None, None, None)
+        now = time.time()
+        entry = CacheEntry(key, filename, minlat, minlon, maxlat, maxlon, size, now, now, etag)
+        with _file_lock(self._lock):
+            os.replace(tmp_path, self._path(entry))
+            with self._connect() as connection:
+                previous = connection.execute("SELECT filename FROM entries WHERE key = ?", (key,)).fetchone()
+                connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", entry)
+                total = connection.execute("SELECT SUM(size) FROM entries").fetchone()[0]
+        if previous and previous[0] != filename:
+            self._remove_file(previous[0])
+        App.Console.PrintLog(f"Cached {size} byte(s) as '{filename}' ...\n")
+        if self._is_prune_due(now):
+            self.prune()
+        elif self.max_size and total > self.max_size:
+            self.evict(self.max_size)
+        return entry
+
+    def _is_prune_due(self, now):
+        try:
+            return now - os.path.getmtime(self._pruned) > PRUNE_INTERVAL
+        except OSError:
+            return True
+
+    def entries(self):
+        """Returns all the entries, the most recently used first."""
+        with self._connect() as connection:
+            rows = connection.execute("SELECT * FROM entries ORDER BY accessed DESC").fetchall()
+        return [ CacheEntry(*row) for row in rows ]
+
+    def total_size(self):
+        """Returns the total size of the entries in bytes."""
+        with self._connect() as connection:
+            return connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _remove_temporary_files(self, before):
+        """Remove the temporary files of the writers last modified before a time."""
+        # NOTE: the writers name their temporary file ".{key}.*"
+        with os.scandir(self.directory) as files:
+            for file in files:
+                try:
+                    if file.name.startswith(".") and file.is_file() and file.stat().st_mtime < before:
+                        os.remove(file.path)
+                except FileNotFoundError:
+                    pass
+
+    def _remove_file(self, filename):
+        try:
+            os.remove(os.path.join(self.directory, filename))
+        except FileNotFoundError:
+            pass
+
+    def remove(self, key):
+        """Remove an entry.
+
+        Args:
+            key (str): the key
+
+        Returns:
+            bool: whether the entry existed
+        """
+        with _file_lock(self._lock), self._connect() as connection:
+            row = connection.execute("SELECT filename FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False
+            connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._remove_file(row[0])
+        return True
+
+    def evict(self, max_size=None):
+        """Remove the least recently used entries until the total size is
+        below the cap.
+
+        Unlike prune(), only the entries evicted are read from the index
+        and no file is checked.
+
+        NOTE: the most recently used entry is never evicted, so that a
+        payload larger than the cap can still be read once.
+
+        Args:
+            max_size (int, optional): the maximum total size in bytes. Defaults to the one of the cache.
+
+        Returns:
+            list: the removed CacheEntry
+        """
+        max_size = self.max_size if max_size is None else max_size
+        removed = []
+        if not max_size:
+            return removed
+        with _file_lock(self._lock), self._connect() as connection:
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= max_size:
+                return removed
+            rows = connection.execute("SELECT * FROM entries WHERE key != "
+                "(SELECT key FROM entries ORDER BY accessed DESC LIMIT 1) ORDER BY accessed ASC")
+            for entry in map(CacheEntry._make, rows):
+                if total <= max_size:
+                    break
+                removed.append(entry)
+                total -= entry.size
+            for entry in removed:
+                connection.execute("DELETE FROM entries WHERE key = ?", (entry.key,))
+                self._remove_file(entry.filename)
+        if removed:
+            App.Console.PrintLog(f"Evicted {len(removed)} cache entrie(s) ...\n")
+        return removed
+
+    def prune(self, ttl=None, max_size=None):
+        """Remove the expired entries, the ones whose file is missing and
+        the least recently used ones until the total size is below the cap.
+
+        It checks every entry, and runs automatically at most once per
+        PRUNE_INTERVAL when adding entries. The temporary files of the
+        writers older than TEMPORARY_FILE_TTL, left over by a crash, are
+        removed as well.
+
+        NOTE: the most recently used entry is never evicted because of its
+        size, so that a payload larger than the cap can still be read once.
+
+        Args:
+            ttl (float, optional): the time to live in seconds. Defaults to the one of the cache.
+            max_size (int, optional): the maximum total size in bytes. Defaults to the one of the cache.
+
+        Returns:
+            list: the removed CacheEntry
+        """
+        ttl = self.ttl if ttl is None else ttl
+        max_size = self.max_size if max_size is None else max_size
+        now = time.time()
+        removed = []
+        with _file_lock(self._lock), self._connect() as connection:
+            entries = [ CacheEntry(*row) for row in connection.execute("SELECT * FROM entries ORDER BY accessed DESC") ]
+            total = 0
+            for entry in entries:
+                if not os.path.isfile(self._path(entry)) \
+                        or (ttl and now - entry.fetched > ttl) \
+                        or (max_size and total and total + entry.size > max_size):
+                    removed.append(entry)
+                else:
+                    total += entry.size
+            for entry in removed:
+                connection.execute("DELETE FROM entries WHERE key = ?", (entry.key,))
+                self._remove_file(entry.filename)
+            self._remove_temporary_files(now - TEMPORARY_FILE_TTL)
+            with open(self._pruned, "wb"):
+                pass
+        if removed:
+            App.Console.PrintLog(f"Pruned {len(removed)} cache entrie(s) ...\n")
+        return removed
+
+    def clear(self):
+        """Remove all the entries.
+
+        Returns:
+            list: the removed CacheEntry
+        """
+        with _file_lock(self._lock), self._connect() as connection:
+            removed = [ CacheEntry(*row) for row in connection.execute("SELECT * FROM entries") ]
+            connection.execute("DELETE FROM entries")
+            for entry in removed:
+                self._remove_file(entry.filename)
+        return removed
+
+class CacheWriter:
+    """Streams a payload into an OsmCache, see OsmCache.open_writer().
+
+    Args:
+        cache (OsmCache): the cache
+        key (str): the key
+        bbox (tuple): the (minlat, minlon, maxlat, maxlon) of the payload
+        etag (str): the ETag of the payload
+        compression (str): one of COMPRESSIONS
+        extension (str): the extension of the payload
+    """
+
+    def __init__(self, cache, key, bbox, etag, compression, extension):
+        (compression_extension, opener) = COMPRESSIONS[compression]
+        self.cache = cache
+        self.key = key
+        self.bbox = bbox
+        self.etag = etag
+        self.filename = f"{key}{extension}{compression_extension}"
+        self.entry = None
+        (fd, self._tmp_path) = tempfile.mkstemp(prefix=f".{key}.", dir=cache.directory)
+        os.close(fd)
+        self._file = opener(self._tmp_path, "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.entry is None:
+            self.discard()
+
+    def write(self, data):
+        return self._file.write(data)
+
+    def commit(self, etag=None):
+        """Add the payload written so far to the cache.
+
+        Args:
+            etag (str, optional): the ETag of the payload. Defaults to the one given to the writer.
+
+        Returns:
+            CacheEntry: the new entry
+        """
+        self._file.close()
+        try:
+            self.entry = self.cache._commit(self._tmp_path, self.key, self.filename, self.bbox, etag or self.etag)
+        except BaseException:
+            self.discard()
+            raise
+        return self.entry
+
+    def discard(self):
+        """Drop the payload written so far."""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
@@ -0,0 +1,246 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Pre-parsed OSM data, saved as NumPy .npz archives.
+
+The result of the XML parsing is kept as flat arrays:
+- the node ids, latitudes and longitudes;
+- the way ids, and the node references of all the ways concatenated, with
+  CSR offsets (the refs of way i are refs[way_offsets[i]:way_offsets[i+1]]);
+- the tags of all the ways concatenated, with CSR offsets, as indices in
+  an interned string table (stored as a single UTF-8 blob and offsets);
+- the relation ids, their members (type, ref and role) and their tags,
+  laid out the same way.
+
+Loading such an archive skips the XML parsing entirely.
+'''
+
+from array import array
+
+import numpy as np
+
+from .osm_reader import OsmRelation, OsmWay
+
+# Bumped when the layout of the archive changes
+NPZ_VERSION = 2
+# The types of the relation members, stored as their index
+MEMBER_TYPES = ("node", "way", "relation")
+
+class ParsedOsm:
+    """Parsed OSM data, exposing the same interface as OsmReader.
+
+    Args:
+        bounds (tuple): the (minlat, minlon, maxlat, maxlon) of the data
+        node_ids (numpy.ndarray): the node ids
+        node_lats (numpy.ndarray): the node latitudes
+        node_lons (numpy.ndarray): the node longitudes
+        way_ids (numpy.ndarray): the way ids
+        way_offsets (numpy.ndarray): the CSR offsets of the way refs
+        way_refs (numpy.ndarray): the node refs of all the ways
+        tag_offsets (numpy.ndarray): the CSR offsets of the way tags
+        tag_keys (numpy.ndarray): the string index of the key of each tag
+        tag_values (numpy.ndarray): the string index of the value of each tag
+        strings (list): the interned strings
+        relations (list, optional): the OsmRelation. Defaults to None.
+    """
+
+    def __init__(self, bounds, node_ids, node_lats, node_lons, way_ids, way_offsets, way_refs, tag_offsets, tag_keys, tag_values, strings, relations=None):
+        self.bounds = bounds
+        self.node_ids = node_ids
+        self.node_lats = node_lats
+        self.node_lons = node_lons
+        self.way_ids = way_ids
+        self.way_offsets = way_offsets
+        self.way_refs = way_refs
+        self.tag_offsets = tag_offsets
+        self.tag_keys = tag_keys
+        self.tag_values = tag_values
+        self.strings = strings
+        self.relations = relations if relations is not None else []
+        self._current = 0
+
+    @classmethod
+    def from_reader(cls, reader):
+        """Parse all the nodes, ways and relations of a reader.
+
+        Args:
+            reader (OsmReader): the reader
+
+        Returns:
+            ParsedOsm: the parsed data
+        """
+        with reader:
+            reader.read_nodes()
+            (way_ids, way_offsets, way_refs) = (array('q'), array('q', [0]), array('q'))
+            (tag_offsets, tag_keys, tag_values) = (array('q', [0]), array('i'), array('i'))
+            interned = {}
+            for way in reader.ways():
+                way_ids.append(way.id)
+                way_refs.extend(way.refs)
+                way_offsets.append(len(way_refs))
+                for key, value in way.tags.items():
+                    tag_keys.append(interned.setdefault(key, len(interned)))
+                    tag_values.append(interned.setdefault(value, len(interned)))
+                tag_offsets.append(len(tag_keys))
+        return cls(
+            reader.bounds,
+            np.asarray(reader.node_ids, dtype=np.int64),
+            np.asarray(reader.node_lats, dtype=np.float64),
+            np.asarray(reader.node_lons, dtype=np.float64),
+            np.asarray(way_ids, dtype=np.int64),
+            np.asarray(way_offsets, dtype=np.int64),
+            np.asarray(way_refs, dtype=np.int64),
+            np.asarray(tag_offsets, dtype=np.int64),
+            np.asarray(tag_keys, dtype=np.int32),
+            np.asarray(tag_values, dtype=np.int32),
+            list(interned),
+            reader.relations)
+
+    def save(self, f):
+        """Save the data as an uncompressed .npz archive.
+
+        Args:
+            f (str|file): the file name or the binary file object
+        """
+        # NOTE: the strings of the relations are interned after the ones of the ways
+        interned = { string: i for i, string in enumerate(self.strings) }
+        (member_offsets, member_types, member_refs, member_roles) = (array('q', [0]), array('b'), array('q'), array('i'))
+        (relation_tag_offsets, relation_tag_keys, relation_tag_values) = (array('q', [0]), array('i'), array('i'))
+        for relation in self.relations:
+            for type, ref, role in relation.members:
+                member_types.append(MEMBER_TYPES.index(type))
+                member_refs.append(ref)
+                member_roles.append(interned.setdefault(role, len(interned)))
+            member_offsets.append(len(member_refs))
+            for key, value in relation.tags.items():
+                relation_tag_keys.append(interned.setdefault(key, len(interned)))
+                relation_tag_values.append(interned.setdefault(value, len(interned)))
+            relation_tag_offsets.append(len(relation_tag_keys))
+        encoded = [ s.encode("utf-8") for s in interned ]
+        string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        string_offsets[1:] = np.cumsum([ len(e) for e in encoded ])
+        np.savez(f,
+            version=np.array([NPZ_VERSION]),
+            bounds=np.array(self.bounds if self.bounds else [np.nan]*4, dtype=np.float64),
+            node_ids=self.node_ids,
+            node_lats=self.node_lats,
+            node_lons=self.node_lons,
+            way_ids=self.way_ids,
+            way_offsets=self.way_offsets,
+            way_refs=self.way_refs,
+            tag_offsets=self.tag_offsets,
+            tag_keys=self.tag_keys,
+            tag_values=self.tag_values,
+            relation_ids=np.array([ relation.id for relation in self.relations ], dtype=np.int64),
+            member_offsets=np.asarray(member_offsets, dtype=np.int64),
+            member_types=np.asarray(member_types, dtype=np.int8),
+            member_refs=np.asarray(member_refs, dtype=np.int64),
+            member_roles=np.asarray(member_roles, dtype=np.int32),
+            relation_tag_offsets=np.asarray(relation_tag_offsets, dtype=np.int64),
+            relation_tag_keys=np.asarray(relation_tag_keys, dtype=np.int32),
+            relation_tag_values=np.asarray(relation_tag_values, dtype=np.int32),
+            string_blob=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            string_offsets=string_offsets)
+
+    @classmethod
+    def load(cls, f):
+        """Load an archive written by save().
+
+        Args:
+            f (str|file): the file name or the binary file object
+
+        Returns:
+            ParsedOsm: the data, None if the archive has another version
+        """
+        with np.load(f, allow_pickle=False) as archive:
+            if int(archive["version"][0]) != NPZ_VERSION:
+                return None
+            blob = archive["string_blob"].tobytes()
+            offsets = archive["string_offsets"].tolist()
+            strings = [ blob[a:b].decode("utf-8") for a, b in zip(offsets[:-1], offsets[1:]) ]
+            bounds = archive["bounds"]
+            relations = []
+            member_offsets = archive["member_offsets"].tolist()
+            member_types = [ MEMBER_TYPES[i] for i in archive["member_types"].tolist() ]
+            member_refs = archive["member_refs"].tolist()
+            member_roles = [ strings[i] for i in archive["member_roles"].tolist() ]
+            tag_offsets = archive["relation_tag_offsets"].tolist()
+            keys = [ strings[i] for i in archive["relation_tag_keys"].tolist() ]
+            values = [ strings[i] for i in archive["relation_tag_values"].tolist() ]
+            for i, relation_id in enumerate(archive["relation_ids"].tolist()):
+                (a, b) = (member_offsets[i], member_offsets[i + 1])
+                members = list(zip(member_types[a:b], member_refs[a:b], member_roles[a:b]))
+                (a, b) = (tag_offsets[i], tag_offsets[i + 1])
+                relations.append(OsmRelation(relation_id, members, dict(zip(keys[a:b], values[a:b]))))
+            return cls(
+                None if np.isnan(bounds).any() else tuple(bounds.tolist()),
+                archive["node_ids"],
+                archive["node_lats"],
+                archive["node_lons"],
+                archive["way_ids"],
+                archive["way_offsets"],
+                archive["way_refs"],
+                archive["tag_offsets"],
+                archive["tag_keys"],
+                archive["tag_values"],
+                strings,
+                relations)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        pass
+
+    def progress(self):
+        """Returns the fraction of the ways consumed so far."""
+        if not len(self.way_ids):
+            return 1.0
+        return self._current / len(self.way_ids)
+
+    def read_nodes(self):
+        """Returns the number of nodes, which are already available."""
+        return len(self.node_ids)
+
+    def ways(self):
+        """Yields the ways one at a time.
+
+        NOTE: the node references are a slice of the refs array.
+
+        Yields:
+            OsmWay: the way id, its node references and its tags
+        """
+        way_ids = self.way_ids.tolist()
+        way_offsets = self.way_offsets.tolist()
+        tag_offsets = self.tag_offsets.tolist()
+        strings = self.strings
+        keys = [ strings[i] for i in self.tag_keys.tolist() ]
+        values = [ strings[i] for i in self.tag_values.tolist() ]
+        for i, way_id in enumerate(way_ids):
+            self._current = i
+            (a, b) = (tag_offsets[i], tag_offsets[i + 1])
+            yield OsmWay(way_id, self.way_refs[way_offsets[i]:way_offsets[i + 1]], dict(zip(keys[a:b], values[a:b])))
+        self._current = len(way_ids)
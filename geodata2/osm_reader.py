@@ -0,0 +1,176 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import gzip
+import lzma
+import os
+import xml.etree.ElementTree as ET
+from array import array
+from collections import namedtuple
+
+# A way as read from the OSM file: its id, the list of node ids it references
+# and the dict of its tags.
+OsmWay = namedtuple("OsmWay", ["id", "refs", "tags"])
+# A relation as read from the OSM file: its id, the list of the (type, ref,
+# role) of its members and the dict of its tags.
+OsmRelation = namedtuple("OsmRelation", ["id", "members", "tags"])
+
+class OsmReader:
+    """Streaming reader for OSM XML data.
+
+    The file is parsed with ``ET.iterparse`` and every element is released as
+    soon as it has been consumed, so that the whole XML tree never lives in
+    memory. Nodes are stored in compact coordinate arrays while ways are
+    yielded one at a time, which lets the caller build the geometry of a way
+    while the rest of the file is still being parsed.
+
+    OSM files list all the nodes before the ways, and the relations after
+    them, so the typical usage is::
+
+        reader = OsmReader(filename)
+        reader.read_nodes()
+        for way in reader.ways():
+            ...
+        for relation in reader.relations:
+            ...
+
+    Args:
+        source (str|file): the OSM file name (possibly .gz or .xz compressed) or a binary file object
+        owns_file (bool, optional): whether to close the file object given as source when done. Defaults to False.
+    """
+
+    def __init__(self, source, owns_file=False):
+        if isinstance(source, (str, bytes, os.PathLike)):
+            name = os.fsdecode(source)
+            if name.endswith(".gz"):
+                self._file = gzip.open(name, "rb")
+            elif name.endswith(".xz"):
+                self._file = lzma.open(name, "rb")
+            else:
+                self._file = open(name, "rb")
+            self._owns_file = True
+        else:
+            self._file = source
+            self._owns_file = owns_file
+        # NOTE: for compressed files, the progress is measured on the
+        #   compressed stream, as its size is the only one known upfront.
+        self._raw = getattr(self._file, "fileobj", None) or getattr(self._file, "_fp", None) or self._file
+        try:
+            self._size = os.fstat(self._raw.fileno()).st_size
+        except (AttributeError, OSError, ValueError):
+            self._size = 0
+        self._events = ET.iterparse(self._file, events=("start", "end"))
+        self._root = None
+        self._in_ways = False
+        self.bounds = None
+        self.node_ids = array('q')
+        self.node_lats = array('d')
+        self.node_lons = array('d')
+        # the OsmRelation, read along with the ways
+        self.relations = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Release the underlying file if it has been opened by the reader."""
+        if self._owns_file and not self._file.closed:
+            self._file.close()
+
+    def progress(self):
+        """Returns the fraction of the file consumed so far.
+
+        Returns:
+            float: a number between 0 and 1, or 0 if the size is unknown
+        """
+        if self._file.closed:
+            return 1.0
+        if not self._size:
+            return 0.0
+        return min(1.0, self._raw.tell() / self._size)
+
+    def read_nodes(self):
+        """Consume the bounds and the nodes of the file.
+
+        Stops as soon as the first way is encountered, leaving it for
+        ``ways()``.
+
+        Returns:
+            int: the number of nodes read
+        """
+        for event, element in self._events:
+            if event == "start":
+                if self._root is None:
+                    self._root = element
+                elif element.tag in ("way", "relation"):
+                    self._in_ways = True
+                    break
+                continue
+            if element.tag == "node":
+                self.node_ids.append(int(element.get('id')))
+                self.node_lats.append(float(element.get('lat')))
+                self.node_lons.append(float(element.get('lon')))
+                self._release(element)
+            elif element.tag == "bounds":
+                self.bounds = tuple(float(element.get(k)) for k in ("minlat", "minlon", "maxlat", "maxlon"))
+                self._release(element)
+        return len(self.node_ids)
+
+    def ways(self):
+        """Yields the ways of the file one at a time.
+
+        The relations are kept in the relations list, complete once all
+        the ways have been consumed.
+
+        Yields:
+            OsmWay: the way id, its node references and its tags
+        """
+        if not self._in_ways:
+            self.read_nodes()
+        for event, element in self._events:
+            if event != "end":
+                continue
+            if element.tag == "way":
+                refs = [ int(nd.get('ref')) for nd in element.iter('nd') ]
+                tags = { tag.get('k'): tag.get('v') for tag in element.iter('tag') }
+                way_id = int(element.get('id'))
+                self._release(element)
+                yield OsmWay(way_id, refs, tags)
+            elif element.tag == "relation":
+                members = [ (member.get('type'), int(member.get('ref')), member.get('role', '')) for member in element.iter('member') ]
+                tags = { tag.get('k'): tag.get('v') for tag in element.iter('tag') }
+                self.relations.append(OsmRelation(int(element.get('id')), members, tags))
+                self._release(element)
+            elif element.tag == "node":
+                self._release(element)
+        self.close()
+
+    def _release(self, element):
+        """Free the memory held by an element that has been consumed."""
+        element.clear()
+        if self._root is not None:
+            # NOTE: the root keeps a reference on each of its children
+            self._root.clear()
@@ -0,0 +1,389 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''OSM data cached as a pyramid of z/x/y tiles.
+
+The downloads are made tile by tile (with the usual slippy map tiling of
+https://wiki.openstreetmap.org/wiki/Slippy_map_tilenames) and each tile is
+stored in the OsmCache. A bbox is then served from the tiles covering it,
+so that panning the map only downloads the new tiles. The zoom of the
+tiles follows the zoom of the import (see tile_zoom), so that an import
+at a low zoom is served by a few large tiles rather than by thousands of
+small ones.
+
+The missing tiles are downloaded concurrently by a small thread pool. A
+tile refused by the API (e.g. HTTP 400 when it holds more nodes than the
+API limit) is split into its 4 children, recursively, and the parts are
+merged back into a single payload before being cached.
+
+NOTE: the OSM API returns the ways crossing the requested bbox with all
+their nodes, so neighbouring tiles share nodes and ways. They are
+deduplicated by id when the parts of a split tile are merged, and across
+the tiles by import_osm.stream_osm.
+'''
+
+import io
+import math
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import FreeCAD as App
+
+from .http_client import STATUS_NETWORK_ERROR
+from .osm_npz import ParsedOsm
+from .osm_reader import OsmReader
+
+# The zoom of the smallest tiles, ~600m wide at the equator, i.e. a few
+# tiles for a zoom 17 import
+TILE_ZOOM = 16
+# The zoom of the largest tiles, ~10km wide at the equator
+MIN_TILE_ZOOM = 12
+# The tiles are that many zoom levels above the zoom of the import, i.e.
+# at most about a hundred tiles per import
+TILE_ZOOM_OFFSET = 2
+# The latitude limit of the Web Mercator tiling
+MAX_LATITUDE = 85.0511287798
+# REF: https://operations.osmfoundation.org/policies/api/ allows at most 2
+#   download threads
+MAX_DOWNLOADS = 2
+# The HTTP status codes upon which a tile is split in 4
+SPLIT_STATUS_CODES = (400, 509)
+# The number of times a tile can be split, i.e. at most 4^4 requests per tile
+MAX_SPLIT_DEPTH = 4
+# The top level elements of an OSM file, in the order of the file
+OSM_ELEMENTS = ("node", "way", "relation")
+# The parts of a split tile are kept in memory up to that size, then on disk
+SPOOL_SIZE = 4*1024*1024
+
+class TileDownloadError(Exception):
+    """Raised when a tile cannot be downloaded.
+
+    Args:
+        status_code (int): the HTTP status code of the failure
+    """
+
+    def __init__(self, status_code):
+        if status_code == STATUS_NETWORK_ERROR:
+            Exception.__init__(self, "Download failed (network error).")
+        else:
+            Exception.__init__(self, f"Download failed (HTTP {status_code}).")
+        self.status_code = status_code
+
+def _tile_xy(latitude, longitude, zoom):
+    """Returns the x / y of the tile containing a map coordinate."""
+    n = 2**zoom
+    latitude = max(-MAX_LATITUDE, min(MAX_LATITUDE, latitude))
+    x = int((longitude + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2.0 * n)
+    return (max(0, min(n - 1, x)), max(0, min(n - 1, y)))
+
+def tile_bounds(tile):
+    """Returns the bounds of a tile.
+
+    Args:
+        tile (tuple): the (z, x, y) of the tile
+
+    Returns:
+        tuple: the (minlat, minlon, maxlat, maxlon) of the tile
+    """
+    (z, x, y) = tile
+    n = 2**z
+    def __latitude(y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    return (__latitude(y + 1), x / n * 360.0 - 180.0, __latitude(y), (x + 1) / n * 360.0 - 180.0)
+
+def tile_zoom(osm_zoom):
+    """Returns the zoom of the tiles serving an import.
+
+    NOTE: the tiles are not made larger than at MIN_TILE_ZOOM, as the API
+    refuses the larger ones in most places, and they would only be split
+    again. The area of an import below zoom 11 is larger than the 0.25
+    square degrees the API serves at once anyway.
+
+    Args:
+        osm_zoom (int): the OSM zoom level of the import
+
+    Returns:
+        int: the zoom of the tiles, between MIN_TILE_ZOOM and TILE_ZOOM
+    """
+    return max(MIN_TILE_ZOOM, min(TILE_ZOOM, int(osm_zoom) + TILE_ZOOM_OFFSET))
+
+def tiles_for_bbox(bbox, zoom=TILE_ZOOM):
+    """Returns the tiles covering a bbox.
+
+    Args:
+        bbox (tuple): the (minlat, minlon, maxlat, maxlon) to cover
+        zoom (int, optional): the zoom of the tiles. Defaults to TILE_ZOOM.
+
+    Returns:
+        list: the (z, x, y) of the tiles
+    """
+    (minlat, minlon, maxlat, maxlon) = bbox
+    (x0, y0) = _tile_xy(maxlat, minlon, zoom)
+    (x1, y1) = _tile_xy(minlat, maxlon, zoom)
+    return [ (zoom, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1) ]
+
+def tile_key(tile):
+    """Returns the OsmCache key of a tile."""
+    return "tile_{}_{}_{}".format(*tile)
+
+def child_tiles(tile):
+    """Returns the 4 tiles of the next zoom level covering a tile."""
+    (z, x, y) = tile
+    return [ (z + 1, 2*x + dx, 2*y + dy) for dx in (0, 1) for dy in (0, 1) ]
+
+def parsed_tile_key(tile):
+    """Returns the OsmCache key of the pre-parsed data of a tile."""
+    return "{}_parsed".format(tile_key(tile))
+
+def union_bounds(bounds):
+    """Returns the bbox containing all the given bboxes."""
+    bounds = list(bounds)
+    return (min(b[0] for b in bounds), min(b[1] for b in bounds), max(b[2] for b in bounds), max(b[3] for b in bounds))
+
+def merge_osm(payloads, bounds, out):
+    """Merges several OSM payloads into a single one.
+
+    The nodes, ways and relations present in several payloads are only
+    written once, and in the order expected by OsmReader (all the nodes,
+    then all the ways, then all the relations).
+
+    Args:
+        payloads (list): the OSM XML payloads, as bytes or seekable binary file objects
+        bounds (tuple): the (minlat, minlon, maxlat, maxlon) of the merged payload
+        out (file): the binary file object the merged payload is written to
+    """
+    out.write(b"<?xml version='1.0' encoding='UTF-8'?>\n<osm version=\"0.6\" generator=\"GeoData2\">\n")
+    out.write('<bounds minlat="{}" minlon="{}" maxlat="{}" maxlon="{}"/>\n'.format(*bounds).encode())
+    for element in OSM_ELEMENTS:
+        seen = set()
+        for payload in payloads:
+            if isinstance(payload, (bytes, bytearray)):
+                payload = io.BytesIO(payload)
+            payload.seek(0)
+            for _, elem in ET.iterparse(payload):
+                if elem.tag not in OSM_ELEMENTS:
+                    continue
+                if elem.tag == element and elem.get("id") not in seen:
+                    seen.add(elem.get("id"))
+                    elem.tail = "\n"
+                    out.write(ET.tostring(elem, encoding="utf-8", xml_declaration=False))
+                elem.clear()
+    out.write(b"</osm>\n")
+
+class OsmTileStore:
+    """Serves bboxes of OSM data from the tiles stored in an OsmCache.
+
+    Args:
+        cache (OsmCache): the cache holding the tiles
+        fetch (func): downloads a bbox, called as fetch(bbox, sink) to write the data into the binary file
+            object sink, and returning the HTTP status code and the ETag (None if unknown). It is called from
+            several threads at once.
+        zoom (int, optional): the zoom of the tiles. Defaults to TILE_ZOOM.
+        workers (int, optional): the maximum number of concurrent downloads. Defaults to MAX_DOWNLOADS.
+    """
+
+    def __init__(self, cache, fetch, zoom=TILE_ZOOM, workers=MAX_DOWNLOADS):
+        self.cache = cache
+        self.fetch = fetch
+        self.zoom = zoom
+        self.workers = workers
+
+    def missing_tiles(self, bbox):
+        """Returns the tiles covering the bbox that are not in the cache."""
+        return [ tile for tile in tiles_for_bbox(bbox, self.zoom) if self.cache.lookup(tile_key(tile)) is None ]
+
+    def _fetch_part(self, part, tile):
+        """Download a part of a tile.
+
+        A whole tile is streamed straight into the cache, while the parts
+        of a split tile are spooled until merged.
+
+        Returns:
+            tuple: the HTTP status code and the spooled part (None for a whole tile, or on error)
+        """
+        bounds = tile_bounds(part)
+        App.Console.PrintLog(f"Downloading tile {part} {bounds} ...\n")
+        if part == tile:
+            with self.cache.open_writer(tile_key(tile), bounds) as writer:
+                (status_code, etag) = self.fetch(bounds, writer)
+                if status_code == 200:
+                    writer.commit(etag)
+                    self.cache.remove(parsed_tile_key(tile))
+            return (status_code, None)
+        f = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        try:
+            (status_code, _) = self.fetch(bounds, f)
+        except BaseException:
+            f.close()
+            raise
+        if status_code != 200:
+            f.close()
+            return (status_code, None)
+        return (status_code, f)
+
+    def _store_tile(self, tile, parts):
+        bounds = tile_bounds(tile)
+        App.Console.PrintLog(f"Merging {len(parts)} part(s) of tile {tile} ...\n")
+        with self.cache.open_writer(tile_key(tile), bounds) as writer:
+            merge_osm(parts, bounds, writer)
+            writer.commit()
+        self.cache.remove(parsed_tile_key(tile))
+
+    def iter_fetch_tiles(self, tiles, callback=None):
+        """Download tiles into the cache, concurrently, yielding each tile once cached.
+
+        The tiles refused with one of SPLIT_STATUS_CODES are split in 4,
+        up to MAX_SPLIT_DEPTH times, and their parts merged once all
+        downloaded. A tile is only cached once complete. The downloads go
+        on while the caller processes the tiles yielded so far; closing
+        the generator cancels the pending ones.
+
+        Args:
+            tiles (list): the (z, x, y) of the tiles
+            callback (func, optional): called as callback(done, total) with the number of requests
+                completed and issued so far, from the calling thread. It can raise to abort the
+                downloads (e.g. ImportCancelled). Defaults to None.
+
+        Yields:
+            tuple: the (z, x, y) of each tile, in the order of completion
+
+        Raises:
+            TileDownloadError: for the first tile that cannot be downloaded
+        """
+        # the parts downloaded and the number of parts pending for each tile
+        parts = { tile: [] for tile in tiles }
+        pending = { tile: 1 for tile in tiles }
+        (done, total) = (0, len(tiles))
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="OsmDownload")
+        futures = { pool.submit(self._fetch_part, tile, tile): (tile, tile) for tile in tiles }
+        try:
+            while futures:
+                (completed, _) = wait(futures, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    (part, tile) = futures.pop(future)
+                    (status_code, data) = future.result()
+                    done += 1
+                    if status_code == 200:
+                        # NOTE: a whole tile is already in the cache
+                        if data is not None:
+                            parts[tile].append(data)
+                        pending[tile] -= 1
+                        if not pending[tile]:
+                            if parts[tile]:
+                                self._store_tile(tile, parts[tile])
+                            for f in parts.pop(tile):
+                                f.close()
+                            yield tile
+                    elif status_code in SPLIT_STATUS_CODES and part[0] - tile[0] < MAX_SPLIT_DEPTH:
+                        App.Console.PrintLog(f"Splitting tile {part} after HTTP {status_code} ...\n")
+                        for child in child_tiles(part):
+                            futures[pool.submit(self._fetch_part, child, tile)] = (child, tile)
+                        pending[tile] += 3
+                        total += 4
+                    else:
+                        App.Console.PrintWarning(f"Failed to download tile {part}: HTTP {status_code}\n")
+                        raise TileDownloadError(status_code)
+                if callback:
+                    callback(done, total)
+        finally:
+            # NOTE: the downloads in progress are not waited for, so that a
+            #   cancelled import returns at once. They end in the background,
+            #   the tiles they complete still go to the cache.
+            pool.shutdown(wait=False, cancel_futures=True)
+            for f in (f for fs in parts.values() for f in fs):
+                f.close()
+
+    def fetch_tiles(self, tiles, callback=None):
+        """Download tiles into the cache, concurrently.
+
+        Args:
+            see iter_fetch_tiles
+
+        Returns:
+            int: the HTTP status code, 200 if all the tiles have been downloaded, otherwise the
+                one of the first failure
+        """
+        try:
+            for _ in self.iter_fetch_tiles(tiles, callback):
+                pass
+        except TileDownloadError as e:
+            return e.status_code
+        return 200
+
+    def fetch_tile(self, tile):
+        """Download a tile into the cache.
+
+        Args:
+            tile (tuple): the (z, x, y) of the tile
+
+        Returns:
+            int: the HTTP status code
+        """
+        return self.fetch_tiles([tile])
+
+    def parsed_tile(self, tile, entry):
+        """Returns the parsed data of a tile.
+
+        The data is loaded from its .npz archive if any, otherwise the XML
+        is parsed and the archive is added to the cache.
+
+        Args:
+            tile (tuple): the (z, x, y) of the tile
+            entry (CacheEntry): the cache entry of the XML of the tile
+
+        Returns:
+            ParsedOsm: the data
+        """
+        parsed_entry = self.cache.lookup(parsed_tile_key(tile))
+        if parsed_entry is not None:
+            parsed = ParsedOsm.load(self.cache.path(parsed_entry))
+            if parsed is not None:
+                return parsed
+        parsed = ParsedOsm.from_reader(OsmReader(self.cache.open(entry), owns_file=True))
+        buffer = io.BytesIO()
+        parsed.save(buffer)
+        buffer.seek(0)
+        self.cache.put(parsed_tile_key(tile), buffer, entry[2:6], compression="none", extension=".npz")
+        return parsed
+
+    def read_tile(self, tile):
+        """Returns the parsed data of a tile, downloaded first if missing.
+
+        Args:
+            tile (tuple): the (z, x, y) of the tile
+
+        Returns:
+            ParsedOsm: the data
+
+        Raises:
+            TileDownloadError: if the tile cannot be downloaded
+        """
+        entry = self.cache.lookup(tile_key(tile))
+        if entry is None:
+            status_code = self.fetch_tile(tile)
+            if status_code != 200:
+                raise TileDownloadError(status_code)
+            entry = self.cache.lookup(tile_key(tile))
+        return self.parsed_tile(tile, entry)
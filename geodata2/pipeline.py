@@ -0,0 +1,318 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Staged producer / consumer pipelines.
+
+Each stage runs in its own worker thread(s): it takes the items of the
+previous stage from its queue, and puts its own items into its queue, to
+be taken by the next stage, or by the consumer for the last one. The
+queues are bounded, so that a stage waits when its consumer falls behind
+instead of piling up items, while all the stages run at the same time.
+
+Usage::
+
+    pipeline = Pipeline([
+        Stage("download", download_tiles),
+        Stage("parse", parse_tile),
+    ]).start()
+    try:
+        for item in pipeline:
+            ...
+    finally:
+        pipeline.close()
+        pipeline.join()
+        pipeline.log_report()
+
+The time spent by each stage is accounted for, in order to find the
+bottleneck: a stage is busy while it produces its items, blocked while
+its queue is full, and otherwise starved.
+'''
+
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import FreeCAD as App
+
+# The default capacity of the queue of a stage
+QUEUE_SIZE = 8
+# How often the waiting threads check whether the pipeline is closed, in seconds
+POLL_INTERVAL = 0.05
+
+# Marks the end of the items of a stage
+_END = object()
+
+# The statistics of a stage: the number of items taken and put, the wall
+# time since the start, the time spent busy and blocked on the full queue
+# (summed over the workers), the throughput in items per second, and the
+# current / maximum / capacity of the queue
+StageStats = namedtuple("StageStats", ["name", "items_in", "items_out", "elapsed", "busy", "blocked", "throughput", "depth", "max_depth", "capacity"])
+
+class PipelineClosed(Exception):
+    """Raised in the worker threads of a pipeline once it is closed."""
+
+class Stage:
+    """A stage of a Pipeline.
+
+    Args:
+        name (str): the name of the stage, used in the reports and the thread names
+        function (func): for the first stage, called without argument; for the other stages, called
+            with each item of the previous stage. It returns an iterable (e.g. it is a generator) of
+            any number of items.
+        workers (int, optional): the number of worker threads. The items are kept in order with
+            a single worker only. Defaults to 1.
+        queue_size (int, optional): the capacity of the queue of the stage. Defaults to QUEUE_SIZE.
+    """
+
+    def __init__(self, name, function, workers=1, queue_size=QUEUE_SIZE):
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.queue = queue.Queue(queue_size)
+        self.items_in = 0
+        self.items_out = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.max_depth = 0
+        self.finished = None
+        self._running = workers
+        self._lock = threading.Lock()
+
+    def stats(self, started):
+        """Returns the StageStats of the stage.
+
+        Args:
+            started (float): the time.perf_counter() of the start of the pipeline
+        """
+        end = self.finished if self.finished is not None else time.perf_counter()
+        elapsed = max(end - started, 1e-9)
+        return StageStats(self.name, self.items_in, self.items_out, elapsed, self.busy, self.blocked,
+            self.items_out/elapsed, self.queue.qsize(), self.max_depth, self.queue.maxsize)
+
+class Pipeline:
+    """Runs stages in worker threads, connected by bounded queues.
+
+    The first exception raised by a stage closes the pipeline and is
+    re-raised to the consumer.
+
+    Args:
+        stages (list): the Stage, in order
+        name (str, optional): the name of the pipeline, used in the reports and the thread names.
+            Defaults to "Pipeline".
+    """
+
+    def __init__(self, stages, name="Pipeline"):
+        self.stages = stages
+        self.name = name
+        self.error = None
+        self.done = False
+        self.started = None
+        self.finished = None
+        self._closed = threading.Event()
+        self._threads = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        self.join()
+
+    def start(self):
+        """Start the worker threads.
+
+        Returns:
+            Pipeline: self
+        """
+        self.started = time.perf_counter()
+        upstream = None
+        for stage in self.stages:
+            for i in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._run,
+                    args=(stage, upstream),
+                    name=f"{self.name}-{stage.name}-{i}",
+                    daemon=True)
+                self._threads.append(thread)
+            upstream = stage
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    @property
+    def closed(self):
+        return self._closed.is_set()
+
+    def check(self):
+        """Raise PipelineClosed once the pipeline is closed.
+
+        NOTE: meant for the long running stage functions (e.g. downloads),
+        which are otherwise only stopped between two items.
+        """
+        if self._closed.is_set():
+            raise PipelineClosed()
+
+    def close(self):
+        """Stop the worker threads, without waiting for them."""
+        self._closed.set()
+
+    def join(self, timeout=None):
+        """Wait for the worker threads to stop.
+
+        Args:
+            timeout (float, optional): the maximum time to wait for each thread, in seconds.
+                Defaults to None, i.e. until they stop.
+        """
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _put(self, stage, item):
+        start = time.perf_counter()
+        while True:
+            self.check()
+            try:
+                stage.queue.put(item, timeout=POLL_INTERVAL)
+                break
+            except queue.Full:
+                pass
+        with stage._lock:
+            stage.blocked += time.perf_counter() - start
+            stage.max_depth = max(stage.max_depth, stage.queue.qsize())
+
+    def _get(self, stage):
+        while True:
+            self.check()
+            try:
+                return stage.queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                pass
+
+    def _feed(self, stage, items):
+        # NOTE: the time spent in the function, including the generator
+        #   steps, is the busy time of the stage.
+        start = time.perf_counter()
+        iterator = iter(items)
+        try:
+            while True:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    with stage._lock:
+                        stage.busy += time.perf_counter() - start
+                    return
+                with stage._lock:
+                    stage.busy += time.perf_counter() - start
+                    stage.items_out += 1
+                self._put(stage, item)
+                start = time.perf_counter()
+        finally:
+            # NOTE: a generator left suspended by the closing of the
+            #   pipeline runs its `finally` blocks (e.g. to cancel downloads)
+            if hasattr(iterator, "close"):
+                iterator.close()
+
+    def _run(self, stage, upstream):
+        try:
+            if upstream is None:
+                self._feed(stage, stage.function())
+            else:
+                while True:
+                    item = self._get(upstream)
+                    if item is _END:
+                        # NOTE: left for the other workers of the stage
+                        upstream.queue.put(_END)
+                        break
+                    with stage._lock:
+                        stage.items_in += 1
+                    self._feed(stage, stage.function(item))
+            with stage._lock:
+                stage._running -= 1
+                last = not stage._running
+            if last:
+                if upstream is not None:
+                    # the end left by the last worker
+                    upstream.queue.get_nowait()
+                stage.finished = time.perf_counter()
+                self._put(stage, _END)
+        except PipelineClosed:
+            pass
+        except BaseException as e:
+            if self.error is None:
+                self.error = e
+            self.close()
+
+    def _raise(self):
+        if self.error is not None:
+            raise self.error
+
+    def poll(self, timeout=0.0):
+        """Returns the items of the last stage ready so far.
+
+        Args:
+            timeout (float, optional): the maximum time to wait for the first item, in seconds.
+                Defaults to 0.0, i.e. not to wait.
+
+        Returns:
+            list: the items, empty if none is ready or once done
+
+        Raises:
+            Exception: the exception raised by a stage
+        """
+        last = self.stages[-1].queue
+        items = []
+        try:
+            item = last.get(timeout=timeout) if timeout > 0 else last.get_nowait()
+            while item is not _END:
+                items.append(item)
+                item = last.get_nowait()
+            self.done = True
+            self.finished = time.perf_counter()
+        except queue.Empty:
+            pass
+        self._raise()
+        return items
+
+    def __iter__(self):
+        """Yields the items of the last stage, waiting for them."""
+        while not self.done:
+            yield from self.poll(POLL_INTERVAL)
+
+    def stats(self):
+        """Returns the StageStats of each stage."""
+        return [ stage.stats(self.started) for stage in self.stages ]
+
+    def report(self):
+        """Returns a human readable report of the stage statistics."""
+        end = self.finished if self.finished is not None else time.perf_counter()
+        lines = [ f"{self.name}: {end - self.started:.3f}s" ]
+        for s in self.stats():
+            lines.append(
+                f"  {s.name}: {s.items_in} in, {s.items_out} out, {s.throughput:.1f} item(s)/s,"
+                f" busy {s.busy:.3f}s, blocked {s.blocked:.3f}s, queue {s.depth}/{s.capacity} (max {s.max_depth})")
+        return "\n".join(lines)
+
+    def log_report(self):
+        """Log the report of the stage statistics."""
+        if self.started is not None:
+            App.Console.PrintLog(self.report() + "\n")
@@ -0,0 +1,74 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Progress reporting and cancellation of the imports.'''
+
+import time
+
+import FreeCAD as App
+
+# At most 20 progress updates per second
+PROGRESS_INTERVAL = 0.05
+
+class ImportCancelled(Exception):
+    """Raised when the user cancels an import."""
+
+def _log_progress(progress, status):
+    App.Console.PrintLog(f"{status} ({progress}/100)\n")
+
+class ThrottledProgress:
+    """Coalesces the calls to a progress callback.
+
+    The callback is only called when the status changes, when the import
+    completes or when at least `interval` seconds elapsed since the last
+    call. The calls in between are dropped, so that importers can report
+    their progress for every item without paying for a GUI refresh each
+    time.
+
+    Args:
+        callback (func): a function to set the progress porcentage and the status. Defaults to logging.
+        cancelled (func, optional): a function returning True when the import is cancelled. Defaults to None.
+        interval (float, optional): the minimum time between 2 calls in seconds. Defaults to PROGRESS_INTERVAL.
+    """
+
+    def __init__(self, callback=None, cancelled=None, interval=PROGRESS_INTERVAL):
+        self.callback = callback or _log_progress
+        self.cancelled = cancelled
+        self.interval = interval
+        self.last_time = None
+        self.last_status = None
+
+    def __call__(self, progress, status):
+        now = time.monotonic()
+        if (status != self.last_status
+                or progress >= 100
+                or self.last_time is None
+                or now - self.last_time >= self.interval):
+            self.last_time = now
+            self.last_status = status
+            self.callback(progress, status)
+
+    def check(self):
+        """Raise ImportCancelled if the import has been cancelled."""
+        if self.cancelled and self.cancelled():
+            raise ImportCancelled()
@@ -0,0 +1,372 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Ellipsoidal projections.
+
+All the projections share the interface of TransverseMercator
+(fromGeographic / toGeographic and their *Array counterparts) and return
+coordinates in mm, the FreeCAD document unit.
+'''
+
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from .TransverseMercator import TransverseMercator
+
+# REF: https://en.wikipedia.org/wiki/World_Geodetic_System
+Ellipsoid = namedtuple("Ellipsoid", ["a", "f"])
+WGS84 = Ellipsoid(6378137.0, 1/298.257223563)
+
+# Number of document units (mm) in a meter
+UNIT = 1000.0
+
+@lru_cache(maxsize=None)
+def _kruger_coefficients(ellipsoid):
+    """Returns the constants of the Krüger series for an ellipsoid.
+
+    REF: C. F. F. Karney, "Transverse Mercator with an accuracy of a few
+    nanometers", J. Geodesy 85(8), 475-485 (2011), series to order n^6.
+
+    Args:
+        ellipsoid (Ellipsoid): the ellipsoid
+
+    Returns:
+        tuple: the eccentricity, the rectifying radius, the alpha and the
+            beta coefficients
+    """
+    f = ellipsoid.f
+    n = f / (2 - f)
+    n2, n3, n4, n5, n6 = n**2, n**3, n**4, n**5, n**6
+    e = np.sqrt(f * (2 - f))
+    A = ellipsoid.a / (1 + n) * (1 + n2/4 + n4/64 + n6/256)
+    alpha = np.array([
+        n/2 - 2*n2/3 + 5*n3/16 + 41*n4/180 - 127*n5/288 + 7891*n6/37800,
+        13*n2/48 - 3*n3/5 + 557*n4/1440 + 281*n5/630 - 1983433*n6/1935360,
+        61*n3/240 - 103*n4/140 + 15061*n5/26880 + 167603*n6/181440,
+        49561*n4/161280 - 179*n5/168 + 6601661*n6/7257600,
+        34729*n5/80640 - 3418889*n6/1995840,
+        212378941*n6/319334400,
+    ])
+    beta = np.array([
+        n/2 - 2*n2/3 + 37*n3/96 - n4/360 - 81*n5/512 + 96199*n6/604800,
+        n2/48 + n3/15 - 437*n4/1440 + 46*n5/105 - 1118711*n6/3870720,
+        17*n3/480 - 37*n4/840 - 209*n5/4480 + 5569*n6/90720,
+        4397*n4/161280 - 11*n5/504 - 830251*n6/7257600,
+        4583*n5/161280 - 108847*n6/3991680,
+        20648693*n6/638668800,
+    ])
+    return (e, A, alpha, beta)
+
+def _series(coefficients, xi, eta):
+    """Evaluate the Krüger series sums for the given xi / eta arrays.
+
+    The sums of c_j sin(2j(xi + i eta)) are evaluated in the complex plane
+    with the Clenshaw recurrence, which needs a single complex sin / cos
+    per point whatever the order of the series.
+
+    Returns:
+        tuple: the (xi, eta) corrections
+    """
+    zeta = 2*(xi + 1j*eta)
+    a = 2*np.cos(zeta)
+    (b1, b2) = (np.zeros_like(zeta), np.zeros_like(zeta))
+    for c in coefficients[::-1]:
+        (b1, b2) = (c + a*b1 - b2, b1)
+    s = b1 * np.sin(zeta)
+    return (s.real, s.imag)
+
+class EllipsoidalTransverseMercator:
+    """Ellipsoidal transverse Mercator projection (Krüger series).
+
+    The series coefficients are computed once per ellipsoid and the northing
+    of the origin once per instance, so that projecting only costs a handful
+    of vectorized operations per point.
+
+    Args:
+        lat (float, optional): the latitude of the origin in degree. Defaults to 0.
+        lon (float, optional): the central meridian in degree. Defaults to 0.
+        k (float, optional): the scale factor on the central meridian. Defaults to 1.
+        false_easting (float, optional): in meter. Defaults to 0.
+        false_northing (float, optional): in meter. Defaults to 0.
+        ellipsoid (Ellipsoid, optional): Defaults to WGS84.
+    """
+
+    def __init__(self, lat=0.0, lon=0.0, k=1.0, false_easting=0.0, false_northing=0.0, ellipsoid=WGS84):
+        self.lat = lat
+        self.lon = lon
+        self.k = k
+        self.false_easting = false_easting
+        self.false_northing = false_northing
+        self.ellipsoid = ellipsoid
+        (self._e, self._A, self._alpha, self._beta) = _kruger_coefficients(ellipsoid)
+        self._kA = self.k * self._A
+        self._origin_northing = 0.0
+        (_, origin_northing) = self._forward(np.float64(lat), np.float64(lon))
+        self._origin_northing = float(origin_northing)
+
+    def _conformal_tau(self, tau):
+        """Returns tan of the conformal latitude for tau = tan(latitude)."""
+        e = self._e
+        sigma = np.sinh(e * np.arctanh(e * tau / np.sqrt(1 + tau**2)))
+        return tau * np.sqrt(1 + sigma**2) - sigma * np.sqrt(1 + tau**2)
+
+    def _forward(self, lat, lon):
+        """Returns the easting / northing in meter, without the false origin."""
+        phi = np.radians(lat)
+        lam = np.radians(lon - self.lon)
+        tau_p = self._conformal_tau(np.tan(phi))
+        xi_p = np.arctan2(tau_p, np.cos(lam))
+        eta_p = np.arcsinh(np.sin(lam) / np.sqrt(tau_p**2 + np.cos(lam)**2))
+        (d_xi, d_eta) = _series(self._alpha, xi_p, eta_p)
+        x = self._kA * (eta_p + d_eta)
+        y = self._kA * (xi_p + d_xi) - self._origin_northing
+        return (x, y)
+
+    def _inverse(self, x, y):
+        """Returns the latitude / longitude in degree of easting / northing in meter."""
+        xi = (y - self.false_northing + self._origin_northing) / self._kA
+        eta = (x - self.false_easting) / self._kA
+        (d_xi, d_eta) = _series(self._beta, xi, eta)
+        xi_p = xi - d_xi
+        eta_p = eta - d_eta
+        tau_p = np.sin(xi_p) / np.sqrt(np.sinh(eta_p)**2 + np.cos(xi_p)**2)
+        lam = np.arctan2(np.sinh(eta_p), np.cos(xi_p))
+        # Newton iterations to invert the conformal latitude
+        e2 = self._e**2
+        tau = tau_p
+        for _ in range(5):
+            tau_i = self._conformal_tau(tau)
+            tau = tau + (tau_p - tau_i) / np.sqrt(1 + tau_i**2) \
+                * (1 + (1 - e2) * tau**2) / ((1 - e2) * np.sqrt(1 + tau**2))
+        return (np.degrees(np.arctan(tau)), self.lon + np.degrees(lam))
+
+    def fromGeographic(self, lat, lon):
+        (x, y) = self.fromGeographicArray([lat], [lon])
+        return (float(x[0]), float(y[0]))
+
+    def toGeographic(self, x, y):
+        (lat, lon) = self.toGeographicArray([x], [y])
+        return (float(lat[0]), float(lon[0]))
+
+    def fromGeographicArray(self, lat, lon):
+        """Project arrays of latitude / longitude.
+
+        Args:
+            lat (array_like): the latitudes in degrees
+            lon (array_like): the longitudes in degrees
+
+        Returns:
+            tuple: the (x, y) numpy arrays in mm
+        """
+        (x, y) = self._forward(np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64))
+        return ((x + self.false_easting) * UNIT, (y + self.false_northing) * UNIT)
+
+    def toGeographicArray(self, x, y):
+        """Inverse projection of arrays of x / y.
+
+        Args:
+            x (array_like): the x coordinates in mm
+            y (array_like): the y coordinates in mm
+
+        Returns:
+            tuple: the (lat, lon) numpy arrays in degrees
+        """
+        return self._inverse(np.asarray(x, dtype=np.float64) / UNIT, np.asarray(y, dtype=np.float64) / UNIT)
+
+def utm_zone(lat, lon):
+    """Returns the UTM zone of a location, including the Norway and Svalbard exceptions.
+
+    Args:
+        lat (float): the latitude in degree
+        lon (float): the longitude in degree
+
+    Returns:
+        tuple: the zone number and whether it is in the southern hemisphere
+    """
+    lon = (lon + 180) % 360 - 180
+    zone = int((lon + 180) // 6) + 1
+    if 56 <= lat < 64 and 3 <= lon < 12:
+        zone = 32
+    elif 72 <= lat < 84 and 0 <= lon < 42:
+        zone = 31 if lon < 9 else 33 if lon < 21 else 35 if lon < 33 else 37
+    return (min(zone, 60), lat < 0)
+
+class UTM(EllipsoidalTransverseMercator):
+    """Universal Transverse Mercator projection.
+
+    Args:
+        zone (int): the UTM zone number (1 to 60)
+        south (bool, optional): whether the zone is in the southern hemisphere. Defaults to False.
+    """
+
+    def __init__(self, zone, south=False, ellipsoid=WGS84):
+        self.zone = zone
+        self.south = south
+        super().__init__(
+            lat=0.0,
+            lon=6*zone - 183,
+            k=0.9996,
+            false_easting=500000.0,
+            false_northing=10000000.0 if south else 0.0,
+            ellipsoid=ellipsoid)
+
+    @classmethod
+    def for_location(cls, lat, lon):
+        """Returns the UTM projection of the zone containing the location.
+
+        Args:
+            lat (float): the latitude in degree
+            lon (float): the longitude in degree
+
+        Returns:
+            UTM: the projection
+        """
+        return cls(*utm_zone(lat, lon))
+
+class LocalTangentPlane:
+    """Local East-North-Up tangent plane.
+
+    Points are converted to earth centered (ECEF) coordinates and then
+    rotated into the tangent plane at the origin. Distances close to the
+    origin are exact, there is no projection distortion, only the drop of
+    the earth curvature (which is kept in the up coordinate).
+
+    Args:
+        lat (float, optional): the latitude of the origin in degree. Defaults to 0.
+        lon (float, optional): the longitude of the origin in degree. Defaults to 0.
+        height (float, optional): the ellipsoidal height of the origin in meter. Defaults to 0.
+        ellipsoid (Ellipsoid, optional): Defaults to WGS84.
+    """
+
+    def __init__(self, lat=0.0, lon=0.0, height=0.0, ellipsoid=WGS84):
+        self.lat = lat
+        self.lon = lon
+        self.height = height
+        self.ellipsoid = ellipsoid
+        self._e2 = ellipsoid.f * (2 - ellipsoid.f)
+        phi = np.radians(lat)
+        lam = np.radians(lon)
+        (sp, cp, sl, cl) = (np.sin(phi), np.cos(phi), np.sin(lam), np.cos(lam))
+        # rows: east, north, up
+        self._rotation = np.array([
+            [-sl, cl, 0.0],
+            [-sp*cl, -sp*sl, cp],
+            [cp*cl, cp*sl, sp],
+        ])
+        self._origin = self._to_ecef(np.array([lat]), np.array([lon]), np.array([height]))[:, 0]
+
+    def _to_ecef(self, lat, lon, height):
+        phi = np.radians(lat)
+        lam = np.radians(lon)
+        (sp, cp) = (np.sin(phi), np.cos(phi))
+        N = self.ellipsoid.a / np.sqrt(1 - self._e2 * sp**2)
+        return np.array([
+            (N + height) * cp * np.cos(lam),
+            (N + height) * cp * np.sin(lam),
+            (N * (1 - self._e2) + height) * sp,
+        ])
+
+    def _from_ecef(self, X, Y, Z):
+        # REF: Bowring's method, one iteration is enough on the earth surface
+        a = self.ellipsoid.a
+        b = a * (1 - self.ellipsoid.f)
+        ep2 = (a**2 - b**2) / b**2
+        p = np.hypot(X, Y)
+        theta = np.arctan2(Z * a, p * b)
+        phi = np.arctan2(Z + ep2 * b * np.sin(theta)**3, p - self._e2 * a * np.cos(theta)**3)
+        N = a / np.sqrt(1 - self._e2 * np.sin(phi)**2)
+        height = p / np.cos(phi) - N
+        return (np.degrees(phi), np.degrees(np.arctan2(Y, X)), height)
+
+    def fromGeographic(self, lat, lon):
+        (x, y) = self.fromGeographicArray([lat], [lon])
+        return (float(x[0]), float(y[0]))
+
+    def toGeographic(self, x, y):
+        (lat, lon) = self.toGeographicArray([x], [y])
+        return (float(lat[0]), float(lon[0]))
+
+    def fromGeographicArray(self, lat, lon, height=None):
+        """Project arrays of latitude / longitude on the tangent plane.
+
+        Args:
+            lat (array_like): the latitudes in degrees
+            lon (array_like): the longitudes in degrees
+            height (array_like, optional): the ellipsoidal heights in meter. Defaults to the origin height.
+
+        Returns:
+            tuple: the (east, north) numpy arrays in mm
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        height = np.full(lat.shape, self.height) if height is None else np.asarray(height, dtype=np.float64)
+        ecef = self._to_ecef(lat, lon, height) - self._origin.reshape((3,) + (1,)*lat.ndim)
+        (east, north, _) = np.tensordot(self._rotation, ecef, axes=1)
+        return (east * UNIT, north * UNIT)
+
+    def toGeographicArray(self, x, y):
+        """Inverse of fromGeographicArray for points lying on the ellipsoid.
+
+        Args:
+            x (array_like): the east coordinates in mm
+            y (array_like): the north coordinates in mm
+
+        Returns:
+            tuple: the (lat, lon) numpy arrays in degrees
+        """
+        east = np.asarray(x, dtype=np.float64) / UNIT
+        north = np.asarray(y, dtype=np.float64) / UNIT
+        # NOTE: the up coordinate is unknown, we iterate on the surface of the
+        #   ellipsoid at the origin height by correcting the curvature drop.
+        up = np.zeros(east.shape)
+        for _ in range(3):
+            ecef = np.tensordot(self._rotation.T, np.array([east, north, up]), axes=1) \
+                + self._origin.reshape((3,) + (1,)*east.ndim)
+            (lat, lon, height) = self._from_ecef(*ecef)
+            up = up - (height - self.height)
+        return (lat, lon)
+
+PROJECTIONS = ("spherical", "transverse_mercator", "utm", "enu")
+
+def make_projection(name, latitude, longitude):
+    """Returns a projection centered on the given location.
+
+    Args:
+        name (str): one of PROJECTIONS
+        latitude (float): the latitude of the center
+        longitude (float): the longitude of the center
+
+    Returns:
+        object: the projection
+    """
+    if name == "spherical":
+        return TransverseMercator()
+    if name == "transverse_mercator":
+        return EllipsoidalTransverseMercator(lat=latitude, lon=longitude)
+    if name == "utm":
+        return UTM.for_location(latitude, longitude)
+    if name == "enu":
+        return LocalTangentPlane(lat=latitude, lon=longitude)
+    raise ValueError(f"Unknown projection '{name}'. Expected one of {PROJECTIONS}")
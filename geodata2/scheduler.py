@@ -0,0 +1,113 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Cooperative scheduling of long running tasks in the GUI thread.'''
+
+import time
+
+import FreeCAD as App
+
+try:
+    from PySide2 import QtCore
+except ImportError:
+    QtCore = None
+
+# Time spent in a slice before yielding to the event loop, in seconds
+SLICE_BUDGET = 0.03
+
+class TimeSlicedScheduler:
+    """Runs a generator in slices from the Qt event loop.
+
+    Each call to next() on the generator is a step, which must be short
+    (e.g. the creation of the objects of a single way). Steps are run until
+    the time budget of the slice is spent, then the scheduler yields to the
+    event loop with a zero timeout QTimer, so that the view can be redrawn
+    and the user can orbit around the partial result, or cancel.
+
+    If the last value yielded in a slice is callable, it is called at the
+    end of the slice (e.g. to display the objects created so far).
+
+    Without GUI, the generator is simply run to completion by start().
+
+    NOTE: the steps must not pump the event loop themselves
+    (Gui.updateGui()), as the scheduler would then be re-entered.
+
+    Args:
+        steps (generator): the generator to run
+        budget (float, optional): the time budget of a slice in seconds. Defaults to SLICE_BUDGET.
+        on_finished (func, optional): called without argument once the generator is exhausted. Defaults to None.
+        on_error (func, optional): called with the exception raised by a step. Defaults to None, i.e. re-raise.
+    """
+
+    def __init__(self, steps, budget=SLICE_BUDGET, on_finished=None, on_error=None):
+        self.steps = steps
+        self.budget = budget
+        self.on_finished = on_finished
+        self.on_error = on_error
+        self.running = False
+        self.slices = 0
+
+    def start(self):
+        """Start running the generator."""
+        self.running = True
+        if QtCore is None or not App.GuiUp:
+            self.budget = float('inf')
+            self._run_slice()
+        else:
+            QtCore.QTimer.singleShot(0, self._run_slice)
+
+    def cancel(self):
+        """Stop running the generator.
+
+        The generator is closed, so that its pending `with` / `finally`
+        blocks are run (e.g. to abort the undo transaction).
+        """
+        if self.running:
+            self.running = False
+            self.steps.close()
+
+    def _run_slice(self):
+        if not self.running:
+            return
+        self.slices += 1
+        deadline = time.perf_counter() + self.budget
+        value = None
+        try:
+            while True:
+                value = next(self.steps)
+                if time.perf_counter() >= deadline:
+                    break
+        except StopIteration:
+            self.running = False
+            if self.on_finished:
+                self.on_finished()
+            return
+        except Exception as e:
+            self.running = False
+            if self.on_error is None:
+                raise
+            self.on_error(e)
+            return
+        if callable(value):
+            value()
+        QtCore.QTimer.singleShot(0, self._run_slice)
@@ -0,0 +1,172 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Pool of headless worker processes building OCC shapes.
+
+The construction of the B-rep shapes (polygons, faces, extrusions) is CPU
+bound and holds the GIL, so it is spread over worker processes. They run
+the Python interpreter of FreeCAD, import the FreeCAD and Part modules
+without GUI, and send the shapes back as BREP strings
+(Part.Shape.exportBrepToString), which the FreeCAD process only has to
+import.
+
+The number of workers is set by the ShapeWorkers preference: 0 (the
+default) to build the shapes in the FreeCAD process, -1 for one worker per
+core. As FreeCAD embeds Python, the interpreter of the workers is looked
+up next to the FreeCAD executable, unless set by the ShapeWorkerPython
+preference.
+
+The pool is shared by the imports, as starting the workers (and importing
+FreeCAD in each of them) takes a while.
+
+NOTE: the workers are spawned, so a script using them (e.g. under
+FreeCADCmd) must guard its main code with `if __name__ == "__main__":`.
+'''
+
+import multiprocessing
+import multiprocessing.context
+import multiprocessing.spawn
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import FreeCAD as App
+import Part
+
+# The number of ways sent to a worker at once
+SHAPE_CHUNK_SIZE = 256
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+# NOTE: the spawn executable is global, it is only changed while starting a worker
+_executable_lock = threading.Lock()
+
+def shape_workers_from_preferences():
+    """Returns the number of shape workers of the preferences, 0 to build the shapes in process."""
+    pref = App.ParamGet("User parameter:BaseApp/Preferences/Mod/GeoData2")
+    workers = pref.GetInt("ShapeWorkers", 0)
+    if workers < 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+def _python_executable():
+    """Returns the Python interpreter of the workers, None if not found."""
+    pref = App.ParamGet("User parameter:BaseApp/Preferences/Mod/GeoData2")
+    path = pref.GetString("ShapeWorkerPython", "")
+    if path:
+        return path
+    if os.path.basename(sys.executable).lower().startswith("python"):
+        return sys.executable
+    # NOTE: embedded in FreeCAD, sys.executable is the FreeCAD executable
+    #   and the interpreter is installed next to it (or in the prefix)
+    version = f"{sys.version_info.major}.{sys.version_info.minor}"
+    candidates = [
+        os.path.join(os.path.dirname(sys.executable), "python.exe"),
+        os.path.join(os.path.dirname(sys.executable), "python3"),
+        os.path.join(sys.exec_prefix, "bin", f"python{version}"),
+        os.path.join(sys.exec_prefix, "bin", "python3"),
+    ]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+class _WorkerProcess(multiprocessing.context.SpawnProcess):
+    """A spawned process started with the interpreter of the shape workers."""
+
+    executable = None
+
+    @staticmethod
+    def _Popen(process_obj):
+        # NOTE: the command line is built when the process starts, the other
+        #   spawned processes (of FreeCAD or of other workbenches) keep the
+        #   executable of the spawn context
+        with _executable_lock:
+            previous = multiprocessing.spawn.get_executable()
+            multiprocessing.spawn.set_executable(process_obj.executable)
+            try:
+                return multiprocessing.context.SpawnProcess._Popen(process_obj)
+            finally:
+                multiprocessing.spawn.set_executable(previous)
+
+class _WorkerContext(multiprocessing.context.SpawnContext):
+    """A private spawn context, whose processes use the given interpreter.
+
+    Args:
+        executable (str): the path of the Python interpreter
+    """
+
+    def __init__(self, executable):
+        super().__init__()
+        self.executable = executable
+
+    def Process(self, *args, **kwargs):
+        process = _WorkerProcess(*args, **kwargs)
+        process.executable = self.executable
+        return process
+
+def get_shape_pool(workers):
+    """Returns the shared pool of shape workers.
+
+    The pool is (re)started if it is not running yet, if it is broken or
+    if the number of workers changed.
+
+    Args:
+        workers (int): the number of worker processes
+
+    Returns:
+        ProcessPoolExecutor: the pool, None if the workers can not be started
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        # NOTE: _broken is set once a worker died abruptly
+        if _pool is not None and _pool_workers == workers and not getattr(_pool, "_broken", False):
+            return _pool
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+        executable = _python_executable()
+        if executable is None:
+            App.Console.PrintWarning("No Python interpreter found for the shape workers, set the ShapeWorkerPython preference. Building the shapes in process ...\n")
+            return None
+        context = _WorkerContext(executable)
+        App.Console.PrintLog(f"Starting {workers} shape worker(s) with {executable} ...\n")
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        _pool_workers = workers
+        return _pool
+
+def import_brep(brep):
+    """Returns the shape of a BREP string.
+
+    Args:
+        brep (str): the shape, as returned by exportBrepToString()
+
+    Returns:
+        Part.Shape: the shape
+    """
+    shape = Part.Shape()
+    # NOTE: without the progress indicator
+    shape.importBrepFromString(brep, False)
+    return shape
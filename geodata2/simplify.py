@@ -0,0 +1,139 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''Douglas-Peucker simplification of many polylines at once.
+
+Instead of recursing on each polyline, all the polylines are concatenated
+and each round of the algorithm handles every pending range at once with
+NumPy: the distance of all the undecided vertices to the chord of their
+range, the farthest vertex of each range (kept when farther than the
+tolerance), and the other vertices of the ranges within tolerance
+(dropped). The number of rounds is the depth of the recursion.
+
+To preserve the topology:
+- the first and last vertices, and the fixed ones (e.g. the nodes shared
+  with other ways), are always kept, so that connected ways stay
+  connected;
+- a closed ring is also anchored on its vertex farthest from its start,
+  and kept as is if it would collapse to less than 3 distinct vertices or
+  if its simplification crosses itself.
+'''
+
+import numpy as np
+
+# The number of edges tested at once against all the edges of a ring
+CROSSING_CHUNK = 256
+
+def _self_intersects(ring):
+    """Returns whether 2 non adjacent edges of a closed ring cross, in the xy-plane."""
+    (a, b) = (ring[:-1, :2], ring[1:, :2])
+    n = len(a)
+    def __orientation(p, q, r):
+        return np.sign((q[..., 0] - p[..., 0])*(r[..., 1] - p[..., 1]) - (q[..., 1] - p[..., 1])*(r[..., 0] - p[..., 0]))
+    j = np.arange(n)
+    for start in range(0, n, CROSSING_CHUNK):
+        i = np.arange(start, min(n, start + CROSSING_CHUNK))[:, None]
+        # NOTE: the first and the last edges are adjacent as well
+        candidates = (j > i + 1) & ~((i == 0) & (j == n - 1))
+        (ai, bi) = (a[i[:, 0]][:, None], b[i[:, 0]][:, None])
+        (aj, bj) = (a[None], b[None])
+        crossing = (__orientation(ai, bi, aj) * __orientation(ai, bi, bj) < 0) \
+            & (__orientation(aj, bj, ai) * __orientation(aj, bj, bi) < 0)
+        if (crossing & candidates).any():
+            return True
+    return False
+
+def _segment_distances(points, a, b):
+    """Returns the distance of points to the segments [a, b], in the xy-plane."""
+    ab = b - a
+    ap = points - a
+    length2 = (ab*ab).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.clip((ap*ab).sum(axis=1) / length2, 0.0, 1.0)
+    t[length2 == 0] = 0.0
+    return np.hypot(*(ap - t[:, None]*ab).T)
+
+def simplify(point_arrays, tolerance, fixed=None):
+    """Returns the vertices kept by Douglas-Peucker.
+
+    Args:
+        point_arrays (list): the (n, d) points of each polyline, only x and y are considered. A closed
+            ring repeats its first point at the end.
+        tolerance (float): the maximum distance of a dropped vertex to the simplified polyline
+        fixed (list, optional): the boolean arrays of the vertices to keep in each polyline. Defaults to None.
+
+    Returns:
+        list: the boolean arrays of the vertices kept in each polyline
+    """
+    if not point_arrays:
+        return []
+    lengths = np.array([ len(points) for points in point_arrays ])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    ends = starts + lengths - 1
+    xy = np.concatenate([ points[:, :2] for points in point_arrays ]).astype(np.float64)
+    keep = np.zeros(len(xy), dtype=bool)
+    keep[starts] = True
+    keep[ends] = True
+    if fixed is not None:
+        keep |= np.concatenate(fixed)
+
+    # NOTE: the chord of a closed ring is a single point, the ring is split
+    #   at its vertex farthest from the start.
+    way_ids = np.repeat(np.arange(len(lengths)), lengths)
+    rings = (lengths >= 4) & (xy[starts] == xy[ends]).all(axis=1)
+    if rings.any():
+        distances = np.hypot(*(xy - xy[starts][way_ids]).T)
+        farthest = np.maximum.reduceat(distances, starts)
+        is_farthest = (distances == farthest[way_ids]) & rings[way_ids]
+        (_, first) = np.unique(way_ids[is_farthest], return_index=True)
+        keep[np.flatnonzero(is_farthest)[first]] = True
+
+    dropped = np.zeros(len(xy), dtype=bool)
+    while True:
+        pending = np.flatnonzero(~keep & ~dropped)
+        if not len(pending):
+            break
+        kept = np.flatnonzero(keep)
+        # the range of each pending vertex, between 2 kept vertices
+        after = np.searchsorted(kept, pending)
+        (a, b) = (kept[after - 1], kept[after])
+        distances = _segment_distances(xy[pending], xy[a], xy[b])
+        group_starts = np.flatnonzero(np.diff(after, prepend=-1))
+        group_ids = np.repeat(np.arange(len(group_starts)), np.diff(np.append(group_starts, len(pending))))
+        farthest = np.maximum.reduceat(distances, group_starts)
+        split = farthest > tolerance
+        # within tolerance: all the vertices of the range are dropped
+        dropped[pending[~split[group_ids]]] = True
+        # otherwise: the farthest vertex is kept, the others stay pending
+        is_farthest = (distances == farthest[group_ids]) & split[group_ids]
+        (_, first) = np.unique(group_ids[is_farthest], return_index=True)
+        keep[pending[np.flatnonzero(is_farthest)[first]]] = True
+
+    masks = np.split(keep, starts[1:])
+    for i in np.flatnonzero(rings):
+        if masks[i].all():
+            continue
+        # NOTE: the start, the farthest vertex and the end make 2 distinct vertices
+        if masks[i].sum() < 4 or _self_intersects(xy[starts[i]:ends[i] + 1][masks[i]]):
+            masks[i][:] = True
+    return masks
@@ -0,0 +1,110 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+'''A local HTTP server standing in for the external services in the tests.
+
+Usage::
+
+    def handle(request):
+        request.reply(200, b"<osm/>")
+
+    with LocalServer(handle) as server:
+        client.request(server.url + "/api/0.6/map")
+    assert server.requests[0].path == "/api/0.6/map"
+'''
+
+import threading
+import urllib.parse
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A request received by the server: the client (host, port) it came from,
+# its path, its query parameters and its headers.
+ReceivedRequest = namedtuple("ReceivedRequest", ["client_address", "path", "params", "headers"])
+
+class _Handler(BaseHTTPRequestHandler):
+    # NOTE: HTTP/1.1 keeps the connections alive
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parts = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(parts.query))
+        with self.server.lock:
+            self.server.requests.append(ReceivedRequest(self.client_address, parts.path, params, self.headers))
+        self.params = params
+        self.server.handle_request_with(self)
+
+    def reply(self, status, body=b"", headers=None):
+        """Send a response with a Content-Length."""
+        self.send_response(status)
+        for (key, value) in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def reply_chunked(self, status, chunks, headers=None):
+        """Send a response with a chunked Transfer-Encoding."""
+        self.send_response(status)
+        for (key, value) in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in chunks:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+class LocalServer:
+    """HTTP server listening on an ephemeral port of localhost, in a thread.
+
+    Args:
+        handle (func): called as handle(request) for each GET request, it must answer with
+            request.reply() or request.reply_chunked()
+    """
+
+    def __init__(self, handle):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.handle_request_with = handle
+        self._server.requests = []
+        self._server.lock = threading.Lock()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def requests(self):
+        """The ReceivedRequest received so far."""
+        with self._server.lock:
+            return list(self._server.requests)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,110 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import unittest
+
+import numpy as np
+
+from geodata2.clipping import classify, clip_polygon, clip_polyline
+
+RECT = (0.0, 0.0, 10.0, 10.0)
+
+def _points(points):
+    return np.array(points, dtype=np.float64)
+
+class TestClipping(unittest.TestCase):
+
+    def assertPieces(self, pieces, expected):
+        self.assertEqual(len(pieces), len(expected))
+        for piece, points in zip(pieces, expected):
+            np.testing.assert_allclose(piece, _points(points), atol=1e-12)
+
+    def assertRing(self, ring, expected):
+        """The ring is closed and has the expected points, from any start."""
+        self.assertIsNotNone(ring)
+        np.testing.assert_allclose(ring[0], ring[-1])
+        ring = ring[:-1]
+        expected = _points(expected)
+        self.assertEqual(len(ring), len(expected))
+        start = int(np.argmin(np.hypot(*(ring[:, :2] - expected[0, :2]).T)))
+        np.testing.assert_allclose(np.roll(ring, -start, axis=0), expected, atol=1e-12)
+
+    def test_keeps_a_polyline_inside(self):
+        points = _points([ (1, 1, 0), (5, 2, 1), (9, 9, 2) ])
+        self.assertPieces(clip_polyline(points, RECT), [ points ])
+
+    def test_clips_a_segment_and_interpolates_z(self):
+        points = _points([ (-5, 5, 0), (15, 5, 10) ])
+        self.assertPieces(clip_polyline(points, RECT), [ [ (0, 5, 2.5), (10, 5, 7.5) ] ])
+
+    def test_splits_a_polyline_coming_back(self):
+        points = _points([ (2, 2, 0), (2, 15, 0), (8, 15, 0), (8, 2, 0), (8, -4, 0), (4, -4, 0), (4, 4, 0) ])
+        self.assertPieces(clip_polyline(points, RECT), [
+            [ (2, 2, 0), (2, 10, 0) ],
+            [ (8, 10, 0), (8, 2, 0), (8, 0, 0) ],
+            [ (4, 0, 0), (4, 4, 0) ],
+        ])
+
+    def test_removes_a_polyline_missing_the_rectangle(self):
+        # its bounding box overlaps the rectangle
+        self.assertEqual(clip_polyline(_points([ (-5, 2, 0), (2, -5, 0) ]), RECT), [])
+        self.assertEqual(clip_polyline(_points([ (-5, 12, 0), (15, 12, 0) ]), RECT), [])
+
+    def test_keeps_a_polyline_on_a_side(self):
+        points = _points([ (0, -5, 0), (0, 15, 0) ])
+        self.assertPieces(clip_polyline(points, RECT), [ [ (0, 0, 0), (0, 10, 0) ] ])
+
+    def test_clips_a_polygon_over_a_corner(self):
+        ring = _points([ (5, 5, 0), (14, 5, 0), (5, 14, 0), (5, 5, 0) ])
+        self.assertRing(clip_polygon(ring, RECT), [ (5, 5, 0), (10, 5, 0), (10, 9, 0), (9, 10, 0), (5, 10, 0) ])
+
+    def test_clips_a_polygon_over_all_the_sides(self):
+        # a diamond around the center, whose 4 corners are cut
+        ring = _points([ (5, -2, 0), (12, 5, 0), (5, 12, 0), (-2, 5, 0), (5, -2, 0) ])
+        self.assertRing(clip_polygon(ring, RECT), [
+            (7, 0, 0), (10, 3, 0), (10, 7, 0), (7, 10, 0), (3, 10, 0), (0, 7, 0), (0, 3, 0), (3, 0, 0) ])
+
+    def test_interpolates_the_z_of_a_polygon(self):
+        # z = x along all the edges
+        ring = _points([ (-10, 2, -10), (20, 2, 20), (20, 8, 20), (-10, 8, -10), (-10, 2, -10) ])
+        self.assertRing(clip_polygon(ring, RECT), [ (0, 2, 0), (10, 2, 10), (10, 8, 10), (0, 8, 0) ])
+
+    def test_polygons_around_or_outside(self):
+        around = _points([ (-1, -1, 0), (11, -1, 0), (11, 11, 0), (-1, 11, 0), (-1, -1, 0) ])
+        self.assertRing(clip_polygon(around, RECT), [ (0, 0, 0), (10, 0, 0), (10, 10, 0), (0, 10, 0) ])
+        outside = _points([ (11, 11, 0), (12, 11, 0), (12, 12, 0), (11, 11, 0) ])
+        self.assertIsNone(clip_polygon(outside, RECT))
+
+    def test_classify(self):
+        arrays = [
+            _points([ (1, 1, 0), (9, 9, 0) ]),
+            _points([ (-5, 5, 0), (5, 5, 0) ]),
+            _points([ (11, 1, 0), (12, 9, 0) ]),
+            _points([ (-5, 2, 0), (2, -5, 0) ]),
+        ]
+        (inside, outside) = classify(arrays, RECT)
+        self.assertEqual(inside.tolist(), [ True, False, False, False ])
+        self.assertEqual(outside.tolist(), [ False, False, True, False ])
+
+if __name__ == "__main__":
+    unittest.main()
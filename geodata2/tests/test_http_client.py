@@ -0,0 +1,159 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import gzip
+import io
+import time
+import unittest
+from unittest import mock
+
+from geodata2.http_client import ContentDecodingError, HttpClient
+from geodata2.tests.local_server import LocalServer
+
+class TestHttpClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client = HttpClient(timeout=5, retries=2, backoff=0.01, max_backoff=0.05)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_reuses_the_connection(self):
+        with LocalServer(lambda request: request.reply(200, b"ok")) as server:
+            for _ in range(2):
+                response = self.client.request(server.url + "/map", params={"bbox": "1,2,3,4"})
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.data, b"ok")
+        (first, second) = server.requests
+        self.assertEqual(first.params, {"bbox": "1,2,3,4"})
+        self.assertEqual(first.client_address, second.client_address)
+
+    def test_decodes_gzip(self):
+        body = b"<osm>" + b"<node/>" * 1000 + b"</osm>"
+        def handle(request):
+            request.reply(200, gzip.compress(body), {"Content-Encoding": "gzip"})
+        with LocalServer(handle) as server:
+            response = self.client.request(server.url + "/map")
+        self.assertEqual(response.data, body)
+        self.assertEqual(server.requests[0].headers["Accept-Encoding"], "gzip")
+
+    def test_streams_chunks_into_the_sink(self):
+        body = bytes(range(256)) * 1024
+        compressed = gzip.compress(body)
+        chunks = [ compressed[i:i + 1000] for i in range(0, len(compressed), 1000) ]
+        def handle(request):
+            request.reply_chunked(200, chunks, {"Content-Encoding": "gzip"})
+        sink = io.BytesIO()
+        with LocalServer(handle) as server:
+            response = self.client.request(server.url + "/map", sink=sink)
+        self.assertEqual(response.status, 200)
+        self.assertIsNone(response.data)
+        self.assertEqual(sink.getvalue(), body)
+
+    def test_does_not_stream_errors_into_the_sink(self):
+        sink = io.BytesIO()
+        with LocalServer(lambda request: request.reply(404, b"not found")) as server:
+            response = self.client.request(server.url + "/map", sink=sink)
+        self.assertEqual(response.status, 404)
+        self.assertEqual(response.data, b"not found")
+        self.assertEqual(sink.getvalue(), b"")
+
+    def test_retries_429_and_5xx_with_backoff(self):
+        statuses = iter([ 429, 503 ])
+        def handle(request):
+            request.reply(next(statuses, 200), b"ok")
+        with mock.patch("geodata2.http_client.time.sleep") as sleep:
+            with LocalServer(handle) as server:
+                response = self.client.request(server.url + "/map")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(len(server.requests), 3)
+        delays = [ call.args[0] for call in sleep.call_args_list ]
+        self.assertEqual(len(delays), 2)
+        for (attempt, delay) in enumerate(delays):
+            self.assertLessEqual(delay, self.client.backoff * 2**attempt)
+
+    def test_honours_retry_after(self):
+        statuses = iter([ 429 ])
+        def handle(request):
+            request.reply(next(statuses, 200), b"ok", {"Retry-After": "1"})
+        with mock.patch("geodata2.http_client.time.sleep") as sleep:
+            with LocalServer(handle) as server:
+                self.client.request(server.url + "/map")
+        # NOTE: capped to max_backoff
+        sleep.assert_called_once_with(self.client.max_backoff)
+
+    def test_returns_the_last_status_after_the_retries(self):
+        with mock.patch("geodata2.http_client.time.sleep"):
+            with LocalServer(lambda request: request.reply(503)) as server:
+                response = self.client.request(server.url + "/map")
+        self.assertEqual(response.status, 503)
+        self.assertEqual(len(server.requests), self.client.retries + 1)
+
+    def test_times_out(self):
+        def handle(request):
+            time.sleep(1)
+            request.reply(200, b"late")
+        client = HttpClient(timeout=0.2, retries=0)
+        with LocalServer(handle) as server:
+            with self.assertRaises(TimeoutError):
+                client.request(server.url + "/map")
+        client.close()
+
+    def test_retries_after_a_timeout(self):
+        slow = iter([ True ])
+        def handle(request):
+            if next(slow, False):
+                time.sleep(1)
+            request.reply(200, b"ok")
+        client = HttpClient(timeout=0.2, retries=1, backoff=0.01)
+        with LocalServer(handle) as server:
+            response = client.request(server.url + "/map")
+        client.close()
+        self.assertEqual(response.data, b"ok")
+
+    def test_rejects_a_truncated_gzip_body(self):
+        truncated = gzip.compress(b"<osm/>" * 1000)[:-20]
+        def handle(request):
+            request.reply(200, truncated, {"Content-Encoding": "gzip"})
+        with mock.patch("geodata2.http_client.time.sleep"):
+            with LocalServer(handle) as server:
+                with self.assertRaises(ContentDecodingError):
+                    self.client.request(server.url + "/map")
+                with self.assertRaises(ContentDecodingError):
+                    self.client.request(server.url + "/map", sink=io.BytesIO())
+        # NOTE: the body is only read again when not streamed
+        self.assertEqual(len(server.requests), self.client.retries + 2)
+
+    def test_retries_a_corrupted_gzip_body(self):
+        body = b"<osm/>" * 1000
+        corrupted = iter([ b"\x1f\x8b" + b"\x00" * 100 ])
+        def handle(request):
+            request.reply(200, next(corrupted, gzip.compress(body)), {"Content-Encoding": "gzip"})
+        with mock.patch("geodata2.http_client.time.sleep"):
+            with LocalServer(handle) as server:
+                response = self.client.request(server.url + "/map")
+        self.assertEqual(response.data, body)
+        self.assertEqual(len(server.requests), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import unittest
+
+import numpy as np
+
+from geodata2.mesh_tools import bridge_holes, extrude_mesh, signed_area, triangulate
+
+def _ring(points):
+    return np.array([ (x, y, 0.0) for (x, y) in points ], dtype=np.float64)
+
+def _square(x0, y0, size):
+    return _ring([ (x0, y0), (x0 + size, y0), (x0 + size, y0 + size), (x0, y0 + size) ])
+
+def _star(count, seed):
+    """Returns a random star shaped, hence simple, ring with many reflex vertices."""
+    rng = np.random.default_rng(seed)
+    angles = np.sort(rng.uniform(0, 2*np.pi, count))
+    radii = rng.uniform(10, 100, count)
+    return _ring(zip(radii * np.cos(angles), radii * np.sin(angles)))
+
+def _triangle_areas(points, triangles):
+    (a, b, c) = (points[triangles[:, 0], :2], points[triangles[:, 1], :2], points[triangles[:, 2], :2])
+    return 0.5 * ((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]))
+
+def _inside(ring, point):
+    """Even-odd test of a point against a ring."""
+    (x, y) = point
+    inside = False
+    for (x1, y1, _), (x2, y2, _) in zip(ring, np.roll(ring, -1, axis=0)):
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return inside
+
+def _volume(vertices, triangles):
+    """Returns the volume enclosed by a closed mesh (divergence theorem)."""
+    (a, b, c) = (vertices[triangles[:, 0]], vertices[triangles[:, 1]], vertices[triangles[:, 2]])
+    return np.einsum("ij,ij->i", a, np.cross(b, c)).sum() / 6
+
+class TestMeshTools(unittest.TestCase):
+
+    def assertTriangulates(self, ring, triangles, area, rings=None):
+        """The triangles are counterclockwise, inside the polygon, and cover its area."""
+        areas = _triangle_areas(ring, triangles)
+        self.assertTrue((areas > 0).all())
+        self.assertAlmostEqual(areas.sum(), area, delta=1e-6 * area)
+        for centroid in ring[triangles, :2].mean(axis=1):
+            self.assertEqual(sum(_inside(r, centroid) for r in rings or [ ring ]) % 2, 1)
+
+    def test_triangulates_a_convex_polygon(self):
+        ring = _square(0, 0, 10)
+        triangles = triangulate(ring)
+        self.assertEqual(triangles.shape, (2, 3))
+        self.assertTriangulates(ring, triangles, 100.0)
+
+    def test_triangulates_a_concave_polygon(self):
+        # an L and a comb, in both orientations
+        l_shape = _ring([ (0, 0), (20, 0), (20, 10), (10, 10), (10, 30), (0, 30) ])
+        comb = _ring([ (0, 0), (50, 0), (50, 20), (45, 20), (42, 5), (38, 20), (35, 20), (32, 5), (28, 20),
+            (25, 20), (22, 5), (18, 20), (15, 20), (12, 5), (8, 20), (0, 20) ])
+        for ring in (l_shape, comb, l_shape[::-1], comb[::-1]):
+            triangles = triangulate(ring)
+            self.assertEqual(len(triangles), len(ring) - 2)
+            self.assertTriangulates(ring, triangles, abs(signed_area(ring)))
+
+    def test_triangulates_random_star_polygons(self):
+        for seed in range(20):
+            ring = _star(60, seed)
+            triangles = triangulate(ring)
+            self.assertEqual(len(triangles), len(ring) - 2)
+            self.assertTriangulates(ring, triangles, signed_area(ring))
+
+    def test_bridges_the_holes(self):
+        outer = _square(0, 0, 100)
+        holes = [ _square(10, 10, 20), _square(60, 20, 30)[::-1], _square(20, 60, 10) ]
+        ring = bridge_holes(outer, holes)
+        # the bridges add 2 vertices per hole
+        self.assertEqual(len(ring), len(outer) + sum(len(hole) + 2 for hole in holes))
+        area = 100*100 - 20*20 - 30*30 - 10*10
+        self.assertAlmostEqual(signed_area(ring), area, delta=1e-6)
+        self.assertTriangulates(ring, triangulate(ring), area, [ outer ] + holes)
+
+    def test_extrudes_closed_meshes(self):
+        outer = _star(40, 0)
+        (vertices, triangles) = extrude_mesh(outer[::-1], 30.0)
+        self.assertAlmostEqual(_volume(vertices, triangles), signed_area(outer) * 30.0, delta=1e-6 * signed_area(outer) * 30.0)
+
+        outer = _square(0, 0, 100)
+        holes = [ _square(10, 10, 20), _square(60, 20, 30) ]
+        (vertices, triangles) = extrude_mesh(outer, 30.0, holes)
+        self.assertAlmostEqual(_volume(vertices, triangles), (100*100 - 20*20 - 30*30) * 30.0, delta=1e-3)
+
+if __name__ == "__main__":
+    unittest.main()
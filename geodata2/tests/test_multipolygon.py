@@ -0,0 +1,125 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import unittest
+
+import numpy as np
+
+from geodata2.multipolygon import assemble_multipolygon
+
+# the nodes at the corners of nested squares: 1-4 from 0 to 100, 11-14
+# from 30 to 70, 21-24 from 40 to 60, 31-34 from 45 to 55, and 5-8 the
+# middles of the sides of the largest square
+NODES = {}
+for (first, low, high) in ((1, 0, 100), (11, 30, 70), (21, 40, 60), (31, 45, 55)):
+    for k, (x, y) in enumerate(((low, low), (high, low), (high, high), (low, high))):
+        NODES[first + k] = (x, y, 0.0)
+NODES.update({ 5: (50, 0, 0.0), 6: (100, 50, 0.0), 7: (50, 100, 0.0), 8: (0, 50, 0.0) })
+
+def _square(first):
+    return [ first, first + 1, first + 2, first + 3, first ]
+
+def _relation(ways, roles):
+    """Returns the members, refs and points of a relation of ways."""
+    members = [ ("way", way_id, roles.get(way_id, "outer")) for way_id in ways ]
+    points = { way_id: [ NODES[node] for node in refs ] for way_id, refs in ways.items() }
+    return (members, dict(ways), points)
+
+def _area(ring):
+    (x, y) = (ring[:, 0], ring[:, 1])
+    return 0.5 * (np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]))
+
+class TestMultipolygon(unittest.TestCase):
+
+    def assertRing(self, ring, nodes):
+        """The ring is closed and goes through the nodes, in either direction, from any start."""
+        self.assertEqual(ring.shape, (len(nodes) + 1, 3))
+        np.testing.assert_array_equal(ring[0], ring[-1])
+        expected = np.array([ NODES[node] for node in nodes ])
+        start = int(np.flatnonzero((expected == ring[0]).all(axis=1))[0])
+        expected = np.roll(expected, -start, axis=0)
+        if not (ring[1] == expected[1]).all():
+            expected = np.roll(expected[::-1], 1, axis=0)
+        np.testing.assert_array_equal(ring[:-1], expected)
+
+    def test_joins_the_ways_in_any_order_and_direction(self):
+        # the outer square in 4 ways, 2 of them reversed, and a closed hole
+        ways = {
+            101: [ 6, 3, 7 ],
+            102: [ 1, 5, 2 ],
+            103: [ 8, 4, 7 ],
+            104: [ 6, 2 ],
+            105: [ 8, 1 ],
+            106: _square(11),
+        }
+        (polygons, left) = assemble_multipolygon(*_relation(ways, { 106: "inner" }))
+        self.assertEqual(left, 0)
+        self.assertEqual(len(polygons), 1)
+        (outer, holes) = polygons[0]
+        self.assertRing(outer, [ 1, 5, 2, 6, 3, 7, 4, 8 ])
+        self.assertAlmostEqual(abs(_area(outer)), 100*100)
+        self.assertEqual(len(holes), 1)
+        self.assertRing(holes[0], [ 11, 12, 13, 14 ])
+
+    def test_gives_the_holes_to_the_smallest_outer_ring(self):
+        # an island with a pond in the hole of the largest square
+        ways = {
+            201: _square(1),
+            202: _square(11),
+            203: _square(21),
+            204: _square(31),
+        }
+        (polygons, left) = assemble_multipolygon(*_relation(ways, { 202: "inner", 204: "inner" }))
+        self.assertEqual(left, 0)
+        self.assertEqual([ abs(_area(outer)) for outer, _ in polygons ], [ 100*100, 20*20 ])
+        self.assertEqual([ [ abs(_area(hole)) for hole in holes ] for _, holes in polygons ], [ [ 40*40 ], [ 10*10 ] ])
+
+    def test_counts_what_is_left_out(self):
+        ways = {
+            # an outer ring missing one of its ways
+            301: [ 1, 5, 2 ],
+            302: [ 2, 6, 3 ],
+            # a closed outer ring, and a hole out of it
+            303: _square(21),
+            304: [ 1, 2, 3, 4, 1 ],
+        }
+        (members, refs, points) = _relation(ways, { 304: "inner" })
+        # a member way missing from the data, and a node member
+        members += [ ("way", 305, "outer"), ("node", 1, "") ]
+        (polygons, left) = assemble_multipolygon(members, refs, points)
+        self.assertEqual(len(polygons), 1)
+        self.assertRing(polygons[0][0], [ 21, 22, 23, 24 ])
+        self.assertEqual(polygons[0][1], [])
+        # the 2 ways of the open ring, the missing way and the hole
+        self.assertEqual(left, 4)
+
+    def test_accepts_point_arrays(self):
+        ways = { 401: [ 1, 5, 2, 3 ], 402: [ 3, 4, 1 ] }
+        (members, refs, points) = _relation(ways, {})
+        points = { way_id: np.array(way_points) for way_id, way_points in points.items() }
+        (polygons, left) = assemble_multipolygon(members, refs, points)
+        self.assertEqual(left, 0)
+        self.assertRing(polygons[0][0], [ 1, 5, 2, 3, 4 ])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from geodata2.osm_cache import TEMPORARY_FILE_TTL, OsmCache
+
+class TestOsmCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = OsmCache(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_prune_removes_the_stale_temporary_files(self):
+        self.cache.put("tile_16_1_1", b"<osm/>")
+        # the temporary file of a writer of a crashed process, and of a running one
+        writer = self.cache.open_writer("tile_16_1_2")
+        stale = writer._tmp_path
+        writer._file.close()
+        old = time.time() - TEMPORARY_FILE_TTL - 60
+        os.utime(stale, (old, old))
+        with self.cache.open_writer("tile_16_1_3") as running:
+            self.cache.prune()
+            self.assertFalse(os.path.exists(stale))
+            self.assertTrue(os.path.exists(running._tmp_path))
+            running.write(b"<osm/>")
+            running.commit()
+        self.assertIsNotNone(self.cache.lookup("tile_16_1_1"))
+        self.assertIsNotNone(self.cache.lookup("tile_16_1_3"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import math
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import FreeCAD as App
+
+from geodata2.import_osm import _fetch_osm, _get_bbox
+from geodata2.osm_cache import OsmCache
+from geodata2.osm_reader import OsmReader
+from geodata2.osm_tiles import OsmTileStore, TileDownloadError, child_tiles, tile_bounds, tile_key, tile_zoom, tiles_for_bbox
+from geodata2.progress import ImportCancelled
+from geodata2.tests.local_server import LocalServer
+
+PREFERENCES = "User parameter:BaseApp/Preferences/Mod/GeoData2"
+TILE = (16, 33000, 24000)
+
+def _osm_payload(bbox):
+    """Returns the OSM data of a bbox of the TILE: the nodes of an 8x8 grid
+    inside it, and a node, a way and a relation found in every bbox."""
+    (minlat, minlon, maxlat, maxlon) = bbox
+    (tile_minlat, tile_minlon, tile_maxlat, tile_maxlon) = tile_bounds(TILE)
+    lines = [ "<?xml version='1.0' encoding='UTF-8'?>", '<osm version="0.6">' ]
+    lines.append(f'<bounds minlat="{minlat}" minlon="{minlon}" maxlat="{maxlat}" maxlon="{maxlon}"/>')
+    for i in range(8):
+        for j in range(8):
+            lat = tile_minlat + (i + 0.5) / 8 * (tile_maxlat - tile_minlat)
+            lon = tile_minlon + (j + 0.5) / 8 * (tile_maxlon - tile_minlon)
+            if minlat <= lat < maxlat and minlon <= lon < maxlon:
+                lines.append(f'<node id="{8*i + j + 1}" lat="{lat}" lon="{lon}"/>')
+    lines.append(f'<node id="100" lat="{minlat}" lon="{minlon}"/>')
+    lines.append('<way id="1"><nd ref="1"/><nd ref="64"/><tag k="highway" v="residential"/></way>')
+    lines.append('<relation id="1"><member type="way" ref="1" role=""/><tag k="type" v="route"/></relation>')
+    lines.append("</osm>")
+    return "\n".join(lines).encode()
+
+def _zoom(params):
+    """Returns the zoom of the tile requested."""
+    (minlon, _, maxlon, _) = map(float, params["bbox"].split(","))
+    return round(math.log2(360.0 / (maxlon - minlon)))
+
+class TestOsmTileStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = OsmCache(self.directory)
+        self.pref = App.ParamGet(PREFERENCES)
+        self.api_url = self.pref.GetString("OsmApiUrl", "")
+
+    def tearDown(self):
+        if self.api_url:
+            self.pref.SetString("OsmApiUrl", self.api_url)
+        else:
+            self.pref.RemString("OsmApiUrl")
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _serve(self, handle):
+        server = LocalServer(handle)
+        self.pref.SetString("OsmApiUrl", server.url + "/api/0.6/map")
+        return server
+
+    def test_splits_and_merges_the_refused_tiles(self):
+        # the tile is refused, then one of its 4 parts
+        refused_part = child_tiles(TILE)[0]
+        refused_bbox = "{1},{0},{3},{2}".format(*tile_bounds(refused_part))
+        def handle(request):
+            if _zoom(request.params) == TILE[0]:
+                request.reply(400, b"You requested too many nodes")
+            elif request.params["bbox"] == refused_bbox:
+                request.reply(509, b"Bandwidth Limit Exceeded")
+            else:
+                (minlon, minlat, maxlon, maxlat) = map(float, request.params["bbox"].split(","))
+                request.reply(200, _osm_payload((minlat, minlon, maxlat, maxlon)))
+        store = OsmTileStore(self.cache, _fetch_osm)
+        progress = []
+        with self._serve(handle) as server:
+            tiles = list(store.iter_fetch_tiles([ TILE ], lambda done, total: progress.append((done, total))))
+        self.assertEqual(tiles, [ TILE ])
+        self.assertEqual(sorted(_zoom(request.params) for request in server.requests), [ 16 ] + [ 17 ]*4 + [ 18 ]*4)
+        self.assertEqual(progress[-1], (9, 9))
+
+        entry = self.cache.lookup(tile_key(TILE))
+        self.assertIsNotNone(entry)
+        with OsmReader(self.cache.open(entry), owns_file=True) as reader:
+            reader.read_nodes()
+            ways = list(reader.ways())
+        self.assertAlmostEqual(reader.bounds[0], tile_bounds(TILE)[0])
+        self.assertAlmostEqual(reader.bounds[3], tile_bounds(TILE)[3])
+        # NOTE: the shared elements are only kept once
+        self.assertEqual(sorted(reader.node_ids), list(range(1, 65)) + [ 100 ])
+        self.assertEqual([ way.id for way in ways ], [ 1 ])
+        self.assertEqual([ relation.id for relation in reader.relations ], [ 1 ])
+
+    def test_stops_splitting_at_the_maximum_depth(self):
+        store = OsmTileStore(self.cache, _fetch_osm)
+        with mock.patch("geodata2.osm_tiles.MAX_SPLIT_DEPTH", 1):
+            with self._serve(lambda request: request.reply(400)) as server:
+                with self.assertRaises(TileDownloadError) as context:
+                    list(store.iter_fetch_tiles([ TILE ]))
+        self.assertEqual(context.exception.status_code, 400)
+        # NOTE: the first part refused ends the downloads
+        self.assertEqual(max(_zoom(request.params) for request in server.requests), TILE[0] + 1)
+        self.assertIsNone(self.cache.lookup(tile_key(TILE)))
+
+    def test_cancel_does_not_wait_for_the_downloads(self):
+        release = threading.Event()
+        def fetch(bbox, sink):
+            release.wait(10)
+            return (200, None)
+        def cancel(done, total):
+            raise ImportCancelled()
+        store = OsmTileStore(self.cache, fetch)
+        start = time.monotonic()
+        try:
+            with self.assertRaises(ImportCancelled):
+                list(store.iter_fetch_tiles([ TILE, child_tiles(TILE)[0] ], cancel))
+            self.assertLess(time.monotonic() - start, 2)
+        finally:
+            release.set()
+
+    def test_sizes_the_tiles_after_the_import_zoom(self):
+        self.assertEqual(tile_zoom(17), 16)
+        self.assertEqual(tile_zoom(12), 14)
+        self.assertEqual(tile_zoom(8), 12)
+        for osm_zoom in range(10, 20):
+            tiles = tiles_for_bbox(_get_bbox(48.85, 2.35, osm_zoom), tile_zoom(osm_zoom))
+            self.assertLessEqual(len(tiles), 150, osm_zoom)
+            self.assertTrue(all(z == tile_zoom(osm_zoom) for (z, x, y) in tiles))
+
+if __name__ == "__main__":
+    unittest.main()
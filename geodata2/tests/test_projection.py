@@ -0,0 +1,114 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import unittest
+
+import numpy as np
+
+from geodata2.projection import (UNIT, WGS84, EllipsoidalTransverseMercator, LocalTangentPlane, UTM,
+    make_projection, utm_zone)
+
+def _coordinates(latitude, longitude, delta=0.05, count=1000, seed=0):
+    """Returns random (lat, lon) arrays around a location."""
+    rng = np.random.default_rng(seed)
+    return (latitude + rng.uniform(-delta, delta, count), longitude + rng.uniform(-delta, delta, count))
+
+def _meridian_arc(latitude, steps=20000):
+    """Returns the length of the WGS84 meridian from the equator to a latitude in meter,
+    integrated numerically (Simpson)."""
+    e2 = WGS84.f * (2 - WGS84.f)
+    phi = np.linspace(0.0, np.radians(latitude), steps + 1)
+    radius = WGS84.a * (1 - e2) / (1 - e2 * np.sin(phi)**2)**1.5
+    h = phi[1] - phi[0]
+    return h / 3 * (radius[0] + radius[-1] + 4 * radius[1:-1:2].sum() + 2 * radius[2:-1:2].sum())
+
+class TestProjections(unittest.TestCase):
+
+    def assertRoundTrip(self, projection, lats, lons):
+        (rlats, rlons) = projection.toGeographicArray(*projection.fromGeographicArray(lats, lons))
+        self.assertLess(np.abs(rlats - lats).max(), 1e-9)
+        self.assertLess(np.abs(rlons - lons).max(), 1e-9)
+
+    def test_transverse_mercator_round_trip(self):
+        for (latitude, longitude) in ((41.64, -0.92), (-33.86, 151.21), (69.65, 18.96)):
+            tm = EllipsoidalTransverseMercator(latitude, longitude)
+            self.assertRoundTrip(tm, *_coordinates(latitude, longitude))
+
+    def test_utm_round_trip(self):
+        for (latitude, longitude) in ((41.64, -0.92), (-33.86, 151.21), (60.39, 5.32)):
+            utm = UTM.for_location(latitude, longitude)
+            # up to the border of the zone
+            self.assertRoundTrip(utm, *_coordinates(latitude, longitude, delta=2.0))
+
+    def test_enu_round_trip(self):
+        for (latitude, longitude) in ((41.64, -0.92), (-33.86, 151.21), (69.65, 18.96)):
+            enu = LocalTangentPlane(latitude, longitude)
+            self.assertRoundTrip(enu, *_coordinates(latitude, longitude))
+
+    def test_scalar_functions_match_the_array_ones(self):
+        (lats, lons) = _coordinates(41.64, -0.92, count=20)
+        for name in ("transverse_mercator", "utm", "enu"):
+            projection = make_projection(name, 41.64, -0.92)
+            (xs, ys) = projection.fromGeographicArray(lats, lons)
+            for (lat, lon, x, y) in zip(lats.tolist(), lons.tolist(), xs, ys):
+                (sx, sy) = projection.fromGeographic(lat, lon)
+                self.assertAlmostEqual(sx, x, delta=1e-6, msg=name)
+                self.assertAlmostEqual(sy, y, delta=1e-6, msg=name)
+                (rlat, rlon) = projection.toGeographic(x, y)
+                self.assertAlmostEqual(rlat, lat, delta=1e-9, msg=name)
+                self.assertAlmostEqual(rlon, lon, delta=1e-9, msg=name)
+
+    def test_the_origin_is_projected_to_zero(self):
+        for projection in (EllipsoidalTransverseMercator(41.64, -0.92), LocalTangentPlane(41.64, -0.92)):
+            (x, y) = projection.fromGeographic(41.64, -0.92)
+            self.assertAlmostEqual(x, 0.0, delta=1e-6)
+            self.assertAlmostEqual(y, 0.0, delta=1e-6)
+
+    def test_utm_northing_is_the_scaled_meridian_arc(self):
+        # on the central meridian of zone 31 (3ºE)
+        utm = UTM(31)
+        for latitude in (0.0, 15.0, 45.0, 70.0):
+            (x, y) = utm.fromGeographic(latitude, 3.0)
+            self.assertAlmostEqual(x / UNIT, 500000.0, delta=1e-6)
+            self.assertAlmostEqual(y / UNIT, 0.9996 * _meridian_arc(latitude), delta=1e-3)
+        # the false northing of the southern hemisphere
+        (_, y) = UTM(31, south=True).fromGeographic(-45.0, 3.0)
+        self.assertAlmostEqual(y / UNIT, 10000000.0 - 0.9996 * _meridian_arc(45.0), delta=1e-3)
+
+    def test_enu_distances_along_the_axes(self):
+        enu = LocalTangentPlane(45.0, 3.0)
+        # 1 km to the north along the meridian, the chord is shorter by ~1e-6 m
+        meters_per_degree = (_meridian_arc(46.0) - _meridian_arc(44.0)) / 2.0
+        (x, y) = enu.fromGeographic(45.0 + 1000.0 / meters_per_degree, 3.0)
+        self.assertAlmostEqual(x, 0.0, delta=1e-6)
+        self.assertAlmostEqual(y / UNIT, 1000.0, delta=1e-3)
+
+    def test_utm_zones(self):
+        self.assertEqual(utm_zone(41.64, -0.92), (30, False))
+        self.assertEqual(utm_zone(-33.86, 151.21), (56, True))
+        # Norway and Svalbard
+        self.assertEqual(utm_zone(60.39, 5.32), (32, False))
+        self.assertEqual(utm_zone(78.22, 15.65), (33, False))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import multiprocessing.context
+import multiprocessing.spawn
+import os
+import unittest
+from unittest import mock
+
+import FreeCAD as App
+import Part
+
+from geodata2 import shape_pool
+from geodata2.osm_builders import CATEGORIES, DEFAULT_BUILDING_HEIGHT, _add_way_shapes, _build_shape_chunk
+from geodata2.shape_pool import _WorkerContext, _WorkerProcess, get_shape_pool, import_brep
+
+OUTER = [ (0, 0, 0), (100, 0, 0), (100, 100, 0), (0, 100, 0), (0, 0, 0) ]
+HOLE = [ (40, 40, 0), (60, 40, 0), (60, 60, 0), (40, 60, 0), (40, 40, 0) ]
+ROAD = [ (0, 200, 0), (100, 200, 0), (100, 300, 0) ]
+
+# (points, building, building_height, landuse, highway, holes)
+WAYS = [
+    (OUTER, True, 0, None, None, [HOLE]),
+    (OUTER, False, 0, "forest", None, []),
+    (ROAD, False, 0, None, "residential", []),
+]
+
+class TestShapePool(unittest.TestCase):
+
+    def _in_process(self):
+        """Returns the shapes built in the FreeCAD process, and the colors of the landuse faces."""
+        shapes = { category: [] for category in CATEGORIES }
+        landuse_colors = []
+        for points, building, building_height, landuse, highway, holes in WAYS:
+            fc_points = [ App.Vector(*point) for point in points ]
+            fc_holes = [ [ App.Vector(*point) for point in hole ] for hole in holes ]
+            _add_way_shapes(shapes, landuse_colors, fc_points, building, building_height, landuse, highway, fc_holes)
+        return ({ category: Part.makeCompound(s) for category, s in shapes.items() if s }, landuse_colors)
+
+    def test_round_trips_the_chunk_shapes(self):
+        (breps, landuse_colors) = _build_shape_chunk(WAYS)
+        (expected, expected_colors) = self._in_process()
+        self.assertEqual(set(breps), set(expected))
+        self.assertEqual(landuse_colors, expected_colors)
+        for category, brep in breps.items():
+            shape = import_brep(brep)
+            self.assertTrue(shape.isValid(), category)
+            self.assertEqual(len(shape.Faces), len(expected[category].Faces), category)
+            self.assertEqual(len(shape.Edges), len(expected[category].Edges), category)
+            self.assertAlmostEqual(shape.Volume, expected[category].Volume, places=6, msg=category)
+            self.assertAlmostEqual(shape.Area, expected[category].Area, places=6, msg=category)
+        # the hole is cut out of the building
+        building = import_brep(breps["buildings"])
+        self.assertAlmostEqual(building.Volume, (100*100 - 20*20) * DEFAULT_BUILDING_HEIGHT, places=3)
+
+    def test_keeps_the_spawn_executable(self):
+        previous = multiprocessing.spawn.get_executable()
+        started_with = []
+        def __popen(process_obj):
+            started_with.append(multiprocessing.spawn.get_executable())
+        process = _WorkerContext("/opt/freecad/bin/python3").Process(target=print)
+        with mock.patch.object(multiprocessing.context.SpawnProcess, "_Popen", staticmethod(__popen)):
+            _WorkerProcess._Popen(process)
+        self.assertEqual([ os.fsdecode(executable) for executable in started_with ], [ "/opt/freecad/bin/python3" ])
+        self.assertEqual(multiprocessing.spawn.get_executable(), previous)
+
+    def test_the_pool_keeps_the_spawn_executable(self):
+        previous = multiprocessing.spawn.get_executable()
+        with mock.patch.object(shape_pool, "_python_executable", return_value="/opt/freecad/bin/python3"), \
+                mock.patch.object(shape_pool, "_pool", None):
+            pool = get_shape_pool(1)
+            try:
+                self.assertIsNotNone(pool)
+                self.assertEqual(multiprocessing.spawn.get_executable(), previous)
+            finally:
+                pool.shutdown(wait=False)
@@ -0,0 +1,108 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import unittest
+
+import numpy as np
+
+from geodata2.simplify import simplify
+
+def _distance(p, a, b):
+    """Returns the distance of the point p to the segment [a, b]."""
+    (ab, ap) = (b - a, p - a)
+    length2 = ab @ ab
+    t = 0.0 if length2 == 0 else min(1.0, max(0.0, (ap @ ab) / length2))
+    return float(np.hypot(*(ap - t*ab)))
+
+def _douglas_peucker(points, tolerance, first, last, keep):
+    """The recursive reference: keep the farthest vertex of [first, last] if
+    farther than the tolerance, then recurse on both sides."""
+    if last - first < 2:
+        return
+    distances = [ _distance(points[i], points[first], points[last]) for i in range(first + 1, last) ]
+    i = int(np.argmax(distances))
+    if distances[i] > tolerance:
+        keep[first + 1 + i] = True
+        _douglas_peucker(points, tolerance, first, first + 1 + i, keep)
+        _douglas_peucker(points, tolerance, first + 1 + i, last, keep)
+
+def _reference(points, tolerance, anchors=()):
+    """Returns the vertices kept by the recursive Douglas-Peucker, run
+    between the end points and the anchor vertices."""
+    xy = points[:, :2]
+    keep = np.zeros(len(xy), dtype=bool)
+    splits = sorted({ 0, len(xy) - 1, *anchors })
+    keep[splits] = True
+    for first, last in zip(splits[:-1], splits[1:]):
+        _douglas_peucker(xy, tolerance, first, last, keep)
+    return keep
+
+def _random_walk(count, seed):
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(0.0, 1.0, (count, 3)), axis=0)
+
+class TestSimplify(unittest.TestCase):
+
+    def test_matches_the_recursive_douglas_peucker(self):
+        polylines = [ _random_walk(count, seed) for seed, count in enumerate((2, 3, 10, 100, 1000)) ]
+        for tolerance in (0.0, 0.5, 2.0, 10.0):
+            masks = simplify(polylines, tolerance)
+            for points, mask in zip(polylines, masks):
+                np.testing.assert_array_equal(mask, _reference(points, tolerance))
+
+    def test_keeps_the_fixed_vertices(self):
+        polylines = [ _random_walk(500, seed) for seed in range(3) ]
+        fixed = [ np.zeros(len(points), dtype=bool) for points in polylines ]
+        for mask in fixed:
+            mask[[ 50, 123, 400 ]] = True
+        for points, mask, fixed_mask in zip(polylines, simplify(polylines, 3.0, fixed), fixed):
+            np.testing.assert_array_equal(mask, _reference(points, 3.0, np.flatnonzero(fixed_mask)))
+
+    def test_splits_the_rings_at_their_farthest_vertex(self):
+        # a noisy circle, whose farthest vertex from the start is near the opposite side
+        rng = np.random.default_rng(0)
+        angles = np.linspace(0, 2*np.pi, 200, endpoint=False)
+        radii = 100 + rng.uniform(-1, 1, len(angles))
+        ring = np.stack((radii * np.cos(angles), radii * np.sin(angles), np.zeros(len(angles))), axis=1)
+        ring = np.concatenate((ring, ring[:1]))
+        farthest = int(np.argmax(np.hypot(*(ring[:, :2] - ring[0, :2]).T)))
+        for tolerance in (0.5, 2.0, 5.0):
+            (mask,) = simplify([ ring ], tolerance)
+            np.testing.assert_array_equal(mask, _reference(ring, tolerance, [ farthest ]))
+            self.assertLess(mask.sum(), len(ring))
+
+    def test_keeps_the_rings_that_would_collapse(self):
+        # a thin sliver, all within the tolerance of its 2 anchors
+        ring = np.array([ (0, 0, 0), (5, 0.1, 0), (10, 0, 0), (5, -0.1, 0), (0, 0, 0) ], dtype=np.float64)
+        (mask,) = simplify([ ring ], 1.0)
+        self.assertTrue(mask.all())
+
+    def test_keeps_the_rings_whose_simplification_crosses_itself(self):
+        ring = np.array([ (4, 7), (9, 9), (7, 3), (4, 3), (8, 2), (6, 4), (4, 7) ], dtype=np.float64)
+        # dropping (6, 4), 0.31 from the chord, makes the edge (8, 2)-(4, 7) cross (9, 9)-(7, 3)
+        self.assertFalse(_reference(ring, 1.0, [ 4 ])[5])
+        (mask,) = simplify([ ring ], 1.0)
+        self.assertTrue(mask.all())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+#***************************************************************************
+#*                                                                         *
+#*   Copyright (c) 2016 <microelly2@freecadbuch.de>                        *
+#*   Copyright (c) 2024 Julien Masnada <rostskadat@gmail.com>              *
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+import unittest
+
+import numpy as np
+
+from geodata2.TransverseMercator import TransverseMercator
+
+def _coordinates(count=1000, latitude=41.64, longitude=-0.92, delta=0.05, seed=0):
+    """Returns random (lat, lon) arrays around a location."""
+    rng = np.random.default_rng(seed)
+    return (latitude + rng.uniform(-delta, delta, count), longitude + rng.uniform(-delta, delta, count))
+
+class TestTransverseMercator(unittest.TestCase):
+
+    def setUp(self):
+        self.tm = TransverseMercator(lat=41.64, lon=-0.92)
+
+    def test_array_projection_matches_the_scalar_one(self):
+        (lats, lons) = _coordinates()
+        (xs, ys) = self.tm.fromGeographicArray(lats, lons)
+        for (lat, lon, x, y) in zip(lats.tolist(), lons.tolist(), xs, ys):
+            (sx, sy) = self.tm.fromGeographic(lat, lon)
+            # NOTE: in mm, the scalar and the array functions round alike
+            self.assertAlmostEqual(x, sx, delta=1e-6)
+            self.assertAlmostEqual(y, sy, delta=1e-6)
+
+    def test_array_inverse_matches_the_scalar_one(self):
+        (xs, ys) = self.tm.fromGeographicArray(*_coordinates())
+        (lats, lons) = self.tm.toGeographicArray(xs, ys)
+        for (x, y, lat, lon) in zip(xs.tolist(), ys.tolist(), lats, lons):
+            (slat, slon) = self.tm.toGeographic(x, y)
+            self.assertAlmostEqual(lat, slat, delta=1e-12)
+            self.assertAlmostEqual(lon, slon, delta=1e-12)
+
+    def test_array_round_trip(self):
+        (lats, lons) = _coordinates()
+        (rlats, rlons) = self.tm.toGeographicArray(*self.tm.fromGeographicArray(lats, lons))
+        self.assertLess(np.abs(rlats - lats).max(), 1e-9)
+        self.assertLess(np.abs(rlons - lons).max(), 1e-9)
+
+    def test_keeps_the_shape_of_the_arrays(self):
+        (lats, lons) = (np.full((3, 4), 41.6), np.full((3, 4), -0.9))
+        (xs, ys) = self.tm.fromGeographicArray(lats, lons)
+        self.assertEqual(xs.shape, (3, 4))
+        self.assertEqual(ys.shape, (3, 4))
+        (x, y) = self.tm.fromGeographic(41.6, -0.9)
+        np.testing.assert_allclose(xs, x, rtol=0, atol=1e-6)
+        np.testing.assert_allclose(ys, y, rtol=0, atol=1e-6)
+
+if __name__ == "__main__":
+    unittest.main()